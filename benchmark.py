@@ -0,0 +1,297 @@
+# benchmark.py
+
+# Reproducible benchmark suite for the string matching algorithms and the
+# detection engines. Every input comes from a seeded generator, each case gets
+# untimed warmup runs before it is timed with perf_counter_ns, and the results
+# are written as JSON. A saved result file can be used as a baseline: cases that
+# got slower by more than the threshold, or whose match counts changed, are
+# reported and make the run exit with status 1.
+#
+#   python benchmark.py --output baseline.json
+#   python benchmark.py --baseline baseline.json --threshold 0.1
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+_ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(_ROOT, 'string_match'))
+from string_matching_algorithms import StringMatchingAlgorithms, benchmark_corpus, DNA_ALPHABET, BENCHMARK_SEED
+
+sys.path.append(os.path.join(_ROOT, 'intrusion-detection-web'))
+from backend import attack_patterns, compile_rule_set, detect_intrusions, DETECTION_METHODS, Tracer, TRACE_OFF
+
+SUITES = ("string", "detect")
+STRING_CORPORA = ("random", "dna", "apache", "nginx", "adversarial", "adversarial_suffix", "periodic")
+LOG_FORMATS = ("apache", "nginx")
+DEFAULT_PATTERN_LENGTHS = (4, 8, 16, 64)
+DEFAULT_ALPHABET_SIZES = (2, 4, 26, 64)
+DEFAULT_TEXT_SIZE = 10000
+DEFAULT_LOG_LINES = 1000
+DEFAULT_ATTACK_RATE = 0.05
+DEFAULT_WARMUP = 1
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.10  # Slowdown, as a fraction of the baseline time, that counts as a regression
+
+# First characters of this string make up the alphabet of a given size
+ALPHABET = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-_"
+
+# Synthetic access logs
+_LOG_START = 1760104536  # 10/Oct/2025:13:55:36 +0000
+_PATHS = ("/", "/index.html", "/search", "/login", "/api/v1/items", "/static/app.js", "/static/style.css",
+          "/images/logo.png", "/profile.php", "/cart", "/checkout", "/download")
+_PARAMS = ("q", "id", "page", "ref", "user", "file", "sort")
+_WORDS = ("hello", "shoes", "42", "news", "admin", "report.pdf", "blue", "2025", "latest", "summary")
+_STATUSES = (200, 200, 200, 200, 301, 304, 404, 500)
+_REFERRERS = ("-", "https://www.google.com/", "https://example.com/", "-")
+_USER_AGENTS = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36",
+                "Mozilla/5.0 (Macintosh; Intel Mac OS X 14_4) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4 Safari/605.1.15",
+                "curl/8.5.0", "python-requests/2.31.0", "Googlebot/2.1 (+http://www.google.com/bot.html)")
+
+def synthetic_log_lines(log_format: str, count: int, rng: random.Random,
+                        attack_rate: float = DEFAULT_ATTACK_RATE) -> List[str]:
+    """Access log lines in Apache's combined format, or nginx's with $request_time appended.
+
+    About ``attack_rate`` of the lines carry one of the built-in attack patterns
+    in their query string.
+    """
+    if log_format not in LOG_FORMATS:
+        raise ValueError(f"Unknown log format: {log_format}")
+    lines = []
+    for i in range(count):
+        ip = ".".join(str(rng.randint(1, 254)) for _ in range(4))
+        stamp = time.strftime("%d/%b/%Y:%H:%M:%S +0000", time.gmtime(_LOG_START + i))
+        value = rng.choice(attack_patterns) if rng.random() < attack_rate else rng.choice(_WORDS)
+        path = f"{rng.choice(_PATHS)}?{rng.choice(_PARAMS)}={value}"
+        line = (f'{ip} - - [{stamp}] "{rng.choice(("GET", "GET", "GET", "POST"))} {path} HTTP/1.1" '
+                f'{rng.choice(_STATUSES)} {rng.randint(200, 90000)} "{rng.choice(_REFERRERS)}" "{rng.choice(_USER_AGENTS)}"')
+        if log_format == "nginx":
+            line += f" {rng.uniform(0.001, 1.5):.3f}"
+        lines.append(line)
+    return lines
+
+def string_inputs(corpus: str, size: int, pattern_length: int, rng: random.Random,
+                  alphabet_size: Optional[int] = None) -> Tuple[str, str]:
+    """(text, pattern) for one string matching case.
+
+    Log corpora join synthetic lines into ``size`` characters of text and search
+    for a substring of it, so every pattern occurs at least once.
+    """
+    if corpus in LOG_FORMATS:
+        text = "\n".join(synthetic_log_lines(corpus, size // 150 + 1, rng))[:size]
+        start = rng.randrange(len(text) - pattern_length + 1)
+        return text, text[start:start + pattern_length]
+    if corpus == "random":
+        return benchmark_corpus(corpus, size, pattern_length, rng, ALPHABET[:alphabet_size])
+    if corpus == "dna":
+        return benchmark_corpus(corpus, size, pattern_length, rng, DNA_ALPHABET)
+    return benchmark_corpus(corpus, size, pattern_length, rng)
+
+def time_call(run: Callable[[], object], warmup: int = DEFAULT_WARMUP,
+              repeat: int = DEFAULT_REPEAT) -> Tuple[List[int], object]:
+    """Nanosecond timings of ``repeat`` calls after ``warmup`` untimed ones, and the last call's result."""
+    for _ in range(warmup):
+        run()
+    timings = []
+    result = None
+    for _ in range(max(repeat, 1)):
+        started = time.perf_counter_ns()
+        result = run()
+        timings.append(time.perf_counter_ns() - started)
+    return timings, result
+
+def _summary(timings: List[int]) -> Dict[str, int]:
+    ordered = sorted(timings)
+    return {"median_ns": ordered[len(ordered) // 2], "min_ns": ordered[0], "max_ns": ordered[-1]}
+
+def run_string_suite(corpora: Iterable[str] = STRING_CORPORA, pattern_lengths: Iterable[int] = DEFAULT_PATTERN_LENGTHS,
+                     alphabet_sizes: Iterable[int] = DEFAULT_ALPHABET_SIZES, text_size: int = DEFAULT_TEXT_SIZE,
+                     seed: int = BENCHMARK_SEED, warmup: int = DEFAULT_WARMUP,
+                     repeat: int = DEFAULT_REPEAT) -> Dict[str, Dict[str, object]]:
+    """Times every StringMatchingAlgorithms algorithm over each corpus and pattern length.
+
+    The random corpus is also swept over ``alphabet_sizes``. Patterns are compiled
+    before timing, so only the search is measured.
+    """
+    sma = StringMatchingAlgorithms()
+    results = {}
+    for corpus in corpora:
+        if corpus not in STRING_CORPORA:
+            raise ValueError(f"Unknown string corpus: {corpus}")
+        for alphabet_size in (alphabet_sizes if corpus == "random" else (None,)):
+            if alphabet_size is not None and not 1 <= alphabet_size <= len(ALPHABET):
+                raise ValueError(f"Alphabet size must be between 1 and {len(ALPHABET)}")
+            for pattern_length in pattern_lengths:
+                # Each case draws its own inputs, so adding or skipping cases leaves the others unchanged
+                rng = random.Random(f"{seed}/{corpus}/{alphabet_size}/{pattern_length}")
+                text, pattern = string_inputs(corpus, text_size, pattern_length, rng, alphabet_size)
+                compiled = sma.compile(pattern)
+                variant = f"{corpus}-a{alphabet_size}" if alphabet_size else corpus
+                for algorithm, search in sma.algorithms.items():
+                    timings, result = time_call(lambda: search(text, compiled), warmup, repeat)
+                    results[f"string/{variant}/m{pattern_length}/{algorithm}"] = {
+                        **_summary(timings),
+                        "matches": len(result["matches"]),
+                        "text_size": len(text),
+                    }
+    return results
+
+def run_detect_suite(log_formats: Iterable[str] = LOG_FORMATS, methods: Iterable[str] = DETECTION_METHODS,
+                     lines: int = DEFAULT_LOG_LINES, seed: int = BENCHMARK_SEED, warmup: int = DEFAULT_WARMUP,
+                     repeat: int = DEFAULT_REPEAT) -> Dict[str, Dict[str, object]]:
+    """Times detect_intrusions over synthetic Apache and nginx logs with each method, untraced and uncached."""
+    rule_set = compile_rule_set(attack_patterns)
+    rule_set.automaton
+    rule_set.shift_or
+    results = {}
+    for log_format in log_formats:
+        logs = synthetic_log_lines(log_format, lines, random.Random(f"{seed}/{log_format}"))
+        total_bytes = sum(len(log.encode("utf-8")) for log in logs)
+        for method in methods:
+            if method not in DETECTION_METHODS:
+                raise ValueError(f"Unknown detection method: {method}")
+            timings, detections = time_call(lambda: detect_intrusions(logs, rule_set, method, Tracer(TRACE_OFF)),
+                                            warmup, repeat)
+            summary = _summary(timings)
+            seconds = summary["median_ns"] / 1e9
+            results[f"detect/{log_format}/{method}"] = {
+                **summary,
+                "matches": len(detections),
+                "lines_per_second": round(len(logs) / seconds) if seconds else 0,
+                "mb_per_second": round(total_bytes / seconds / 1e6, 3) if seconds else 0.0,
+            }
+    return results
+
+def run_benchmarks(suites: Iterable[str] = SUITES, seed: int = BENCHMARK_SEED, warmup: int = DEFAULT_WARMUP,
+                   repeat: int = DEFAULT_REPEAT, **options) -> Dict[str, object]:
+    """Runs the selected suites and returns the JSON-ready report.
+
+    ``options`` are passed to the suite functions that accept them: ``corpora``,
+    ``pattern_lengths``, ``alphabet_sizes`` and ``text_size`` for the string
+    suite; ``log_formats``, ``methods`` and ``lines`` for the detection suite.
+    """
+    results = {}
+    for suite in suites:
+        if suite == "string":
+            keys = ("corpora", "pattern_lengths", "alphabet_sizes", "text_size")
+            results.update(run_string_suite(seed=seed, warmup=warmup, repeat=repeat,
+                                            **{key: options[key] for key in keys if key in options}))
+        elif suite == "detect":
+            keys = ("log_formats", "methods", "lines")
+            results.update(run_detect_suite(seed=seed, warmup=warmup, repeat=repeat,
+                                            **{key: options[key] for key in keys if key in options}))
+        else:
+            raise ValueError(f"Unknown benchmark suite: {suite}")
+    return {
+        "meta": {
+            "seed": seed,
+            "warmup": warmup,
+            "repeat": repeat,
+            "suites": list(suites),
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "results": results,
+    }
+
+def compare_reports(current: Dict[str, object], baseline: Dict[str, object],
+                    threshold: float = DEFAULT_THRESHOLD) -> Dict[str, List[Dict[str, object]]]:
+    """Compares the median times of the cases found in both reports.
+
+    Returns the cases that are slower than the baseline by more than
+    ``threshold`` (``regressions``), faster by more than it (``improvements``),
+    or that found a different number of matches (``mismatches``), plus the case
+    names present in only one report.
+    """
+    current_results = current["results"]
+    baseline_results = baseline["results"]
+    comparison = {"regressions": [], "improvements": [], "mismatches": [],
+                  "missing": sorted(set(baseline_results) - set(current_results)),
+                  "new": sorted(set(current_results) - set(baseline_results))}
+    for case in sorted(set(current_results) & set(baseline_results)):
+        now, before = current_results[case], baseline_results[case]
+        if now["matches"] != before["matches"]:
+            comparison["mismatches"].append({"case": case, "matches": now["matches"], "baseline": before["matches"]})
+        ratio = now["median_ns"] / before["median_ns"] if before["median_ns"] else 1.0
+        entry = {"case": case, "median_ns": now["median_ns"], "baseline_ns": before["median_ns"], "ratio": round(ratio, 3)}
+        if ratio > 1.0 + threshold:
+            comparison["regressions"].append(entry)
+        elif ratio < 1.0 - threshold:
+            comparison["improvements"].append(entry)
+    return comparison
+
+def _print_report(report: Dict[str, object]) -> None:
+    print(f"{'Case':<52}{'Median ms':>12}{'Min ms':>10}{'Matches':>10}")
+    for case, stats in report["results"].items():
+        print(f"{case:<52}{stats['median_ns'] / 1e6:>12.3f}{stats['min_ns'] / 1e6:>10.3f}{stats['matches']:>10}")
+
+def _print_comparison(comparison: Dict[str, List[Dict[str, object]]], threshold: float) -> None:
+    for marker, title, key in (("!", "Regressions", "regressions"), ("+", "Improvements", "improvements")):
+        if comparison[key]:
+            print(f"\n[{marker}] {title} (beyond {threshold:.0%}):")
+            for entry in comparison[key]:
+                print(f"  {entry['case']:<52}{entry['baseline_ns'] / 1e6:>10.3f} -> {entry['median_ns'] / 1e6:.3f} ms"
+                      f" (x{entry['ratio']})")
+    for entry in comparison["mismatches"]:
+        print(f"[!] {entry['case']}: {entry['matches']} matches, baseline had {entry['baseline']}")
+    if comparison["missing"] or comparison["new"]:
+        print(f"\n[i] {len(comparison['missing'])} baseline cases not run, {len(comparison['new'])} new cases")
+    if not comparison["regressions"] and not comparison["mismatches"]:
+        print("\n[+] No regressions against the baseline")
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reproducible string matching and detection benchmarks")
+    parser.add_argument("--suite", choices=SUITES, action="append",
+                        help="suite to run; repeat for several (default: all)")
+    parser.add_argument("--corpora", type=lambda value: value.split(","), default=list(STRING_CORPORA),
+                        help=f"comma-separated string corpora (default: {','.join(STRING_CORPORA)})")
+    parser.add_argument("--pattern-lengths", type=_int_list, default=list(DEFAULT_PATTERN_LENGTHS),
+                        help="comma-separated pattern lengths (default: %(default)s)")
+    parser.add_argument("--alphabet-sizes", type=_int_list, default=list(DEFAULT_ALPHABET_SIZES),
+                        help="comma-separated alphabet sizes for the random corpus (default: %(default)s)")
+    parser.add_argument("--text-size", type=int, default=DEFAULT_TEXT_SIZE,
+                        help="characters of text per string case (default: %(default)s)")
+    parser.add_argument("--lines", type=int, default=DEFAULT_LOG_LINES,
+                        help="log lines per detection case (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=BENCHMARK_SEED, help="input seed (default: %(default)s)")
+    parser.add_argument("--warmup", type=int, default=DEFAULT_WARMUP, help="untimed runs per case (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="timed runs per case (default: %(default)s)")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--baseline", help="JSON report to compare against; exits with 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="slowdown that counts as a regression, as a fraction (default: %(default)s)")
+    args = parser.parse_args()
+    if not args.pattern_lengths or min(args.pattern_lengths) < 1:
+        parser.error("pattern lengths must be at least 1")
+    if args.text_size < max(args.pattern_lengths):
+        parser.error("--text-size must be at least the longest pattern length")
+
+    try:
+        baseline = None
+        if args.baseline:
+            with open(args.baseline, "r") as f:
+                baseline = json.load(f)
+        report = run_benchmarks(args.suite or SUITES, args.seed, args.warmup, args.repeat, corpora=args.corpora,
+                                pattern_lengths=args.pattern_lengths, alphabet_sizes=args.alphabet_sizes,
+                                text_size=args.text_size, lines=args.lines)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    _print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n[+] Wrote {len(report['results'])} results to {args.output}")
+    if baseline is not None:
+        comparison = compare_reports(report, baseline, args.threshold)
+        _print_comparison(comparison, args.threshold)
+        if comparison["regressions"] or comparison["mismatches"]:
+            raise SystemExit(1)
@@ -1,9 +1,42 @@
 # backend.py
 
 # Import necessary modules
-from typing import List, Tuple
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from html.entities import html5 as html5_entities
+from itertools import islice
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+import atexit
+import hashlib
+import json
+import logging
+import mmap
+import operator
+import os
 import re
+import sys
+import threading
 import time
+import uuid
+
+try:
+    import numpy as np
+except ImportError:  # Only the numpy prefilter needs it
+    np = None
+
+try:
+    import yaml
+except ImportError:  # Only YAML rule files need it
+    yaml = None
+
+logger = logging.getLogger(__name__)
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "string_match"))
+from approximate_matching import build_myers_masks, myers_scan
+
+# (log, pattern, attack type, steps, indices, occurrence count)
+Detection = Tuple[str, str, str, List[Tuple], List[int], int]
 
 # Sample attack patterns (can be extended)
 attack_patterns = [
@@ -207,6 +240,125 @@ pattern_type_map = {
 }
 
 
+# Step tracing
+# Engines append structured (event, *args) records only when handed a trace list;
+# text is produced by format_steps() when a response is serialized.
+TRACE_OFF = "off"
+TRACE_SUMMARY = "summary"
+TRACE_FULL = "full"
+TRACE_LEVELS = (TRACE_OFF, TRACE_SUMMARY, TRACE_FULL)
+DEFAULT_TRACE_BUDGET = 10000
+
+TraceRecord = Tuple
+
+STEP_TEMPLATES = {
+    "kmp_compare": "KMP: Comparing text[{}]='{}' with pattern[{}]='{}'",
+    "kmp_found": "KMP: Pattern found at index {}",
+    "horspool_check": "Horspool: Checking segment '{}' against pattern '{}'",
+    "horspool_found": "Horspool: Pattern found at index {}",
+    "horspool_shift": "Horspool: Character '{}' not matching, shifting by {} positions",
+    "bm_match": "BM: Matching pattern[{}]='{}' with text[{}]='{}'",
+    "bm_found": "BM: Pattern found at index {}",
+    "bm_shift": "BM: Mismatch at pattern[{}] and text[{}], shifting by {}",
+    "naive_position": "Naive: Checking position {}",
+    "naive_compare": "Naive: Comparing text[{}]='{}' with pattern[{}]='{}'",
+    "naive_found": "Naive: Pattern found at index {}",
+    "shift_or_step": "Shift-Or: Read text[{}]='{}', state {}",
+    "shift_or_found": "Shift-Or: Pattern found at index {}",
+    "myers_step": "Myers: Read text[{}]='{}', best edit distance {}",
+    "myers_found": "Myers: Pattern found within {} edit(s) at index {}",
+    "pattern_found": "{}: Pattern '{}' found at index {}",
+}
+
+DETECTION_METHODS = ("aho_corasick", "shift_or", "kmp", "horspool", "boyer_moore", "naive")
+
+METHOD_LABELS = {
+    "aho_corasick": "Aho-Corasick",
+    "shift_or": "Shift-Or",
+    "kmp": "KMP",
+    "horspool": "Horspool",
+    "boyer_moore": "BM",
+    "naive": "Naive",
+    "myers": "Myers",  # Rules with max_errors, whatever the method
+}
+
+def format_steps(records: List[TraceRecord]) -> List[str]:
+    return [STEP_TEMPLATES[record[0]].format(*record[1:]) for record in records]
+
+class TraceBuffer(list):
+    """Trace records of a single engine run, capped at the events left in the request budget."""
+
+    __slots__ = ("limit", "dropped")
+
+    def __init__(self, limit: int):
+        super().__init__()
+        self.limit = limit
+        self.dropped = 0
+
+    def append(self, record: TraceRecord) -> None:
+        if len(self) < self.limit:
+            list.append(self, record)
+        else:
+            self.dropped += 1
+
+class Tracer:
+    """Trace level and event budget shared by every line scanned in one request.
+
+    ``off`` records nothing, ``summary`` records where each detected pattern was
+    found and ``full`` records every comparison the engine made. Only runs that
+    end in a detection are charged against the budget.
+    """
+
+    __slots__ = ("level", "budget", "used", "dropped")
+
+    def __init__(self, level: str = TRACE_SUMMARY, budget: int = DEFAULT_TRACE_BUDGET):
+        if level not in TRACE_LEVELS:
+            raise ValueError(f"Unknown trace level: {level}")
+        self.level = level
+        self.budget = budget
+        self.used = 0
+        self.dropped = 0
+
+    def scan_buffer(self) -> Optional[TraceBuffer]:
+        """Returns a buffer for one engine run at full level, or None so the engine records nothing."""
+        if self.level != TRACE_FULL or self.used >= self.budget:
+            return None
+        return TraceBuffer(self.budget - self.used)
+
+    def finish(self, buffer: Optional[TraceBuffer], method: str, pattern: str, found_indices: List[int]) -> List[TraceRecord]:
+        """Turns the records of a run that produced a detection into that detection's steps."""
+        if self.level == TRACE_OFF:
+            return []
+        if buffer is None:
+            label = METHOD_LABELS.get(method, method)
+            return self.commit([("pattern_found", label, pattern, index) for index in found_indices])
+        self.dropped += buffer.dropped
+        return self.commit(buffer)
+
+    def commit(self, records: List[TraceRecord]) -> List[TraceRecord]:
+        remaining = max(self.budget - self.used, 0)
+        if len(records) > remaining:
+            self.dropped += len(records) - remaining
+            records = records[:remaining]
+        self.used += len(records)
+        return list(records)
+
+    def to_dict(self) -> Dict[str, Union[str, int]]:
+        return {"level": self.level, "budget": self.budget, "events": self.used, "dropped": self.dropped}
+
+def utf8_size(text: str) -> int:
+    """Bytes ``text`` takes as UTF-8; lone surrogates from JSON input count as three bytes each."""
+    return len(text.encode("utf-8", "surrogatepass"))
+
+# Case folding
+def fold_case(text: str) -> str:
+    """Lowercases text without changing its length, so indices still line up with the original."""
+    folded = text.lower()
+    if len(folded) == len(text):
+        return folded
+    # A few characters (e.g. 'İ') lowercase to more than one character; leave those as they are
+    return "".join(char.lower() if len(char.lower()) == 1 else char for char in text)
+
 # KMP Algorithm Implementation
 def compute_lps(pattern: str) -> List[int]:
     lps = [0] * len(pattern)
@@ -225,18 +377,26 @@ def compute_lps(pattern: str) -> List[int]:
                 i += 1
     return lps
 
-def kmp_search(text: str, pattern: str, steps: List[str]) -> Tuple[bool, List[int]]:
-    lps = compute_lps(pattern)
-    i = j = 0
+def kmp_search(text: str, pattern: str, steps: Optional[List[TraceRecord]] = None, lps: Optional[List[int]] = None,
+               ignore_case: bool = False, start: int = 0) -> Tuple[bool, List[int]]:
+    if ignore_case:
+        text, pattern = fold_case(text), fold_case(pattern)
+    if lps is None:
+        lps = compute_lps(pattern)
+    trace = steps is not None
+    i = start
+    j = 0
     found_indices = []
     while i < len(text):
-        steps.append(f"KMP: Comparing text[{i}]='{text[i]}' with pattern[{j}]='{pattern[j]}'")
+        if trace:
+            steps.append(("kmp_compare", i, text[i], j, pattern[j]))
         if pattern[j] == text[i]:
             i += 1
             j += 1
         if j == len(pattern):
             found_indices.append(i - j)
-            steps.append(f"KMP: Pattern found at index {i - j}")
+            if trace:
+                steps.append(("kmp_found", i - j))
             j = lps[j - 1]  # Continue searching for more occurrences
         elif i < len(text) and pattern[j] != text[i]:
             if j != 0:
@@ -253,25 +413,33 @@ def build_shift_table(pattern: str) -> dict:
         table[pattern[i]] = m - 1 - i
     return table
 
-def horspool_search(text: str, pattern: str, steps: List[str]) -> Tuple[bool, List[int]]:
+def horspool_search(text: str, pattern: str, steps: Optional[List[TraceRecord]] = None, table: Optional[dict] = None,
+                    ignore_case: bool = False, start: int = 0) -> Tuple[bool, List[int]]:
+    if ignore_case:
+        text, pattern = fold_case(text), fold_case(pattern)
     m = len(pattern)
     n = len(text)
     found_indices = []
     if m > n:
         return False, []
-    table = build_shift_table(pattern)
-    i = 0
+    if table is None:
+        table = build_shift_table(pattern)
+    trace = steps is not None
+    i = start
     while i <= n - m:
         segment = text[i:i + m]
-        steps.append(f"Horspool: Checking segment '{segment}' against pattern '{pattern}'")
+        if trace:
+            steps.append(("horspool_check", segment, pattern))
         if pattern == segment:
             found_indices.append(i)
-            steps.append(f"Horspool: Pattern found at index {i}")
+            if trace:
+                steps.append(("horspool_found", i))
             i += 1  # Move one position to find next occurrence
         else:
             shift_char = text[i + m - 1] if i + m - 1 < n else 'EOF'
             shift = table.get(shift_char, m)
-            steps.append(f"Horspool: Character '{shift_char}' not matching, shifting by {shift} positions")
+            if trace:
+                steps.append(("horspool_shift", shift_char, shift))
             i += shift
     return len(found_indices) > 0, found_indices
 
@@ -282,96 +450,1926 @@ def build_bad_char_table(pattern: str) -> dict:
         table[pattern[i]] = i
     return table
 
-def boyer_moore_search(text: str, pattern: str, steps: List[str]) -> Tuple[bool, List[int]]:
+def boyer_moore_search(text: str, pattern: str, steps: Optional[List[TraceRecord]] = None, bad_char: Optional[dict] = None,
+                       ignore_case: bool = False, start: int = 0) -> Tuple[bool, List[int]]:
+    if ignore_case:
+        text, pattern = fold_case(text), fold_case(pattern)
     m = len(pattern)
     n = len(text)
     found_indices = []
     if m > n:
         return False, []
-    bad_char = build_bad_char_table(pattern)
-    s = 0
+    if bad_char is None:
+        bad_char = build_bad_char_table(pattern)
+    trace = steps is not None
+    s = start
     while s <= n - m:
         j = m - 1
         while j >= 0 and pattern[j] == text[s + j]:
-            steps.append(f"BM: Matching pattern[{j}]='{pattern[j]}' with text[{s + j}]='{text[s + j]}'")
+            if trace:
+                steps.append(("bm_match", j, pattern[j], s + j, text[s + j]))
             j -= 1
         if j < 0:
             found_indices.append(s)
-            steps.append(f"BM: Pattern found at index {s}")
+            if trace:
+                steps.append(("bm_found", s))
             s += 1  # Move one position to find next occurrence
         else:
             shift_char = text[s + j]
             shift = max(1, j - bad_char.get(shift_char, -1))
-            steps.append(f"BM: Mismatch at pattern[{j}] and text[{s + j}], shifting by {shift}")
+            if trace:
+                steps.append(("bm_shift", j, s + j, shift))
             s += shift
     return len(found_indices) > 0, found_indices
 
 # Naive String Matching Algorithm
-def naive_search(text: str, pattern: str, steps: List[str]) -> Tuple[bool, List[int]]:
+def naive_search(text: str, pattern: str, steps: Optional[List[TraceRecord]] = None,
+                 ignore_case: bool = False, start: int = 0) -> Tuple[bool, List[int]]:
+    if ignore_case:
+        text, pattern = fold_case(text), fold_case(pattern)
     n = len(text)
     m = len(pattern)
     found_indices = []
+    trace = steps is not None
     
-    for i in range(n - m + 1):
-        steps.append(f"Naive: Checking position {i}")
+    for i in range(start, n - m + 1):
+        if trace:
+            steps.append(("naive_position", i))
         j = 0
         while j < m:
-            steps.append(f"Naive: Comparing text[{i + j}]='{text[i + j]}' with pattern[{j}]='{pattern[j]}'")
+            if trace:
+                steps.append(("naive_compare", i + j, text[i + j], j, pattern[j]))
             if text[i + j] != pattern[j]:
                 break
             j += 1
         if j == m:
             found_indices.append(i)
-            steps.append(f"Naive: Pattern found at index {i}")
+            if trace:
+                steps.append(("naive_found", i))
     return len(found_indices) > 0, found_indices
 
-# Detect using selected algorithm
-def detect_intrusions(logs: List[str], patterns: List[str], method: str = "kmp") -> List[Tuple[str, str, str, List[str], List[int], int]]:
+# Shift-Or (Bitap) Algorithm Implementation
+# Bit i of the state is 0 while pattern[:i+1] matches the text ending at the
+# current character, so each character costs one shift and one OR. States and
+# masks are negative ints: every bit above the pattern stays 1, so the state
+# never grows however long the text is.
+def build_shift_or_masks(pattern: str) -> Dict[str, int]:
+    masks: Dict[str, int] = {}
+    for i, char in enumerate(pattern):
+        masks[char] = masks.get(char, -1) & ~(1 << i)
+    return masks
+
+def shift_or_search(text: str, pattern: str, steps: Optional[List[TraceRecord]] = None,
+                    masks: Optional[Dict[str, int]] = None, ignore_case: bool = False,
+                    start: int = 0) -> Tuple[bool, List[int]]:
+    if ignore_case:
+        text, pattern = fold_case(text), fold_case(pattern)
+    m = len(pattern)
+    if m == 0 or m > len(text):
+        return False, []
+    if masks is None:
+        masks = build_shift_or_masks(pattern)
+    trace = steps is not None
+    get_mask = masks.get
+    found_bit = 1 << (m - 1)
+    state = -1
+    found_indices = []
+    for i in range(start, len(text)):
+        state = (state << 1) | get_mask(text[i], -1)
+        if trace:
+            steps.append(("shift_or_step", i, text[i], format(state & (2 * found_bit - 1), f"0{m}b")))
+        if not state & found_bit:
+            found_indices.append(i - m + 1)
+            if trace:
+                steps.append(("shift_or_found", i - m + 1))
+    return len(found_indices) > 0, found_indices
+
+# Patterns are packed side by side into integer states of at most this many bits.
+# One wide state per line beats several narrow passes: the per-character cost of
+# a big-int shift grows more slowly with its width than the cost of another pass.
+SHIFT_OR_GROUP_BITS = 4096
+
+class ShiftOrMatcher:
+    """Multi-pattern Shift-Or: several patterns packed into one wide integer state.
+
+    Each pattern owns len(pattern) consecutive bits. After the shift, the first
+    bit of every slot is cleared (``(D << 1) & ~first_bits``) so a match can
+    start in any slot, and the carry out of the slot below is dropped. Patterns
+    are grouped into states of up to SHIFT_OR_GROUP_BITS bits, each scanned in
+    one pass; a longer pattern gets a state of its own.
+    """
+
+    def __init__(self, patterns: List[str], max_bits: int = SHIFT_OR_GROUP_BITS):
+        self.patterns = list(patterns)
+        # (masks, ~first bits, last bits, [(last bit, pattern id, length)]) per packed state
+        self.groups: List[Tuple[Dict[str, int], int, int, List[Tuple[int, int, int]]]] = []
+        group: List[int] = []
+        width = 0
+        for pattern_id, pattern in enumerate(self.patterns):
+            if not pattern:
+                continue
+            if group and width + len(pattern) > max_bits:
+                self._add_group(group)
+                group, width = [], 0
+            group.append(pattern_id)
+            width += len(pattern)
+        if group:
+            self._add_group(group)
+
+    def _add_group(self, pattern_ids: List[int]) -> None:
+        masks: Dict[str, int] = {}
+        first_bits = 0
+        last_bits = 0
+        ends = []
+        offset = 0
+        for pattern_id in pattern_ids:
+            pattern = self.patterns[pattern_id]
+            for i, char in enumerate(pattern):
+                masks[char] = masks.get(char, -1) & ~(1 << (offset + i))
+            last_bit = 1 << (offset + len(pattern) - 1)
+            first_bits |= 1 << offset
+            last_bits |= last_bit
+            ends.append((last_bit, pattern_id, len(pattern)))
+            offset += len(pattern)
+        self.groups.append((masks, ~first_bits, last_bits, ends))
+
+    def search(self, text: str) -> List[Tuple[int, int]]:
+        """Returns (pattern id, start index) for every occurrence of every pattern in text."""
+        hits = []
+        for masks, keep, last_bits, ends in self.groups:
+            get_mask = masks.get
+            state = -1
+            for i, char in enumerate(text):
+                state = ((state << 1) & keep) | get_mask(char, -1)
+                if state & last_bits != last_bits:
+                    for last_bit, pattern_id, length in ends:
+                        if not state & last_bit:
+                            hits.append((pattern_id, i - length + 1))
+        return hits
+
+# Approximate matching (Myers' bit-parallel edit distance), implemented in
+# string_match/approximate_matching.py and shared with the string matching algorithms
+def myers_search(text: str, pattern: str, max_errors: int, steps: Optional[List[TraceRecord]] = None,
+                 masks: Optional[Dict[str, int]] = None, ignore_case: bool = False,
+                 start: int = 0) -> Tuple[bool, List[int]]:
+    """Start indices of the occurrences of pattern in text within ``max_errors`` edits."""
+    if ignore_case:
+        text, pattern = fold_case(text), fold_case(pattern)
+    if masks is None:
+        masks = build_myers_masks(pattern)
+    on_step = on_match = None
+    if steps is not None:
+        on_step = lambda j, score: steps.append(("myers_step", j, text[j], score))
+        on_match = lambda index, end, distance: steps.append(("myers_found", distance, index))
+    found_indices = sorted(myers_scan(text, pattern, max_errors, masks.get, start, on_step, on_match))
+    return len(found_indices) > 0, found_indices
+
+# Aho-Corasick Multi-Pattern Automaton
+class AhoCorasickAutomaton:
+    """Goto/failure automaton over a whole pattern list, matched in a single pass per text."""
+
+    def __init__(self, patterns: List[str]):
+        self.patterns = list(patterns)
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[List[Tuple[int, int]]] = [[]]  # (pattern id, pattern length) ending at each state
+        for pattern_id, pattern in enumerate(self.patterns):
+            if pattern:
+                self._insert(pattern, pattern_id)
+        self._build_failure_links()
+
+    def _insert(self, pattern: str, pattern_id: int) -> None:
+        state = 0
+        for char in pattern:
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+                self.goto[state][char] = next_state
+            state = next_state
+        self.output[state].append((pattern_id, len(pattern)))
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                # Inherit the matches of the longest proper suffix state
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    def search(self, text: str) -> List[Tuple[int, int]]:
+        """Returns (pattern id, start index) for every occurrence of every pattern in text."""
+        goto = self.goto
+        fail = self.fail
+        output = self.output
+        hits = []
+        state = 0
+        for i, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                for pattern_id, length in output[state]:
+                    hits.append((pattern_id, i - length + 1))
+        return hits
+
+def aho_corasick_search(text: str, automaton: Union[AhoCorasickAutomaton, ShiftOrMatcher],
+                        steps: Optional[List[TraceRecord]] = None, label: str = "Aho-Corasick") -> Tuple[bool, int, List[int]]:
+    """Finds the earliest-listed pattern of the automaton (or multi-pattern Shift-Or matcher) in text.
+
+    Returns (match, pattern id, indices) so callers keep the first-match-in-list
+    semantics of the per-pattern engines.
+    """
+    hits = automaton.search(text)
+    if not hits:
+        return False, -1, []
+    pattern_id = min(hit[0] for hit in hits)
+    found_indices = sorted(start for hit_id, start in hits if hit_id == pattern_id)
+    if steps is not None:
+        for index in found_indices:
+            steps.append(("pattern_found", label, automaton.patterns[pattern_id], index))
+    return True, pattern_id, found_indices
+
+def aho_corasick_search_all(text: str, automaton: Union[AhoCorasickAutomaton, ShiftOrMatcher]) -> List[Tuple[int, List[int]]]:
+    """Returns (pattern id, sorted indices) for every pattern found in text, ordered by pattern id."""
+    found: Dict[int, List[int]] = {}
+    for pattern_id, start in automaton.search(text):
+        found.setdefault(pattern_id, []).append(start)
+    return [(pattern_id, sorted(found[pattern_id])) for pattern_id in sorted(found)]
+
+# Line normalization
+# Encoded variants of an attack ('%3cscript%3e', '&lt;script&gt;', '%253c...') are
+# decoded to one canonical form before matching, so a rule set only needs the
+# canonical pattern. Every normalized character remembers the index of the
+# original character it came from, so match indices still refer to the raw line.
+MAX_DECODE_PASSES = 4
+DEFAULT_NORMALIZE_CACHE_BYTES = 32 * 1024 * 1024
+
+_ENCODED_TOKEN = re.compile(r"%[0-9a-fA-F]{2}|%u[0-9a-fA-F]{4}|\+|&(?:#[0-9]{1,7}|#[xX][0-9a-fA-F]{1,6}|[a-zA-Z][a-zA-Z0-9]{1,31});?")
+_WHITESPACE_RUN = re.compile(r"\s+")
+_NEEDS_NORMALIZING = re.compile(r"[%+&]|\s\s|[^\S ]")
+
+def _decode_token(token: str, decode_plus: bool) -> Optional[str]:
+    """Decoded text of one URL escape, '+' or HTML character reference, or None to keep it as is."""
+    if token[0] == "%":
+        code = int(token[2:] if token[1] in "uU" else token[1:], 16)
+        return None if 0xD800 <= code <= 0xDFFF else chr(code)
+    if token == "+":
+        return " " if decode_plus else None
+    name = token[1:].rstrip(";")
+    if name[0] == "#":
+        code = int(name[2:], 16) if name[1] in "xX" else int(name[1:])
+        # Lone surrogates would make the decoded line unencodable, so they stay escaped
+        return chr(code) if code <= 0x10FFFF and not 0xD800 <= code <= 0xDFFF else None
+    return html5_entities.get(name + ";", html5_entities.get(name))
+
+def _decode_pass(text: str, origins: List[int], decode_plus: bool) -> Tuple[str, List[int]]:
+    pieces = []
+    decoded_origins = []
+    last = 0
+    for match in _ENCODED_TOKEN.finditer(text):
+        start, end = match.span()
+        decoded = _decode_token(match.group(), decode_plus)
+        if decoded is None:
+            continue
+        pieces.append(text[last:start])
+        decoded_origins.extend(origins[last:start])
+        pieces.append(decoded)
+        decoded_origins.extend([origins[start]] * len(decoded))
+        last = end
+    if not pieces:
+        return text, origins
+    pieces.append(text[last:])
+    decoded_origins.extend(origins[last:])
+    return "".join(pieces), decoded_origins
+
+def _collapse_whitespace(text: str, origins: List[int]) -> Tuple[str, List[int]]:
+    pieces = []
+    collapsed_origins = []
+    last = 0
+    for match in _WHITESPACE_RUN.finditer(text):
+        start, end = match.span()
+        if end - start == 1 and text[start] == " ":
+            continue
+        pieces.append(text[last:start])
+        collapsed_origins.extend(origins[last:start])
+        pieces.append(" ")
+        collapsed_origins.append(origins[start])
+        last = end
+    if not pieces:
+        return text, origins
+    pieces.append(text[last:])
+    collapsed_origins.extend(origins[last:])
+    return "".join(pieces), collapsed_origins
+
+class NormalizeCache:
+    """Bounded LRU of normalize_line results, sized by an estimate of the bytes held.
+
+    Lines and their origin maps can be large, so an entry bigger than 1/64 of the
+    budget is never stored rather than pushing out many smaller ones.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_NORMALIZE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[Tuple[str, Optional[Tuple[int, ...]]], int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, line: str) -> Optional[Tuple[str, Optional[Tuple[int, ...]]]]:
+        with self._lock:
+            entry = self._entries.get(line)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(line)
+            self.hits += 1
+            return entry[0]
+
+    def store(self, line: str, result: Tuple[str, Optional[Tuple[int, ...]]]) -> None:
+        text, origins = result
+        size = _CACHE_ENTRY_OVERHEAD + sys.getsizeof(line) + sys.getsizeof(text)
+        if origins is not None:
+            # The tuple's pointers plus, at worst, one int object per character
+            size += sys.getsizeof(origins) + 32 * len(origins)
+        if size > self.max_bytes // 64:
+            return
+        with self._lock:
+            previous = self._entries.pop(line, None)
+            if previous is not None:
+                self.current_bytes -= previous[1]
+            self._entries[line] = (result, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def to_dict(self) -> Dict[str, Union[int, float]]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 6) if lookups else 0.0,
+        }
+
+# Shared by every rule set in this process
+normalize_cache = NormalizeCache()
+
+def normalize_line(line: str) -> Tuple[str, Optional[Tuple[int, ...]]]:
+    """Returns (canonical text, origin index of each canonical character).
+
+    URL escapes ('+' only in the first pass) and HTML character references are
+    decoded repeatedly until the text stops changing, then whitespace runs are
+    collapsed to one space and the result is case-folded. The origins are None
+    when the canonical text is just the folded line. Results are kept in
+    normalize_cache.
+    """
+    result = normalize_cache.get(line)
+    if result is None:
+        result = _normalize_line(line)
+        normalize_cache.store(line, result)
+    return result
+
+def _normalize_line(line: str) -> Tuple[str, Optional[Tuple[int, ...]]]:
+    if not _NEEDS_NORMALIZING.search(line):
+        return fold_case(line), None
+    text = line
+    origins = list(range(len(line)))
+    for decode_pass in range(MAX_DECODE_PASSES):
+        decoded, origins = _decode_pass(text, origins, decode_pass == 0)
+        if decoded == text:
+            break
+        text = decoded
+    text, origins = _collapse_whitespace(text, origins)
+    return fold_case(text), tuple(origins)
+
+# Compiled Rule Set
+def resolve_attack_type(pattern: str, type_map: Optional[Dict[str, str]] = None) -> str:
+    if type_map is None:
+        type_map = pattern_type_map
+    # Use lowercased pattern for type lookup
+    return type_map.get(pattern.lower(), type_map.get(pattern, "Unknown"))
+
+def resolve_max_errors(pattern: str, max_errors: Optional[Dict[str, int]] = None) -> int:
+    if not max_errors:
+        return 0
+    return max_errors.get(pattern.lower(), max_errors.get(pattern, 0))
+
+class CompiledRule:
+    """A single attack pattern with all of its per-pattern preprocessing done up front.
+
+    Tables are built over the case-folded pattern, since lines are folded once
+    and matched case-insensitively. ``match_text`` replaces the pattern for
+    matching only, so a normalized rule still reports the text it was listed as.
+    """
+
+    __slots__ = ("pattern", "folded", "attack_type", "max_errors", "lps", "shift_table", "bad_char_table",
+                 "shift_or_masks", "myers_masks")
+
+    def __init__(self, pattern: str, attack_type: str, max_errors: int = 0, match_text: Optional[str] = None):
+        self.pattern = pattern
+        self.folded = fold_case(pattern if match_text is None else match_text)
+        self.attack_type = attack_type
+        if not 0 <= max_errors < len(self.folded):
+            raise ValueError(f"max_errors for {pattern!r} must be between 0 and {len(self.folded) - 1}")
+        # Rules with max_errors are always matched approximately, by myers_search
+        self.max_errors = max_errors
+        self.myers_masks = build_myers_masks(self.folded) if max_errors else None
+        self.lps = compute_lps(self.folded)
+        self.shift_table = build_shift_table(self.folded)
+        self.bad_char_table = build_bad_char_table(self.folded)
+        self.shift_or_masks = build_shift_or_masks(self.folded)
+
+class CompiledRuleSet:
+    """An attack pattern list compiled once and shared by every detection run.
+
+    Instances are obtained through ``compile_rule_set`` which caches them by a
+    content hash of the patterns and their resolved attack types.
+
+    With ``normalize`` every pattern is matched in its canonical form from
+    normalize_line and duplicates are dropped, keeping the text, attack type and
+    max_errors of the first variant listed; lines are normalized the same way
+    before matching.
+
+    ``max_errors`` maps patterns (lowercased, like ``type_map``) to the number of
+    edits a match may contain. Those rules are matched with myers_search by every
+    method and are left out of the multi-pattern matchers.
+    """
+
+    def __init__(self, patterns: List[str], type_map: Optional[Dict[str, str]] = None, normalize: bool = False,
+                 max_errors: Optional[Dict[str, int]] = None):
+        self.normalize = normalize
+        if normalize:
+            canonical: Dict[str, Tuple[str, str, int]] = {}
+            for pattern in patterns:
+                canonical.setdefault(normalize_line(pattern)[0], (pattern, resolve_attack_type(pattern, type_map),
+                                                                  resolve_max_errors(pattern, max_errors)))
+            # Normalizing can shorten a pattern below its edit limit
+            self.rules = [CompiledRule(pattern, attack_type, min(errors, len(fold_case(text)) - 1), text)
+                          for text, (pattern, attack_type, errors) in canonical.items() if text]
+        else:
+            self.rules = [CompiledRule(pattern, resolve_attack_type(pattern, type_map),
+                                       resolve_max_errors(pattern, max_errors)) for pattern in patterns]
+        self.patterns = [rule.pattern for rule in self.rules]
+        self.approximate = [idx for idx, rule in enumerate(self.rules) if rule.max_errors]
+        self.digest = rule_set_digest(patterns, type_map, normalize, max_errors)
+        # Short content hash reported with results, so they can be traced to the rules that produced them
+        self.version = rule_set_digest(patterns, type_map, max_errors=max_errors)[:12]
+        self._automaton = None
+        self._shift_or = None
+        self._byte_tables = None
+        self._byte_anchors = None
+        self._qgram_signatures = None
+
+    @property
+    def automaton(self) -> AhoCorasickAutomaton:
+        if self._automaton is None:
+            self._automaton = AhoCorasickAutomaton(self._exact_patterns())
+        return self._automaton
+
+    @property
+    def shift_or(self) -> ShiftOrMatcher:
+        if self._shift_or is None:
+            self._shift_or = ShiftOrMatcher(self._exact_patterns())
+        return self._shift_or
+
+    def _exact_patterns(self) -> List[str]:
+        # Approximate rules get an empty slot, which never matches, so rule ids stay aligned
+        return ["" if rule.max_errors else rule.folded for rule in self.rules]
+
+    @property
+    def byte_tables(self) -> List[Tuple[bytes, array, array]]:
+        """(folded UTF-8 pattern, Horspool shift table, bad-character table) per rule, for byte-level scans."""
+        if self._byte_tables is None:
+            tables = []
+            for rule in self.rules:
+                pattern = rule.folded.encode("utf-8")
+                tables.append((pattern, build_byte_shift_table(pattern), build_byte_bad_char_table(pattern)))
+            self._byte_tables = tables
+        return self._byte_tables
+
+    @property
+    def byte_anchors(self) -> List[Optional[Tuple[int, int, int]]]:
+        """(first byte, last byte, distance between them) per rule for the batch prefilter.
+
+        None if the rule is not ASCII or is approximate, which keeps it a candidate on every line.
+        """
+        if self._byte_anchors is None:
+            anchors = []
+            for rule in self.rules:
+                if rule.folded.isascii() and not rule.max_errors:
+                    pattern = rule.folded.encode("ascii")
+                    anchors.append((pattern[0], pattern[-1], len(pattern) - 1))
+                else:
+                    anchors.append(None)
+            self._byte_anchors = anchors
+        return self._byte_anchors
+
+    @property
+    def qgram_signatures(self) -> List[int]:
+        if self._qgram_signatures is None:
+            # An approximate match need not contain any of the pattern's q-grams
+            self._qgram_signatures = [0 if rule.max_errors else qgram_signature(rule.folded) for rule in self.rules]
+        return self._qgram_signatures
+
+    def prepare(self, log: str) -> Tuple[str, Optional[Tuple[int, ...]]]:
+        """The text the rules are matched against, and the origin map if it differs from the folded line."""
+        if self.normalize:
+            return normalize_line(log)
+        return fold_case(log), None
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+def rule_set_digest(patterns: List[str], type_map: Optional[Dict[str, str]] = None, normalize: bool = False,
+                    max_errors: Optional[Dict[str, int]] = None) -> str:
+    digest = hashlib.sha256(b"normalized\x00" if normalize else b"")
+    for pattern in patterns:
+        digest.update(pattern.encode("utf-8", "surrogatepass"))
+        digest.update(b"\x00")
+        digest.update(resolve_attack_type(pattern, type_map).encode("utf-8"))
+        errors = resolve_max_errors(pattern, max_errors)
+        if errors:
+            # Only approximate rules add to the hash, so exact rule sets keep their digests
+            digest.update(b"\x02%d" % errors)
+        digest.update(b"\x01")
+    return digest.hexdigest()
+
+_RULE_SET_CACHE_SIZE = 8
+_compiled_rule_sets: Dict[str, CompiledRuleSet] = {}
+
+def compile_rule_set(patterns: List[str], type_map: Optional[Dict[str, str]] = None,
+                     normalize: bool = False, max_errors: Optional[Dict[str, int]] = None) -> CompiledRuleSet:
+    """Returns the cached CompiledRuleSet for this pattern list, compiling it on first use."""
+    digest = rule_set_digest(patterns, type_map, normalize, max_errors)
+    rule_set = _compiled_rule_sets.get(digest)
+    if rule_set is None:
+        rule_set = CompiledRuleSet(patterns, type_map, normalize, max_errors)
+        if len(_compiled_rule_sets) >= _RULE_SET_CACHE_SIZE:
+            _compiled_rule_sets.pop(next(iter(_compiled_rule_sets)))
+        _compiled_rule_sets[digest] = rule_set
+    return rule_set
+
+# External rule files
+# A rule file lists the attack patterns to load instead of the built-in ones:
+#   {"rules": [{"pattern": "<script>", "attack_type": "XSS", "max_errors": 1}, "wget", ...]}
+# A bare string takes its attack type from pattern_type_map. "max_errors" makes
+# a rule approximate: it also matches text within that many inserted, deleted
+# or substituted characters, such as '<scr ipt>'. Files ending in .yaml or .yml
+# are read as YAML with the same structure.
+DEFAULT_RULE_POLL_INTERVAL = 2.0
+
+def load_rule_file(path: str) -> Tuple[List[str], Dict[str, str], Dict[str, int]]:
+    """Reads a rule file, returning (patterns, type map, max_errors map) in the form compile_rule_set expects."""
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            if yaml is None:
+                raise RuntimeError("Reading YAML rule files requires PyYAML")
+            document = yaml.safe_load(f)
+        else:
+            document = json.load(f)
+    rules = document.get("rules") if isinstance(document, dict) else None
+    if not isinstance(rules, list) or not rules:
+        raise ValueError(f"{path}: expected a non-empty 'rules' list")
+    patterns = []
+    type_map = dict(pattern_type_map)
+    max_errors: Dict[str, int] = {}
+    for position, rule in enumerate(rules):
+        if isinstance(rule, str):
+            pattern, attack_type, errors = rule, None, 0
+        elif isinstance(rule, dict) and isinstance(rule.get("pattern"), str):
+            pattern, attack_type, errors = rule["pattern"], rule.get("attack_type"), rule.get("max_errors", 0)
+        else:
+            raise ValueError(f"{path}: rule {position} needs a 'pattern' string")
+        if not pattern:
+            raise ValueError(f"{path}: rule {position} has an empty pattern")
+        if not isinstance(errors, int) or isinstance(errors, bool) or not 0 <= errors < len(pattern):
+            raise ValueError(f"{path}: rule {position} max_errors must be an integer between 0 and {len(pattern) - 1}")
+        patterns.append(pattern)
+        if attack_type is not None:
+            type_map[pattern.lower()] = str(attack_type)
+        if errors:
+            max_errors[pattern.lower()] = errors
+    return patterns, type_map, max_errors
+
+class RuleSetWatcher:
+    """Keeps the compiled rules of a rule file current while requests are running.
+
+    A background thread polls the file's size, mtime and inode. When they
+    change, the file is loaded and compiled (plain and normalized), the lazy
+    tables are built, and only then are the new rule sets swapped in with a
+    single assignment. Callers that already took a rule set finish on it. A file
+    that fails to load or compile leaves the previous rules in place.
+    """
+
+    def __init__(self, path: str, poll_interval: float = DEFAULT_RULE_POLL_INTERVAL):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.reloads = 0
+        self.last_error: Optional[str] = None
+        self.loaded_at: Optional[float] = None
+        self._signature = None
+        self._rule_sets = self._compile()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _file_signature(self) -> Tuple[int, int, int]:
+        info = os.stat(self.path)
+        return info.st_ino, info.st_size, info.st_mtime_ns
+
+    def _compile(self) -> Dict[bool, CompiledRuleSet]:
+        signature = self._file_signature()
+        patterns, type_map, max_errors = load_rule_file(self.path)
+        rule_sets = {}
+        for normalize in (False, True):
+            rule_set = compile_rule_set(patterns, type_map, normalize, max_errors)
+            # Build the lazily created tables here, not on the first request after the swap
+            rule_set.automaton
+            rule_set.shift_or
+            rule_set.qgram_signatures
+            rule_set.byte_anchors
+            rule_sets[normalize] = rule_set
+        self._signature = signature
+        self.loaded_at = time.time()
+        return rule_sets
+
+    def get(self, normalize: bool = False) -> CompiledRuleSet:
+        return self._rule_sets[normalize]
+
+    def check(self) -> bool:
+        """Reloads the rules if the file changed; returns True when a new version was swapped in."""
+        try:
+            if self._file_signature() == self._signature:
+                return False
+            rule_sets = self._compile()
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            return False
+        self.last_error = None
+        changed = rule_sets[False].digest != self._rule_sets[False].digest
+        self._rule_sets = rule_sets
+        if changed:
+            self.reloads += 1
+        return changed
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            self.check()
+
+    def start(self) -> "RuleSetWatcher":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._watch, name="rule-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def to_dict(self) -> Dict[str, Union[str, int, float, None]]:
+        rule_set = self.get()
+        return {
+            "path": self.path,
+            "version": rule_set.version,
+            "rules": len(rule_set),
+            "approximate_rules": len(rule_set.approximate),
+            "reloads": self.reloads,
+            "loaded_at": self.loaded_at,
+            "last_error": self.last_error,
+        }
+
+# Batch prefilter
+# A prefilter maps each line to the (rule index, first possible start) pairs that
+# could match it, so the exact engines only run where a match is possible.
+# Aho-Corasick scans every rule in one pass whatever the candidates are, so for
+# it a prefilter only rejects whole lines: None keeps the line, [] drops it.
+PREFILTER_NONE = "none"
+PREFILTER_NUMPY = "numpy"
+PREFILTER_QGRAM = "qgram"
+PREFILTERS = (PREFILTER_NONE, PREFILTER_NUMPY, PREFILTER_QGRAM)
+PREFILTER_BLOCK_ROWS = 1024
+PREFILTER_MAX_WIDTH = 4096
+
+Candidates = Optional[List[Tuple[int, int]]]
+
+class PrefilterStats:
+    """Counts the (line, pattern) pairs a prefilter examined and eliminated."""
+
+    __slots__ = ("lines", "pairs", "rejected")
+
+    def __init__(self):
+        self.lines = 0
+        self.pairs = 0
+        self.rejected = 0
+
+    def record(self, rule_count: int, candidates: Candidates) -> None:
+        self.lines += 1
+        self.pairs += rule_count
+        if candidates is not None:
+            self.rejected += rule_count - len(candidates)
+
+    def merge(self, other: "PrefilterStats") -> None:
+        self.lines += other.lines
+        self.pairs += other.pairs
+        self.rejected += other.rejected
+
+    def to_dict(self) -> Dict[str, Union[int, float]]:
+        return {
+            "lines": self.lines,
+            "pairs": self.pairs,
+            "rejected": self.rejected,
+            "rejection_rate": round(self.rejected / self.pairs, 6) if self.pairs else 0.0,
+        }
+
+def numpy_prefilter(folded_lines: List[str], rule_set: CompiledRuleSet,
+                    reject_only: bool = False) -> List[Candidates]:
+    """Finds candidate rules for a block of case-folded lines with vectorized byte comparisons.
+
+    Lines are packed into a zero-padded uint8 matrix and every row is checked at
+    once for each rule's first byte and last byte at the right distance. Lines
+    that are not ASCII or are longer than PREFILTER_MAX_WIDTH get None (scan every rule).
+    With ``reject_only`` no candidate lists are built: lines matching no rule's
+    anchors get [] and all others None.
+    """
+    if np is None:
+        raise RuntimeError("The numpy prefilter requires NumPy (pip install numpy)")
+    results: List[Candidates] = [None] * len(folded_lines)
+    if reject_only and None in rule_set.byte_anchors:
+        # A rule without anchors is a candidate on every line, so no line can be rejected
+        return results
+    rows = []
+    encoded = []
+    for row, line in enumerate(folded_lines):
+        if len(line) <= PREFILTER_MAX_WIDTH and line.isascii():
+            rows.append(row)
+            encoded.append(line.encode("ascii"))
+    if not encoded:
+        return results
+    width = max(max(len(line) for line in encoded), 1)
+    matrix = np.frombuffer(b"".join(line.ljust(width, b"\0") for line in encoded),
+                           dtype=np.uint8).reshape(len(encoded), width)
+    equal = {}
+    if reject_only:
+        possible = np.zeros(len(encoded), dtype=bool)
+        for first, last, distance in rule_set.byte_anchors:
+            if distance >= width:
+                continue
+            for byte in (first, last):
+                if byte not in equal:
+                    equal[byte] = matrix == byte
+            hits = equal[first][:, :width - distance] & equal[last][:, distance:] if distance else equal[first]
+            possible |= hits.any(axis=1)
+            if possible.all():
+                break
+        for packed_row in np.flatnonzero(~possible).tolist():
+            results[rows[packed_row]] = []
+        return results
+    candidates: List[List[Tuple[int, int]]] = [[] for _ in encoded]
+    for rule_index, anchor in enumerate(rule_set.byte_anchors):
+        if anchor is None:
+            for row_candidates in candidates:
+                row_candidates.append((rule_index, 0))
+            continue
+        first, last, distance = anchor
+        if distance >= width:
+            continue
+        for byte in (first, last):
+            if byte not in equal:
+                equal[byte] = matrix == byte
+        hits = equal[first][:, :width - distance] & equal[last][:, distance:] if distance else equal[first]
+        present = hits.any(axis=1)
+        if not present.any():
+            continue
+        offsets = hits.argmax(axis=1)
+        for packed_row in np.flatnonzero(present).tolist():
+            candidates[packed_row].append((rule_index, int(offsets[packed_row])))
+    for packed_row, row in enumerate(rows):
+        results[row] = candidates[packed_row]
+    return results
+
+# q-gram signatures: every character and every 2-gram of a string sets one bit of
+# a SIGNATURE_BITS-wide mask. A pattern can only occur in a line whose signature
+# contains all of the pattern's bits.
+SIGNATURE_BITS = 512
+
+class _GramMasks(dict):
+    """Memoizes the signature bit of each 1- or 2-character gram."""
+
+    def __missing__(self, gram: str) -> int:
+        value = ord(gram[0])
+        if len(gram) > 1:
+            value = value * 131 + ord(gram[1]) + 0x10FFFF
+        mask = 1 << (value % SIGNATURE_BITS)
+        self[gram] = mask
+        return mask
+
+_gram_masks = _GramMasks()
+
+def qgram_signature(text: str) -> int:
+    masks = _gram_masks
+    signature = 0
+    for gram in set(text):
+        signature |= masks[gram]
+    for gram in set(map(operator.add, text, text[1:])):
+        signature |= masks[gram]
+    return signature
+
+def qgram_prefilter(folded_lines: List[str], rule_set: CompiledRuleSet,
+                    reject_only: bool = False) -> List[Candidates]:
+    """Keeps, for each case-folded line, the rules whose q-gram signature is a subset of the line's.
+
+    With ``reject_only`` a line gets [] when no rule's signature fits it and None
+    otherwise, stopping at the first rule that fits.
+    """
+    if reject_only:
+        distinct = set(rule_set.qgram_signatures)
+        if 0 in distinct:
+            # An approximate rule fits every line
+            return [None] * len(folded_lines)
+        return [None if any(signature & line_signature == signature for signature in distinct) else []
+                for line_signature in map(qgram_signature, folded_lines)]
+    signatures = list(enumerate(rule_set.qgram_signatures))
+    results: List[Candidates] = []
+    for line in folded_lines:
+        line_signature = qgram_signature(line)
+        results.append([(rule_index, 0) for rule_index, signature in signatures
+                        if signature & line_signature == signature])
+    return results
+
+def _iter_blocks(logs: Iterable[str], size: int) -> Iterator[List[str]]:
+    iterator = iter(logs)
+    while True:
+        block = list(islice(iterator, size))
+        if not block:
+            return
+        yield block
+
+def _map_indices(found_indices: List[int], origins: Optional[Tuple[int, ...]]) -> List[int]:
+    # Indices into normalized text are reported against the original line
+    if origins is None:
+        return found_indices
+    return [origins[index] for index in found_indices]
+
+def _scan_line_with_automaton(log: str, rule_set: CompiledRuleSet, tracer: Tracer, prepared: str,
+                              origins: Optional[Tuple[int, ...]], all_matches: bool = False,
+                              method: str = "aho_corasick") -> List[Detection]:
+    # Aho-Corasick and multi-pattern Shift-Or both find every exact rule in one pass over the line
+    matcher = rule_set.shift_or if method == "shift_or" else rule_set.automaton
+    label = METHOD_LABELS[method]
+    rules = rule_set.rules
+    if all_matches:
+        detections = []
+        found = aho_corasick_search_all(prepared, matcher)
+        if rule_set.approximate:
+            # Approximate rules are not in the matcher; scan them one by one and merge in rule order
+            found = sorted(found + [(rule_id, _approximate_scan(prepared, rules[rule_id], None)[1])
+                                    for rule_id in rule_set.approximate])
+        for pattern_id, found_indices in found:
+            if not found_indices:
+                continue
+            rule = rules[pattern_id]
+            found_indices = _map_indices(found_indices, origins)
+            steps = tracer.scan_buffer()
+            if steps is not None:
+                steps.extend(("pattern_found", METHOD_LABELS["myers"] if rule.max_errors else label, rule.pattern,
+                              index) for index in found_indices)
+            steps = tracer.finish(steps, method, rule.pattern, found_indices)
+            detections.append((log, rule.pattern, rule.attack_type, steps, found_indices, len(found_indices)))
+        return detections
+    steps = tracer.scan_buffer()
+    match, pattern_id, found_indices = aho_corasick_search(prepared, matcher, steps, label)
+    # An approximate rule listed before the exact match takes precedence
+    for rule_id in rule_set.approximate:
+        if match and rule_id > pattern_id:
+            break
+        approximate_steps = tracer.scan_buffer()
+        approximate_match, approximate_indices = _approximate_scan(prepared, rules[rule_id], approximate_steps)
+        if approximate_match:
+            match, pattern_id, found_indices, steps = True, rule_id, approximate_indices, approximate_steps
+            method = "myers"
+            break
+    if not match:
+        return []
+    rule = rules[pattern_id]
+    found_indices = _map_indices(found_indices, origins)
+    steps = tracer.finish(steps, method, rule.pattern, found_indices)
+    return [(log, rule.pattern, rule.attack_type, steps, found_indices, len(found_indices))]
+
+def _approximate_scan(prepared: str, rule: CompiledRule, steps: Optional[List[TraceRecord]],
+                      start: int = 0) -> Tuple[bool, List[int]]:
+    return myers_search(prepared, rule.folded, rule.max_errors, steps, rule.myers_masks, start=start)
+
+def _scan_line(log: str, rule_set: CompiledRuleSet, method: str, tracer: Tracer, prepared: Optional[str] = None,
+               candidates: Candidates = None, all_matches: bool = False,
+               origins: Optional[Tuple[int, ...]] = None) -> List[Detection]:
+    """Returns the first matching rule's detection, or with ``all_matches`` one detection per matching rule.
+
+    ``prepared`` and ``origins`` are the result of ``rule_set.prepare(log)``,
+    computed here when not given.
+    """
+    if candidates is not None and not candidates:
+        return []
+    # Fold (or normalize) the line once; each pattern is then a single case-insensitive scan
+    if prepared is None:
+        prepared, origins = rule_set.prepare(log)
+    if method == "aho_corasick" or (method == "shift_or" and candidates is None):
+        return _scan_line_with_automaton(log, rule_set, tracer, prepared, origins, all_matches, method)
+    rules = rule_set.rules
+    if candidates is None:
+        candidates = [(rule_index, 0) for rule_index in range(len(rules))]
     detections = []
-    for log in logs:
-        log_lower = log.lower()
-        for pattern in patterns:
-            pattern_lower = pattern.lower()
-            steps = []
-            match = False
-            found_indices = []
-            # Substring match (case-insensitive)
-            if pattern_lower in log_lower:
-                match = True
-                # Find all indices (case-insensitive)
-                start = 0
-                while True:
-                    idx = log_lower.find(pattern_lower, start)
-                    if idx == -1:
-                        break
-                    found_indices.append(idx)
-                    start = idx + 1
-                steps.append(f"Pattern '{pattern}' found as substring in log.")
-            else:
-                # Fallback to algorithmic search (case-sensitive)
-                if method == "kmp":
-                    match, found_indices = kmp_search(log, pattern, steps)
-                elif method == "horspool":
-                    match, found_indices = horspool_search(log, pattern, steps)
-                elif method == "boyer_moore":
-                    match, found_indices = boyer_moore_search(log, pattern, steps)
-                elif method == "naive":
-                    match, found_indices = naive_search(log, pattern, steps)
-            if match:
-                # Use lowercased pattern for type lookup
-                attack_type = pattern_type_map.get(pattern_lower, pattern_type_map.get(pattern, "Unknown"))
-                detections.append((log, pattern, attack_type, steps, found_indices, len(found_indices)))
+    for rule_index, start in candidates:
+        rule = rules[rule_index]
+        steps = tracer.scan_buffer()
+        if rule.max_errors:
+            match, found_indices = _approximate_scan(prepared, rule, steps, start)
+        elif method == "kmp":
+            match, found_indices = kmp_search(prepared, rule.folded, steps, rule.lps, start=start)
+        elif method == "shift_or":
+            # Prefiltered lines only scan their candidate rules, one pattern at a time
+            match, found_indices = shift_or_search(prepared, rule.folded, steps, rule.shift_or_masks, start=start)
+        elif method == "horspool":
+            match, found_indices = horspool_search(prepared, rule.folded, steps, rule.shift_table, start=start)
+        elif method == "boyer_moore":
+            match, found_indices = boyer_moore_search(prepared, rule.folded, steps, rule.bad_char_table, start=start)
+        else:
+            match, found_indices = naive_search(prepared, rule.folded, steps, start=start)
+        if match:
+            found_indices = _map_indices(found_indices, origins)
+            steps = tracer.finish(steps, "myers" if rule.max_errors else method, rule.pattern, found_indices)
+            detections.append((log, rule.pattern, rule.attack_type, steps, found_indices, len(found_indices)))
+            if not all_matches:
                 break
     return detections
 
+# Line result cache
+DEFAULT_LINE_CACHE_BYTES = 64 * 1024 * 1024
+_CACHE_ENTRY_OVERHEAD = 160  # Rough per-entry cost of the key, OrderedDict node and tuples
+
+class LineResultCache:
+    """Bounded LRU of detection results per distinct log line.
+
+    Keys hash the case-folded line together with the rule-set digest and the
+    match mode, so results computed under older rules are never served. Only the
+    matched patterns, attack types and indices are kept; steps are rebuilt at
+    summary level on a hit, which is why full-level traces bypass the cache. The
+    size is bounded by an estimate of the bytes held rather than by entry count.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_LINE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[bytes, Tuple[Tuple[Tuple[str, str, Tuple[int, ...]], ...], int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(log: str, rule_set: CompiledRuleSet, all_matches: bool = False) -> bytes:
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(rule_set.digest.encode("ascii"))
+        digest.update(b"\x01" if all_matches else b"\x00")
+        # Matching is case-insensitive, so lines differing only in case share an entry
+        digest.update(fold_case(log).encode("utf-8", "surrogatepass"))
+        return digest.digest()
+
+    def lookup(self, key: bytes, log: str, method: str, tracer: Tracer) -> Tuple[bool, List[Detection]]:
+        """Returns (hit, detections); detections is empty for a cached clean line."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, []
+            self._entries.move_to_end(key)
+            self.hits += 1
+        detections = []
+        for pattern, attack_type, indices in entry[0]:
+            found_indices = list(indices)
+            steps = tracer.finish(None, method, pattern, found_indices)
+            detections.append((log, pattern, attack_type, steps, found_indices, len(found_indices)))
+        return True, detections
+
+    def store(self, key: bytes, detections: List[Detection]) -> None:
+        value = tuple((detection[1], detection[2], tuple(detection[4])) for detection in detections)
+        size = _CACHE_ENTRY_OVERHEAD + sum(64 + 8 * len(indices) for _, _, indices in value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous[1]
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def to_dict(self) -> Dict[str, Union[int, float]]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 6) if lookups else 0.0,
+        }
+
+# Shared by every request in this process
+line_result_cache = LineResultCache()
+
+def iter_detections(logs: Iterable[str], patterns: Union[List[str], CompiledRuleSet], method: str = "kmp",
+                    tracer: Optional[Tracer] = None, prefilter: str = PREFILTER_NONE,
+                    prefilter_stats: Optional[PrefilterStats] = None, cache: Optional[LineResultCache] = None,
+                    all_matches: bool = False) -> Iterator[Tuple[int, Detection]]:
+    """Yields (position in logs, detection) for every log line that matches a pattern.
+
+    By default a line is reported under the first pattern of the list it
+    contains. With ``all_matches`` every matching pattern of the line is reported,
+    one detection each in pattern-list order, still from a single scan of the line.
+
+    Lines are processed in blocks, and duplicate lines in a block are scanned
+    once. Steps are recorded according to ``tracer``; a summary-level tracer with
+    the default budget is used when none is given. With a ``prefilter`` other than
+    ``none`` only candidate rules are scanned, and ``prefilter_stats`` counts the
+    (line, pattern) pairs it eliminated. A ``cache`` is consulted before scanning
+    and filled afterwards.
+    """
+    if method not in DETECTION_METHODS:
+        raise ValueError(f"Unknown detection method: {method}")
+    if prefilter not in PREFILTERS:
+        raise ValueError(f"Unknown prefilter: {prefilter}")
+    rule_set = patterns if isinstance(patterns, CompiledRuleSet) else compile_rule_set(patterns)
+    if tracer is None:
+        tracer = Tracer()
+    use_cache = cache is not None and tracer.level != TRACE_FULL
+    position = 0
+    for block in _iter_blocks(logs, PREFILTER_BLOCK_ROWS):
+        results: Dict[str, List[Detection]] = {}
+        pending = []
+        keys = {}
+        # Collapse duplicate lines so each distinct line is looked up or scanned once
+        for log in dict.fromkeys(block):
+            if use_cache:
+                key = cache.key(log, rule_set, all_matches)
+                hit, detections = cache.lookup(key, log, method, tracer)
+                if hit:
+                    results[log] = detections
+                    continue
+                keys[log] = key
+            pending.append(log)
+        prepared_lines = [rule_set.prepare(log) for log in pending]
+        folded_lines = [prepared for prepared, _ in prepared_lines]
+        if prefilter == PREFILTER_NUMPY:
+            block_candidates = numpy_prefilter(folded_lines, rule_set, method == "aho_corasick")
+        elif prefilter == PREFILTER_QGRAM:
+            block_candidates = qgram_prefilter(folded_lines, rule_set, method == "aho_corasick")
+        else:
+            block_candidates = [None] * len(pending)
+        for log, (prepared, origins), candidates in zip(pending, prepared_lines, block_candidates):
+            if prefilter_stats is not None and prefilter != PREFILTER_NONE:
+                prefilter_stats.record(len(rule_set), candidates)
+            detections = _scan_line(log, rule_set, method, tracer, prepared, candidates, all_matches, origins)
+            results[log] = detections
+            if use_cache:
+                cache.store(keys[log], detections)
+        for log in block:
+            for detection in results[log]:
+                yield position, detection
+            position += 1
+
+# Detect using selected algorithm
+def detect_intrusions(logs: List[str], patterns: Union[List[str], CompiledRuleSet], method: str = "kmp",
+                      tracer: Optional[Tracer] = None, prefilter: str = PREFILTER_NONE,
+                      prefilter_stats: Optional[PrefilterStats] = None, cache: Optional[LineResultCache] = None,
+                      all_matches: bool = False) -> List[Detection]:
+    return [detection for _, detection in iter_detections(logs, patterns, method, tracer, prefilter,
+                                                          prefilter_stats, cache, all_matches)]
+
+# Method throughput benchmark
+BENCHMARK_METHODS = ("shift_or", "horspool", "boyer_moore")
+
+def benchmark_methods(logs: List[str], patterns: Union[List[str], CompiledRuleSet],
+                      methods: Iterable[str] = BENCHMARK_METHODS, trials: int = 3,
+                      all_matches: bool = False, max_errors: Iterable[int] = ()) -> Dict[str, Dict[str, float]]:
+    """Times a full scan of ``logs`` with each method, untraced and uncached.
+
+    Reports the median of ``trials`` runs as seconds, lines/s and MB/s (UTF-8),
+    plus the detection count so the methods can be checked against each other.
+    Each k in ``max_errors`` adds a "myers k=<k>" row that scans the same rules
+    with every one of them approximate, to show what k errors cost over exact matching.
+    """
+    rule_set = patterns if isinstance(patterns, CompiledRuleSet) else compile_rule_set(patterns)
+    rule_set.automaton
+    rule_set.shift_or
+    runs = [(method, method, rule_set) for method in methods]
+    for errors in max_errors:
+        # Every rule gets k errors, capped below its own length
+        approximate = compile_rule_set(rule_set.patterns, {rule.pattern.lower(): rule.attack_type for rule in rule_set.rules},
+                                       rule_set.normalize,
+                                       {rule.pattern.lower(): min(errors, len(rule.folded) - 1) for rule in rule_set.rules})
+        runs.append((f"myers k={errors}", "aho_corasick", approximate))
+    total_bytes = sum(map(utf8_size, logs))
+    results = {}
+    for name, method, run_rule_set in runs:
+        if method not in DETECTION_METHODS:
+            raise ValueError(f"Unknown detection method: {method}")
+        timings = []
+        for _ in range(max(trials, 1)):
+            started = time.perf_counter()
+            detections = detect_intrusions(logs, run_rule_set, method, Tracer(TRACE_OFF), all_matches=all_matches)
+            timings.append(time.perf_counter() - started)
+        seconds = sorted(timings)[len(timings) // 2]
+        results[name] = {
+            "seconds": seconds,
+            "lines_per_second": len(logs) / seconds if seconds else 0.0,
+            "mb_per_second": total_bytes / seconds / 1e6 if seconds else 0.0,
+            "detections": len(detections),
+        }
+    return results
+
+# Byte-level detection over memory-mapped files
+BYTE_METHODS = ("horspool", "boyer_moore")
+
+# 256-entry ASCII case-folding table, indexed by byte value
+_BYTE_FOLD = bytes(range(256)).lower()
+
+def build_byte_shift_table(pattern: bytes) -> array:
+    m = len(pattern)
+    table = array("l", [m]) * 256
+    for i in range(m - 1):
+        table[pattern[i]] = m - 1 - i
+    return table
+
+def build_byte_bad_char_table(pattern: bytes) -> array:
+    table = array("l", [-1]) * 256
+    for i in range(len(pattern)):
+        table[pattern[i]] = i
+    return table
+
+def horspool_search_bytes(text: bytes, pattern: bytes, table: array) -> List[int]:
+    """Horspool over raw bytes; text is folded through _BYTE_FOLD as it is read, pattern must be pre-folded."""
+    fold = _BYTE_FOLD
+    m = len(pattern)
+    n = len(text)
+    last = m - 1
+    found_indices = []
+    i = 0
+    while i <= n - m:
+        char = fold[text[i + last]]
+        if char == pattern[last]:
+            j = last - 1
+            while j >= 0 and fold[text[i + j]] == pattern[j]:
+                j -= 1
+            if j < 0:
+                found_indices.append(i)
+                i += 1  # Move one position to find next occurrence
+                continue
+        i += table[char]
+    return found_indices
+
+def boyer_moore_search_bytes(text: bytes, pattern: bytes, bad_char: array) -> List[int]:
+    """Bad-character Boyer-Moore over raw bytes; text is folded as it is read, pattern must be pre-folded."""
+    fold = _BYTE_FOLD
+    m = len(pattern)
+    n = len(text)
+    found_indices = []
+    s = 0
+    while s <= n - m:
+        j = m - 1
+        while j >= 0 and pattern[j] == fold[text[s + j]]:
+            j -= 1
+        if j < 0:
+            found_indices.append(s)
+            s += 1  # Move one position to find next occurrence
+        else:
+            s += max(1, j - bad_char[fold[text[s + j]]])
+    return found_indices
+
+def _scan_bytes_line(line: bytes, rule_set: CompiledRuleSet, method: str, tracer: Tracer) -> Optional[Detection]:
+    search = horspool_search_bytes if method == "horspool" else boyer_moore_search_bytes
+    for rule, (pattern, shift_table, bad_char_table) in zip(rule_set.rules, rule_set.byte_tables):
+        found_indices = search(line, pattern, shift_table if method == "horspool" else bad_char_table)
+        if found_indices:
+            # Only detected lines are ever decoded
+            log = line.decode("utf-8", errors="replace")
+            steps = tracer.finish(None, method, rule.pattern, found_indices)
+            return (log, rule.pattern, rule.attack_type, steps, found_indices, len(found_indices))
+    return None
+
+MMAP_CHUNK_BYTES = 1 << 20
+
+def _candidate_line_starts(folded: bytes, patterns: List[bytes]) -> List[int]:
+    """Sorted offsets of the lines in folded that contain any of the patterns."""
+    starts = set()
+    for pattern in patterns:
+        index = folded.find(pattern)
+        while index != -1:
+            starts.add(folded.rfind(b"\n", 0, index) + 1)
+            end = folded.find(b"\n", index)
+            if end == -1:
+                break
+            index = folded.find(pattern, end + 1)
+    return sorted(starts)
+
+def iter_file_detections_mmap(path: str, patterns: Union[List[str], CompiledRuleSet], method: str = "horspool",
+                              tracer: Optional[Tracer] = None) -> Iterator[Tuple[int, Detection]]:
+    """Scans a log file in place through mmap, yielding (1-based line number, detection).
+
+    The file is read in newline-aligned chunks of about MMAP_CHUNK_BYTES, folded
+    with bytes.translate, and searched with bytes.find per rule, so lines without
+    a hit are never decoded or scanned in Python. Each line with a hit is stripped
+    and matched rule by rule with the chosen engine. Matching folds ASCII case
+    only, indices are byte offsets into the stripped line, and steps hold match
+    positions only.
+    """
+    if method not in BYTE_METHODS:
+        raise ValueError(f"Byte-level scanning supports {', '.join(BYTE_METHODS)}, not {method}")
+    rule_set = patterns if isinstance(patterns, CompiledRuleSet) else compile_rule_set(patterns)
+    if rule_set.normalize:
+        raise ValueError("Byte-level scanning cannot normalize lines")
+    if rule_set.approximate:
+        raise ValueError("Byte-level scanning does not support rules with max_errors")
+    if tracer is None:
+        tracer = Tracer()
+    patterns = [pattern for pattern, _, _ in rule_set.byte_tables]  # Built before the file is opened
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if hasattr(mapped, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            size = len(mapped)
+            position = 0
+            line_number = 1  # Of the line starting at position
+            while position < size:
+                if position + MMAP_CHUNK_BYTES >= size:
+                    cut = size
+                else:
+                    cut = mapped.rfind(b"\n", position, position + MMAP_CHUNK_BYTES) + 1
+                    if not cut:  # A line longer than the chunk is read whole
+                        newline = mapped.find(b"\n", position + MMAP_CHUNK_BYTES)
+                        cut = size if newline == -1 else newline + 1
+                chunk = mapped[position:cut]
+                folded = chunk.translate(_BYTE_FOLD)
+                counted = 0
+                for start in _candidate_line_starts(folded, patterns):
+                    line_number += folded.count(b"\n", counted, start)
+                    counted = start
+                    end = folded.find(b"\n", start)
+                    if end == -1:
+                        end = len(folded)
+                    # A hit can still miss once the line is stripped
+                    line = chunk[start:end].strip()
+                    detection = _scan_bytes_line(line, rule_set, method, tracer) if line else None
+                    if detection is not None:
+                        yield line_number, detection
+                line_number += folded.count(b"\n", counted)
+                position = cut
+
+# Streaming detection over line iterators
+STREAM_BATCH_SIZE = 256
+MAX_LINE_BYTES = 1 << 20
+
+def iter_log_lines(stream: BinaryIO, encoding: str = "utf-8") -> Iterator[str]:
+    """Reads a binary stream one line at a time, yielding decoded and stripped lines.
+
+    Blank lines are yielded as empty strings so callers can keep file line numbers.
+    Lines longer than MAX_LINE_BYTES are read through without being kept and
+    yielded as blank, so memory stays bounded and later line numbers stay right.
+    """
+    while True:
+        raw = stream.readline(MAX_LINE_BYTES)
+        if not raw:
+            return
+        if len(raw) == MAX_LINE_BYTES and not raw.endswith(b"\n"):
+            while raw and not raw.endswith(b"\n"):
+                raw = stream.readline(MAX_LINE_BYTES)
+            logger.warning("Skipped a log line longer than %d bytes", MAX_LINE_BYTES)
+            yield ""
+            continue
+        yield raw.decode(encoding, errors="replace").strip()
+
+def detect_intrusions_stream(lines: Iterable[str], patterns: Union[List[str], CompiledRuleSet], method: str = "kmp",
+                             batch_size: int = STREAM_BATCH_SIZE, tracer: Optional[Tracer] = None,
+                             prefilter: str = PREFILTER_NONE, prefilter_stats: Optional[PrefilterStats] = None,
+                             cache: Optional[LineResultCache] = None,
+                             all_matches: bool = False) -> Iterator[Tuple[int, List[Tuple[int, Detection]]]]:
+    """Runs detection incrementally over an iterable of lines.
+
+    Every ``batch_size`` non-blank lines this yields (lines read so far, detections),
+    where detections is a list of (1-based line number, detection) for that batch.
+    Only one batch is held in memory at a time, and one trace budget covers the whole stream.
+    """
+    rule_set = patterns if isinstance(patterns, CompiledRuleSet) else compile_rule_set(patterns)
+    if tracer is None:
+        tracer = Tracer()
+    batch = []
+    line_numbers = []
+    line_number = 0
+    for line_number, line in enumerate(lines, 1):
+        if not line:
+            continue
+        batch.append(line)
+        line_numbers.append(line_number)
+        if len(batch) >= batch_size:
+            yield line_number, [(line_numbers[position], detection)
+                                for position, detection in iter_detections(batch, rule_set, method, tracer,
+                                                                           prefilter, prefilter_stats, cache,
+                                                                           all_matches)]
+            batch = []
+            line_numbers = []
+    yield line_number, [(line_numbers[position], detection)
+                        for position, detection in iter_detections(batch, rule_set, method, tracer,
+                                                                   prefilter, prefilter_stats, cache, all_matches)]
+
+# Tail-follow over growing log files
+DEFAULT_POLL_INTERVAL = 1.0
+_FOLLOW_READ_LIMIT = 4 * 1024 * 1024  # Bytes read from one file per poll before moving to the next
+
+class FollowCheckpoint:
+    """Byte offset, line number and file identity of every followed file, persisted as JSON.
+
+    Offsets only ever point just past a complete line that has been scanned, so
+    a restarted follower resumes without rescanning or skipping lines. Saving
+    writes a temporary file and renames it over the old one.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.files: Dict[str, Dict[str, int]] = {}
+        if path and os.path.exists(path):
+            with open(path, "r") as f:
+                self.files = json.load(f).get("files", {})
+
+    def get(self, log_path: str) -> Optional[Dict[str, int]]:
+        return self.files.get(os.path.abspath(log_path))
+
+    def update(self, log_path: str, device: int, inode: int, offset: int, line: int) -> None:
+        self.files[os.path.abspath(log_path)] = {"device": device, "inode": inode, "offset": offset, "line": line}
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"files": self.files}, f, indent=2, sort_keys=True)
+        os.replace(temp_path, self.path)
+
+class _FollowedFile:
+    __slots__ = ("path", "handle", "device", "inode", "offset", "line", "skip_to", "oversized_lines")
+
+    def __init__(self, path: str):
+        self.path = path
+        self.handle = None
+        self.device = self.inode = self.offset = self.line = 0
+        # Read position inside a line longer than MAX_LINE_BYTES, which is skipped rather than kept
+        self.skip_to: Optional[int] = None
+        self.oversized_lines = 0
+
+    def open(self, checkpoint: FollowCheckpoint) -> bool:
+        """Opens the file, resuming from the checkpoint if it still names the same, untruncated file."""
+        try:
+            self.handle = open(self.path, "rb")
+        except FileNotFoundError:
+            return False
+        info = os.fstat(self.handle.fileno())
+        self.device, self.inode = info.st_dev, info.st_ino
+        saved = checkpoint.get(self.path)
+        if saved and (saved["device"], saved["inode"]) == (self.device, self.inode) and saved["offset"] <= info.st_size:
+            self.offset, self.line = saved["offset"], saved["line"]
+        else:
+            self.offset = self.line = 0
+        self.skip_to = None
+        self.handle.seek(self.offset)
+        return True
+
+    def close(self) -> None:
+        if self.handle is not None:
+            self.handle.close()
+            self.handle = None
+
+    def rotated(self) -> bool:
+        """True when the path now names a different file than the open handle."""
+        try:
+            info = os.stat(self.path)
+        except FileNotFoundError:
+            return False  # Keep reading the old file until a new one appears
+        return (info.st_dev, info.st_ino) != (self.device, self.inode)
+
+    def read_lines(self, limit: int, final: bool = False) -> List[str]:
+        """Reads up to ``limit`` complete lines appended since the last read.
+
+        A trailing line without a newline is left for the next poll unless
+        ``final`` is set, which is used to drain a file that has been rotated away.
+        A line longer than MAX_LINE_BYTES is read through, possibly over several
+        polls, and returned as blank once its newline is reached, so line numbers
+        and the checkpoint only ever advance by whole lines.
+        """
+        if os.fstat(self.handle.fileno()).st_size < max(self.offset, self.skip_to or 0):
+            # Truncated in place (copytruncate): start again from the top
+            self.offset = self.line = 0
+            self.skip_to = None
+        position = self.offset if self.skip_to is None else self.skip_to
+        self.handle.seek(position)
+        lines = []
+        read_bytes = 0
+        while len(lines) < limit and read_bytes < _FOLLOW_READ_LIMIT:
+            raw = self.handle.readline(MAX_LINE_BYTES)
+            complete = raw.endswith(b"\n") or (final and len(raw) < MAX_LINE_BYTES)
+            if self.skip_to is not None or (len(raw) == MAX_LINE_BYTES and not complete):
+                position += len(raw)
+                read_bytes += len(raw)
+                if not complete:
+                    self.skip_to = position
+                    if not raw:
+                        break
+                    continue
+                self.skip_to = None
+                self.offset = position
+                self.oversized_lines += 1
+                logger.warning("%s:%d: skipped a line longer than %d bytes (%d so far)",
+                               self.path, self.line + len(lines) + 1, MAX_LINE_BYTES, self.oversized_lines)
+                lines.append("")
+                continue
+            if not raw or not complete:
+                break
+            position += len(raw)
+            self.offset = position
+            read_bytes += len(raw)
+            lines.append(raw.decode("utf-8", errors="replace").strip())
+        return lines
+
+def follow_log_files(paths: List[str], patterns: Union[List[str], CompiledRuleSet], method: str = "kmp",
+                     checkpoint: Optional[FollowCheckpoint] = None, poll_interval: float = DEFAULT_POLL_INTERVAL,
+                     batch_size: int = STREAM_BATCH_SIZE, tracer: Optional[Tracer] = None,
+                     prefilter: str = PREFILTER_NONE, prefilter_stats: Optional[PrefilterStats] = None,
+                     cache: Optional[LineResultCache] = None, stop: Optional[threading.Event] = None,
+                     all_matches: bool = False) -> Iterator[Tuple[str, int, Detection]]:
+    """Tails ``paths`` and yields (path, 1-based line number, detection) for newly appended lines.
+
+    New lines are scanned in batches of ``batch_size``. When a file is rotated
+    (its path now names a different inode) the rest of the old file is drained
+    before switching to the new one; a file that shrinks is rescanned from the
+    start. The checkpoint is saved after each batch has been yielded, so a
+    restart only scans bytes that were not yet checked. Runs until ``stop`` is set.
+    """
+    rule_set = patterns if isinstance(patterns, CompiledRuleSet) else compile_rule_set(patterns)
+    if tracer is None:
+        tracer = Tracer()
+    if checkpoint is None:
+        checkpoint = FollowCheckpoint()
+    if stop is None:
+        stop = threading.Event()
+    followed = [_FollowedFile(path) for path in paths]
+    try:
+        while not stop.is_set():
+            idle = True
+            for state in followed:
+                if state.handle is None and not state.open(checkpoint):
+                    continue
+                rotated = state.rotated()
+                lines = state.read_lines(batch_size, final=rotated)
+                if lines:
+                    idle = False
+                    first_line = state.line + 1
+                    state.line += len(lines)
+                    for position, detection in iter_detections(lines, rule_set, method, tracer,
+                                                               prefilter, prefilter_stats, cache, all_matches):
+                        # Blank lines are kept in ``lines`` so positions map straight to line numbers
+                        yield state.path, first_line + position, detection
+                    checkpoint.update(state.path, state.device, state.inode, state.offset, state.line)
+                    checkpoint.save()
+                elif rotated:
+                    state.close()
+                    idle = False
+            if idle:
+                stop.wait(poll_interval)
+    finally:
+        for state in followed:
+            state.close()
+
+# Parallel detection over log shards
+MIN_SHARD_SIZE = 512
+SHARDS_PER_WORKER = 4
+
+_pool_lock = threading.Lock()
+# Pools by (rule set digest, worker count), least recently used first. Each one
+# receives its compiled rule set once per worker, through the pool initializer.
+_detection_pools: "OrderedDict[Tuple[str, int], ProcessPoolExecutor]" = OrderedDict()
+MAX_DETECTION_POOLS = 2
+_worker_rule_set: Optional[CompiledRuleSet] = None
+
+def _init_detection_worker(rule_set: CompiledRuleSet) -> None:
+    global _worker_rule_set
+    _worker_rule_set = rule_set
+
+def _detect_shard(logs: List[str], method: str, offset: int, tracer: Tracer, prefilter: str,
+                  all_matches: bool = False) -> Tuple[List[Tuple[int, Detection]], int, PrefilterStats]:
+    prefilter_stats = PrefilterStats()
+    detections = [(offset + position, detection)
+                  for position, detection in iter_detections(logs, _worker_rule_set, method, tracer,
+                                                             prefilter, prefilter_stats, all_matches=all_matches)]
+    return detections, tracer.dropped, prefilter_stats
+
+def submit_detection_shards(rule_set: CompiledRuleSet, workers: int,
+                            shards: List[Tuple[List[str], int]], tracer: Tracer, method: str, prefilter: str,
+                            all_matches: bool = False) -> List[Future]:
+    """Submits (logs, offset) shards to the persistent pool for this rule set and size.
+
+    The pool is started on first use with the compiled rule set as its
+    initializer argument, so each worker unpickles it once. Shards are
+    submitted under the pool lock; a pool pushed out of the cache by newer rule
+    sets or sizes is shut down without waiting, which still runs every shard
+    already submitted to it.
+    """
+    key = (rule_set.digest, workers)
+    with _pool_lock:
+        pool = _detection_pools.get(key)
+        if pool is None:
+            # Build before pickling so workers do not each rebuild them
+            rule_set.automaton
+            rule_set.shift_or
+            pool = _detection_pools[key] = ProcessPoolExecutor(max_workers=workers, initializer=_init_detection_worker,
+                                                               initargs=(rule_set,))
+        _detection_pools.move_to_end(key)
+        futures = [pool.submit(_detect_shard, logs, method, offset, tracer, prefilter, all_matches)
+                   for logs, offset in shards]
+        while len(_detection_pools) > MAX_DETECTION_POOLS:
+            _, retired = _detection_pools.popitem(last=False)
+            retired.shutdown(wait=False)
+    return futures
+
+def shutdown_detection_pool() -> None:
+    with _pool_lock:
+        pools = list(_detection_pools.values())
+        _detection_pools.clear()
+    for pool in pools:
+        pool.shutdown()
+
+atexit.register(shutdown_detection_pool)
+
+def iter_detections_parallel(logs: List[str], patterns: Union[List[str], CompiledRuleSet], method: str = "kmp",
+                             workers: Optional[int] = None, shard_size: Optional[int] = None,
+                             tracer: Optional[Tracer] = None, prefilter: str = PREFILTER_NONE,
+                             prefilter_stats: Optional[PrefilterStats] = None,
+                             cache: Optional[LineResultCache] = None,
+                             all_matches: bool = False) -> Iterator[Tuple[int, Detection]]:
+    """Like iter_detections, but scans shards of logs on a process pool and merges them in line order.
+
+    Duplicate lines and cache hits are resolved here first, so only distinct
+    uncached lines are shipped to the workers. Each shard is traced with its own
+    copy of ``tracer``; the request budget is enforced again while merging.
+    """
+    rule_set = patterns if isinstance(patterns, CompiledRuleSet) else compile_rule_set(patterns)
+    if tracer is None:
+        tracer = Tracer()
+    # More processes than cores cannot speed up the scan, and capping keeps the number of pools bounded
+    cores = os.cpu_count() or 1
+    workers = min(workers or cores, cores)
+    if workers <= 1:
+        yield from iter_detections(logs, rule_set, method, tracer, prefilter, prefilter_stats, cache, all_matches)
+        return
+    use_cache = cache is not None and tracer.level != TRACE_FULL
+    results: Dict[str, List[Detection]] = {}
+    pending = []
+    for log in dict.fromkeys(logs):
+        if use_cache:
+            hit, detections = cache.lookup(cache.key(log, rule_set, all_matches), log, method, tracer)
+            if hit:
+                results[log] = detections
+                continue
+        pending.append(log)
+    if shard_size is None:
+        shard_size = max(MIN_SHARD_SIZE, -(-len(pending) // (workers * SHARDS_PER_WORKER)))
+    if len(pending) <= shard_size:
+        scanned = iter_detections(pending, rule_set, method, tracer, prefilter, prefilter_stats,
+                                  all_matches=all_matches)
+    else:
+        scanned = _iter_pool_detections(pending, rule_set, method, workers, shard_size, tracer,
+                                        prefilter, prefilter_stats, all_matches)
+    for log in pending:
+        results[log] = []
+    for position, detection in scanned:
+        results[pending[position]].append(detection)
+    if use_cache:
+        for log in pending:
+            cache.store(cache.key(log, rule_set, all_matches), results[log])
+    for position, log in enumerate(logs):
+        for detection in results[log]:
+            yield position, detection
+
+def _iter_pool_detections(logs: List[str], rule_set: CompiledRuleSet, method: str, workers: int, shard_size: int,
+                          tracer: Tracer, prefilter: str, prefilter_stats: Optional[PrefilterStats],
+                          all_matches: bool = False) -> Iterator[Tuple[int, Detection]]:
+    shard_tracer = Tracer(tracer.level, tracer.budget)
+    futures = submit_detection_shards(rule_set, workers, [(logs[start:start + shard_size], start)
+                                                          for start in range(0, len(logs), shard_size)],
+                                      shard_tracer, method, prefilter, all_matches)
+    for future in futures:
+        detections, dropped, shard_stats = future.result()
+        tracer.dropped += dropped
+        if prefilter_stats is not None:
+            prefilter_stats.merge(shard_stats)
+        for position, (log, pattern, attack_type, steps, indices, count) in detections:
+            yield position, (log, pattern, attack_type, tracer.commit(steps), indices, count)
+
+def detect_intrusions_parallel(logs: List[str], patterns: Union[List[str], CompiledRuleSet], method: str = "kmp",
+                               workers: Optional[int] = None, shard_size: Optional[int] = None,
+                               tracer: Optional[Tracer] = None, prefilter: str = PREFILTER_NONE,
+                               prefilter_stats: Optional[PrefilterStats] = None,
+                               cache: Optional[LineResultCache] = None, all_matches: bool = False) -> List[Detection]:
+    return [detection for _, detection in iter_detections_parallel(logs, patterns, method, workers, shard_size,
+                                                                   tracer, prefilter, prefilter_stats, cache,
+                                                                   all_matches)]
+
+# Background detection jobs
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+JOB_FINISHED_STATES = (JOB_COMPLETED, JOB_FAILED, JOB_CANCELLED)
+JOB_CHUNK_LINES = 1024
+DEFAULT_JOB_WORKERS = 2
+MAX_PENDING_JOBS = 16
+JOB_RETENTION_SECONDS = 3600
+
+class JobQueueFull(RuntimeError):
+    pass
+
+class DetectionJob:
+    """One detection run over a batch of logs, executed off the request thread.
+
+    Logs are scanned in chunks of JOB_CHUNK_LINES per worker so progress can be reported and
+    a cancellation request takes effect between chunks. Detections are appended
+    as they are found, so pages can be read while the job is still running.
+    """
+
+    def __init__(self, logs: List[str], rule_set: CompiledRuleSet, method: str = "kmp", workers: int = 1,
+                 tracer: Optional[Tracer] = None, prefilter: str = PREFILTER_NONE,
+                 cache: Optional[LineResultCache] = None, all_matches: bool = False):
+        self.id = uuid.uuid4().hex
+        self.logs = logs
+        self.rule_set = rule_set
+        self.method = method
+        self.workers = workers
+        self.tracer = tracer if tracer is not None else Tracer()
+        self.prefilter = prefilter
+        self.prefilter_stats = PrefilterStats()
+        self.cache = cache
+        self.all_matches = all_matches
+        self.state = JOB_QUEUED
+        self.error: Optional[str] = None
+        self.lines_total = len(logs)
+        self.lines_processed = 0
+        self.bytes_processed = 0
+        self.total_occurrences = 0
+        self.attack_type_counts: Dict[str, int] = {}
+        # (0-based line index, detection), in line order
+        self.detections: List[Tuple[int, Detection]] = []
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._cancelled = threading.Event()
+
+    def run(self) -> None:
+        if self._cancelled.is_set():
+            self._finish(JOB_CANCELLED)
+            return
+        self.state = JOB_RUNNING
+        self.started_at = time.time()
+        chunk_size = JOB_CHUNK_LINES * (1 if self.workers == 1 else self.workers or os.cpu_count() or 1)
+        try:
+            for start in range(0, self.lines_total, chunk_size):
+                if self._cancelled.is_set():
+                    self._finish(JOB_CANCELLED)
+                    return
+                chunk = self.logs[start:start + chunk_size]
+                if self.workers == 1:
+                    found = iter_detections(chunk, self.rule_set, self.method, self.tracer,
+                                            self.prefilter, self.prefilter_stats, self.cache, self.all_matches)
+                else:
+                    found = iter_detections_parallel(chunk, self.rule_set, self.method, self.workers or None,
+                                                     tracer=self.tracer, prefilter=self.prefilter,
+                                                     prefilter_stats=self.prefilter_stats, cache=self.cache,
+                                                     all_matches=self.all_matches)
+                for position, detection in found:
+                    self.detections.append((start + position, detection))
+                    self.total_occurrences += detection[5]
+                    self.attack_type_counts[detection[2]] = self.attack_type_counts.get(detection[2], 0) + 1
+                self.lines_processed = start + len(chunk)
+                self.bytes_processed += sum(map(utf8_size, chunk))
+        except Exception as e:
+            self.error = str(e)
+            self._finish(JOB_FAILED)
+            return
+        self._finish(JOB_COMPLETED)
+
+    def _finish(self, state: str) -> None:
+        # The input is no longer needed however the job ended; detections are kept for paging
+        self.logs = []
+        self.finished_at = time.time()
+        self.state = state
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    def results(self, offset: int = 0, limit: int = 100) -> List[Tuple[int, Detection]]:
+        return self.detections[offset:offset + limit]
+
+    def to_dict(self) -> Dict[str, Union[str, int, float, Dict[str, int], None]]:
+        """Status and progress; lines_per_second and eta_seconds are None until the job has started."""
+        lines_per_second = eta_seconds = None
+        elapsed = None
+        if self.started_at is not None:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+            if elapsed > 0 and self.lines_processed:
+                lines_per_second = self.lines_processed / elapsed
+                if self.state == JOB_RUNNING:
+                    eta_seconds = round((self.lines_total - self.lines_processed) / lines_per_second, 3)
+                lines_per_second = round(lines_per_second, 1)
+        return {
+            "id": self.id,
+            "state": self.state,
+            "algorithm": self.method,
+            "rule_version": self.rule_set.version,
+            "lines_total": self.lines_total,
+            "lines_processed": self.lines_processed,
+            "progress": round(self.lines_processed / self.lines_total, 6) if self.lines_total else 1.0,
+            "lines_per_second": lines_per_second,
+            "eta_seconds": eta_seconds,
+            "elapsed_seconds": round(elapsed, 6) if elapsed is not None else None,
+            "total_detections": len(self.detections),
+            "total_occurrences": self.total_occurrences,
+            "attack_type_counts": dict(self.attack_type_counts),
+            "error": self.error,
+        }
+
+class DetectionJobManager:
+    """Runs DetectionJobs on a bounded thread pool and keeps finished jobs for JOB_RETENTION_SECONDS.
+
+    At most ``max_pending`` jobs may be queued or running; further submissions
+    raise JobQueueFull so large scans cannot pile up behind each other.
+    ``on_finish`` is called with each job once it has completed, failed or been cancelled.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_JOB_WORKERS, max_pending: int = MAX_PENDING_JOBS,
+                 retention: float = JOB_RETENTION_SECONDS,
+                 on_finish: Optional[Callable[[DetectionJob], None]] = None):
+        self.max_pending = max_pending
+        self.retention = retention
+        self.on_finish = on_finish
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="detection-job")
+        self._jobs: "OrderedDict[str, DetectionJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, job: DetectionJob) -> DetectionJob:
+        with self._lock:
+            self._prune()
+            pending = sum(1 for queued in self._jobs.values() if queued.state not in JOB_FINISHED_STATES)
+            if pending >= self.max_pending:
+                raise JobQueueFull(f"Too many pending jobs (limit {self.max_pending})")
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job)
+        return job
+
+    def _run(self, job: DetectionJob) -> None:
+        job.run()
+        if self.on_finish is not None:
+            self.on_finish(job)
+
+    def state_counts(self) -> Dict[str, int]:
+        """Number of retained jobs in each state."""
+        counts = dict.fromkeys((JOB_QUEUED, JOB_RUNNING) + JOB_FINISHED_STATES, 0)
+        with self._lock:
+            for job in self._jobs.values():
+                counts[job.state] += 1
+        return counts
+
+    def get(self, job_id: str) -> Optional[DetectionJob]:
+        with self._lock:
+            self._prune()
+            return self._jobs.get(job_id)
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.retention
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished_at is not None and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def shutdown(self) -> None:
+        for job in list(self._jobs.values()):
+            job.cancel()
+        self._executor.shutdown(wait=False)
+
 if __name__ == "__main__":
-    import sys
-    import os
+    import argparse
 
-    method = sys.argv[1] if len(sys.argv) > 1 else "kmp"
-    input_file = sys.argv[2] if len(sys.argv) > 2 else None
+    parser = argparse.ArgumentParser(description="Scan log lines for known attack patterns.")
+    parser.add_argument("method", nargs="?", default="kmp",
+                        help="aho_corasick, shift_or, kmp, horspool, boyer_moore or naive (default: kmp)")
+    parser.add_argument("input_file", nargs="*",
+                        help="log file to scan (default: built-in sample logs); --follow accepts several")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker processes to shard the logs over; 0 uses every core (default: 1)")
+    parser.add_argument("--mmap", action="store_true",
+                        help="scan the input file in place as bytes (horspool or boyer_moore only)")
+    parser.add_argument("--rules", help="JSON or YAML rule file to use instead of the built-in patterns")
+    parser.add_argument("--normalize", action="store_true",
+                        help="decode URL escapes and HTML entities and collapse whitespace before matching")
+    parser.add_argument("--all-matches", action="store_true",
+                        help="report every matching pattern of a line instead of only the first")
+    parser.add_argument("--benchmark", action="store_true",
+                        help=f"time {', '.join(BENCHMARK_METHODS)} and the chosen method on the input instead of reporting detections")
+    parser.add_argument("--benchmark-errors", type=int, nargs="*", default=[], metavar="K",
+                        help="with --benchmark, also time approximate matching of every rule with K errors")
+    parser.add_argument("--follow", action="store_true",
+                        help="keep tailing the input files and scan lines as they are appended")
+    parser.add_argument("--checkpoint",
+                        help="JSON file recording how far each followed file has been scanned")
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL,
+                        help=f"seconds to wait for new lines when following (default: {DEFAULT_POLL_INTERVAL})")
+    parser.add_argument("--prefilter", choices=PREFILTERS, default=PREFILTER_NONE,
+                        help="skip (line, pattern) pairs that cannot match before scanning (default: none)")
+    parser.add_argument("--cache-mb", type=int, default=64,
+                        help="size of the repeated-line result cache in MB; 0 disables it (default: 64)")
+    parser.add_argument("--trace", choices=TRACE_LEVELS, default=TRACE_FULL,
+                        help="step detail recorded for each detection (default: full)")
+    parser.add_argument("--trace-budget", type=int, default=DEFAULT_TRACE_BUDGET,
+                        help=f"maximum trace events for the whole run (default: {DEFAULT_TRACE_BUDGET})")
+    args = parser.parse_args()
+    method = args.method
+    if method not in DETECTION_METHODS:
+        parser.error(f"unknown method: {method}")
+    if args.trace_budget < 0:
+        parser.error("--trace-budget must be 0 or a positive integer")
+    if len(args.input_file) > 1 and not args.follow:
+        parser.error("several input files are only supported with --follow")
+    input_file = args.input_file[0] if args.input_file else None
+    if args.follow and not args.input_file:
+        parser.error("--follow needs at least one input file")
+    if args.follow and args.mmap:
+        parser.error("--follow and --mmap cannot be combined")
+    if args.all_matches and args.mmap:
+        parser.error("--all-matches and --mmap cannot be combined")
+    if args.normalize and args.mmap:
+        parser.error("--normalize and --mmap cannot be combined")
+    if args.benchmark and (args.mmap or args.follow):
+        parser.error("--benchmark cannot be combined with --mmap or --follow")
+    try:
+        rule_patterns, rule_types, rule_errors = load_rule_file(args.rules) if args.rules else (attack_patterns, None, None)
+    except (OSError, ValueError, RuntimeError) as e:
+        parser.error(f"cannot load rules: {e}")
+    if args.mmap and rule_errors:
+        parser.error("--mmap does not support rules with max_errors")
+    if args.mmap and not (input_file and os.path.exists(input_file)):
+        parser.error("--mmap needs an existing input_file")
+    if args.mmap and method not in BYTE_METHODS:
+        parser.error(f"--mmap supports {', '.join(BYTE_METHODS)}")
 
-    if input_file and os.path.exists(input_file):
+    if args.follow:
+        cache = LineResultCache(args.cache_mb * 1024 * 1024) if args.cache_mb > 0 else None
+        rule_set = compile_rule_set(rule_patterns, rule_types, args.normalize, rule_errors)
+        follower = follow_log_files(args.input_file, rule_set, method, FollowCheckpoint(args.checkpoint),
+                                    args.poll_interval, tracer=Tracer(TRACE_OFF), prefilter=args.prefilter, cache=cache,
+                                    all_matches=args.all_matches)
+        print(f"[+] Following {', '.join(args.input_file)} using {method.upper()} (Ctrl+C to stop)")
+        try:
+            for path, line_number, (log, pattern, attack_type, _, indices, count) in follower:
+                print(f"{path}:{line_number}: {attack_type} '{pattern}' x{count} at {', '.join(map(str, indices))}: {log}",
+                      flush=True)
+        except KeyboardInterrupt:
+            pass
+        raise SystemExit(0)
+
+    if args.mmap:
+        sample_logs = []
+    elif input_file and os.path.exists(input_file):
         with open(input_file, 'r') as f:
             sample_logs = [line.strip() for line in f.readlines() if line.strip()]
     else:
@@ -384,15 +2382,47 @@ if __name__ == "__main__":
             "GET /profile.php?bio=<script>alert(1)</script> HTTP/1.1"
         ]
 
+    if args.benchmark:
+        methods = BENCHMARK_METHODS + ((method,) if method not in BENCHMARK_METHODS else ())
+        rule_set = compile_rule_set(rule_patterns, rule_types, args.normalize, rule_errors)
+        print(f"[+] Benchmarking {len(sample_logs)} lines against {len(rule_set)} patterns")
+        print(f"{'Method':<14}{'Seconds':>10}{'Lines/s':>14}{'MB/s':>10}{'Detections':>12}")
+        for name, stats in benchmark_methods(sample_logs, rule_set, methods, all_matches=args.all_matches,
+                                             max_errors=args.benchmark_errors).items():
+            print(f"{name:<14}{stats['seconds']:>10.4f}{stats['lines_per_second']:>14,.0f}"
+                  f"{stats['mb_per_second']:>10.2f}{stats['detections']:>12}")
+        raise SystemExit(0)
+
     start = time.time()
-    results = detect_intrusions(sample_logs, attack_patterns, method)
+    rule_set = compile_rule_set(rule_patterns, rule_types, args.normalize, rule_errors)
+    tracer = Tracer(args.trace, args.trace_budget)
+    prefilter_stats = PrefilterStats()
+    cache = LineResultCache(args.cache_mb * 1024 * 1024) if args.cache_mb > 0 else None
+    if args.mmap:
+        results = [detection for _, detection in iter_file_detections_mmap(input_file, rule_set, method, tracer)]
+    elif args.workers == 1:
+        results = detect_intrusions(sample_logs, rule_set, method, tracer, args.prefilter, prefilter_stats, cache,
+                                    args.all_matches)
+    else:
+        results = detect_intrusions_parallel(sample_logs, rule_set, method, workers=args.workers or None,
+                                             tracer=tracer, prefilter=args.prefilter, prefilter_stats=prefilter_stats,
+                                             cache=cache, all_matches=args.all_matches)
     end = time.time()
 
     print(f"\n[+] Detected Intrusions using {method.upper()}:")
     for log, pattern, attack_type, steps, indices, count in results:
         print(f"\nLog: {log}\nPattern: {pattern}\nAttack Type: {attack_type}\nSteps:")
-        for step in steps:
+        for step in format_steps(steps):
             print(f"  - {step}")
         print(f"Found at indices: {', '.join(map(str, indices))}")
         print(f"Total occurrences: {count}")
+    if prefilter_stats.pairs:
+        stats = prefilter_stats.to_dict()
+        print(f"\n[+] Prefilter rejected {stats['rejected']} of {stats['pairs']} (line, pattern) pairs "
+              f"({stats['rejection_rate']:.1%})")
+    if cache is not None and cache.hits + cache.misses:
+        stats = cache.to_dict()
+        print(f"\n[+] Line cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_ratio']:.1%} hit ratio)")
+    if tracer.dropped:
+        print(f"\n[!] Trace budget reached: {tracer.dropped} step(s) not recorded")
     print(f"\nExecution Time: {end - start:.6f} seconds")
\ No newline at end of file
@@ -0,0 +1,134 @@
+# profiling.py
+
+# Opt-in per-request profiling. A profiled request runs under cProfile while a
+# sampling thread records its call stacks; both are written to a local directory
+# as a .pstats file (for pstats/snakeviz) and a .collapsed file (one
+# "frame;frame;frame count" line per stack, for flamegraph.pl or speedscope).
+from collections import Counter, deque
+from typing import Deque, Dict, List, Optional
+import cProfile
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+
+DEFAULT_PROFILE_DIR = "profiles"
+DEFAULT_SAMPLE_INTERVAL = 0.001  # Seconds between stack samples
+MAX_PROFILES = 50
+MAX_STACK_DEPTH = 128
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class ProfileSession:
+    """cProfile plus a stack sampler attached to the thread that started the session."""
+
+    def __init__(self, label: str, interval: float = DEFAULT_SAMPLE_INTERVAL):
+        self.label = label
+        self.interval = interval
+        self.profile = cProfile.Profile()
+        self.stacks: Counter = Counter()
+        self.started_at = time.time()
+        self.duration = 0.0
+        self._thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, name="profile-sampler", daemon=True)
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self) -> None:
+        self._sampler.start()
+        self.profile.enable()
+
+    def stop(self) -> None:
+        self.profile.disable()
+        self._stop.set()
+        self._sampler.join()
+        self.duration = time.time() - self.started_at
+
+class RequestProfiler:
+    """Decides which requests to profile and keeps the most recent profiles on disk.
+
+    A request is profiled when it asks for it (the caller checks a header) or,
+    with a ``sample_rate`` above zero, at random. Only one request is profiled at
+    a time; others run unprofiled rather than wait. Requests that are not
+    profiled only pay for the ``should_profile`` check.
+    """
+
+    def __init__(self, directory: str = DEFAULT_PROFILE_DIR, sample_rate: float = 0.0,
+                 max_profiles: int = MAX_PROFILES, interval: float = DEFAULT_SAMPLE_INTERVAL):
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("sample_rate must be between 0 and 1")
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.recent: Deque[Dict[str, object]] = deque(maxlen=max_profiles)
+        self._busy = threading.Lock()
+
+    def should_profile(self, requested: bool = False) -> bool:
+        return requested or (self.sample_rate > 0.0 and random.random() < self.sample_rate)
+
+    def start(self, label: str) -> Optional[ProfileSession]:
+        """Starts profiling the current thread, or returns None if another profile is running."""
+        if not self._busy.acquire(blocking=False):
+            return None
+        session = ProfileSession(label, self.interval)
+        try:
+            session.start()
+        except Exception:
+            self._busy.release()
+            raise
+        return session
+
+    def finish(self, session: ProfileSession) -> Dict[str, object]:
+        """Stops the session, writes its files and returns its index entry."""
+        try:
+            session.stop()
+            return self._save(session)
+        finally:
+            self._busy.release()
+
+    def _save(self, session: ProfileSession) -> Dict[str, object]:
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(session.started_at))
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", session.label).strip("-") or "request"
+        name = f"{stamp}-{slug}-{uuid.uuid4().hex[:8]}"
+        session.profile.dump_stats(os.path.join(self.directory, f"{name}.pstats"))
+        with open(os.path.join(self.directory, f"{name}.collapsed"), "w") as f:
+            for stack, count in session.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        entry = {
+            "name": name,
+            "label": session.label,
+            "started_at": session.started_at,
+            "duration": round(session.duration, 6),
+            "samples": sum(session.stacks.values()),
+            "files": [f"{name}.pstats", f"{name}.collapsed"],
+        }
+        if len(self.recent) == self.recent.maxlen:
+            self._remove_files(self.recent[0])
+        self.recent.append(entry)
+        return entry
+
+    def _remove_files(self, entry: Dict[str, object]) -> None:
+        for file_name in entry["files"]:
+            try:
+                os.remove(os.path.join(self.directory, file_name))
+            except FileNotFoundError:
+                pass
+
+    def index(self) -> List[Dict[str, object]]:
+        """Recent profiles, newest first."""
+        return list(reversed(self.recent))
@@ -1,16 +1,16 @@
 # app.py
 
-from flask import Flask, render_template, request, jsonify
+import atexit
+
+from flask import Flask, Response, render_template, request, jsonify
 from string_matching_algorithms import StringMatchingAlgorithms
-import matplotlib
-matplotlib.use('Agg')  # Set the backend to Agg before importing pyplot
-import matplotlib.pyplot as plt
-import io
-import base64
-import seaborn as sns # For nicer plots
+from benchmark_jobs import (BenchmarkJobManager, BenchmarkQueueFull, benchmark_params,
+                            JOB_COMPLETED as BENCHMARK_COMPLETED)
 
 app = Flask(__name__)
 sma = StringMatchingAlgorithms()
+benchmark_jobs = BenchmarkJobManager(sma)
+atexit.register(benchmark_jobs.shutdown)
 
 # Define simplified scenarios
 CYBER_SCENARIOS = {
@@ -21,6 +21,14 @@ CYBER_SCENARIOS = {
         'pattern_label': 'Pattern to Search',
         'example_text': 'The quick brown fox jumps over the lazy dog. A quick fox is hard to catch.',
         'example_pattern': 'quick fox'
+    },
+    'worst_case': {
+        'name': 'Worst-Case Input',
+        'description': 'A long run of one character searched for a pattern that differs only in its last character. Naive search re-reads almost the whole pattern at every position, while KMP, the Z-algorithm and full Boyer-Moore stay linear. Use "Compare All" to see the difference.',
+        'text_label': 'Text',
+        'pattern_label': 'Pattern to Search',
+        'example_text': 'a' * 300,
+        'example_pattern': 'a' * 14 + 'b'
     }
 }
 
@@ -58,6 +66,8 @@ def search():
         pattern = data.get('pattern', '')
         algorithm_name = data.get('algorithm', 'naive')  # Default to naive
         visualize = data.get('visualize', False)
+        frame_format = data.get('frame_format', 'full')
+        max_errors = data.get('max_errors')
 
         # Validate inputs
         if not isinstance(text, str) or not isinstance(pattern, str):
@@ -67,7 +77,8 @@ def search():
         app.logger.info(f"Search request - Algorithm: {algorithm_name}, Text length: {len(text)}, Pattern length: {len(pattern)}")
 
         try:
-            result = sma.run_algorithm(algorithm_name, text, pattern, visualize=visualize)
+            result = sma.run_algorithm(algorithm_name, text, pattern, visualize=visualize,
+                                       frame_format=frame_format, max_errors=max_errors)
             if not isinstance(result, dict):
                 return jsonify({'error': f'Invalid result type from algorithm: {type(result)}'}), 500
             return jsonify(result)
@@ -99,49 +110,41 @@ def compare():
 
 @app.route('/api/benchmark', methods=['POST'])
 def benchmark():
-    """Handles benchmark requests and returns plot data."""
-    data = request.get_json()
-    pattern_size = int(data.get('pattern_size', 5))
-    num_trials = int(data.get('num_trials', 3))
-    text_sizes_raw = data.get('text_sizes', [100, 500, 1000, 2000, 5000, 10000])
-    text_sizes = [int(s) for s in text_sizes_raw]
+    """Starts a benchmark in the background, or returns the cached run with the same parameters.
 
+    Responds 200 with the raw series when the run has already completed, and 202
+    with its id otherwise; poll /api/benchmark/<id> until it has. The chart is
+    served as a PNG from /api/benchmark/<id>/plot.png.
+    """
+    data = request.get_json(silent=True) or {}
     try:
-        benchmark_results, sizes = sma.benchmark_algorithms(text_sizes, pattern_size, num_trials)
-
-        plt.figure(figsize=(12, 8))
-        sns.set_theme(style="whitegrid") # Apply seaborn style
-        
-        for alg, times in benchmark_results.items():
-            valid_times = [t for t in times if t is not None]
-            valid_sizes = [s for i, s in enumerate(sizes) if times[i] is not None]
-            if valid_times:
-                plt.plot(valid_sizes, valid_times, marker='o', label=alg.upper().replace('_', ' '), linewidth=2)
-
-        plt.xlabel('Text Size (characters)', fontsize=12)
-        plt.ylabel('Average Execution Time (seconds)', fontsize=12)
-        plt.title('String Matching Algorithms Performance in Cybersecurity', fontsize=14)
-        plt.legend(fontsize=10)
-        plt.grid(True, alpha=0.3)
-        plt.yscale('log') # Log scale is often better for performance plots
-        plt.xticks(fontsize=10)
-        plt.yticks(fontsize=10)
-        plt.tight_layout()
-
-        buffer = io.BytesIO()
-        plt.savefig(buffer, format='png')
-        plt.close()
-        plot_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
-
-        return jsonify({
-            'benchmark_results': benchmark_results,
-            'text_sizes': sizes,
-            'plot_image': plot_base64
-        })
-
-    except Exception as e:
-        app.logger.error(f"Error in /api/benchmark: {e}", exc_info=True)
-        return jsonify({'error': f'An unexpected error occurred during benchmarking: {str(e)}'}), 500
+        params = benchmark_params(data)
+        job, cached = benchmark_jobs.submit(params)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except BenchmarkQueueFull as e:
+        return jsonify({'error': str(e)}), 429
+    status = job.to_dict()
+    status['cached'] = cached
+    return jsonify(status), 200 if job.state == BENCHMARK_COMPLETED else 202
+
+@app.route('/api/benchmark/<job_id>', methods=['GET'])
+def benchmark_status(job_id):
+    job = benchmark_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Benchmark not found'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/benchmark/<job_id>/plot.png', methods=['GET'])
+def benchmark_plot(job_id):
+    """The benchmark chart, rendered on the first request and cached with the run."""
+    job = benchmark_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Benchmark not found'}), 404
+    if job.state != BENCHMARK_COMPLETED:
+        return jsonify({'error': f'Benchmark is {job.state}'}), 409
+    # The id covers the parameters and the code version, so the image never changes
+    return Response(job.plot_png(), mimetype='image/png', headers={'Cache-Control': 'public, max-age=86400'})
 
 if __name__ == '__main__':
     app.run(debug=True, port=8080)
\ No newline at end of file
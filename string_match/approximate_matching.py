@@ -0,0 +1,88 @@
+# approximate_matching.py
+
+# Myers' bit-parallel approximate matching, shared by the string matching
+# algorithms and the intrusion detection backend. It finds every place where the
+# pattern occurs with at most k insertions, deletions or substitutions, e.g.
+# '<scr ipt>' or 'un/**/ion' for k >= 1. The last column of the edit-distance
+# table for the text read so far is kept as two bit-vectors of +1 (Pv) and -1 (Mv)
+# vertical deltas, so each text character costs a dozen operations on m-bit ints
+# (O(n * ceil(m / w)) word operations) instead of m table cells.
+from typing import Callable, Dict, Optional
+
+def build_myers_masks(pattern: str) -> Dict[str, int]:
+    """Match mask per character: bit i is 1 where pattern[i] is that character."""
+    masks: Dict[str, int] = {}
+    for i, char in enumerate(pattern):
+        masks[char] = masks.get(char, 0) | (1 << i)
+    return masks
+
+def approximate_start(text: str, pattern: str, end: int, max_errors: int) -> int:
+    """Start of the closest alignment of pattern ending at text[end], from a DP over that window only."""
+    window = text[max(0, end - len(pattern) - max_errors + 1):end + 1][::-1]
+    row = list(range(len(window) + 1))
+    for i, char in enumerate(pattern[::-1], 1):
+        previous, row = row, [i]
+        for j, text_char in enumerate(window, 1):
+            row.append(min(previous[j] + 1, row[j - 1] + 1, previous[j - 1] + (char != text_char)))
+    # Fewest edits first, then the length closest to the pattern's
+    length = min(range(1, len(row)), key=lambda j: (row[j], abs(j - len(pattern))))
+    return end - length + 1
+
+def myers_scan(text: str, pattern: str, max_errors: int, get_mask: Callable[[str, int], int], start: int = 0,
+               on_step: Optional[Callable[[int, int], None]] = None,
+               on_match: Optional[Callable[[int, int, int], None]] = None) -> Dict[int, int]:
+    """Start index -> edit count of every occurrence of pattern in text[start:] within ``max_errors`` edits.
+
+    Every exact occurrence is reported. A run of consecutive end positions within
+    the limit that contains no exact occurrence is one approximate occurrence,
+    traced back from its closest end to the start of the alignment. ``get_mask``
+    is the ``get`` of build_myers_masks(pattern). For tracing, ``on_step(j, score)``
+    is called after each text character and ``on_match(start, end, distance)``
+    for each new occurrence.
+    """
+    m = len(pattern)
+    found: Dict[int, int] = {}
+    if m == 0:
+        return found
+    full = (1 << m) - 1
+    top = 1 << (m - 1)
+    pv, mv, score = full, 0, m
+    run_end, run_score, run_exact = -1, None, False
+
+    def report(index: int, end: int, distance: int) -> None:
+        if index not in found:
+            found[index] = distance
+            if on_match is not None:
+                on_match(index, end, distance)
+
+    for j in range(start, len(text)):
+        eq = get_mask(text[j], 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & full)
+        mh = pv & xh
+        if ph & top:
+            score += 1
+        elif mh & top:
+            score -= 1
+        # No carry into bit 0: an occurrence may start anywhere in the text
+        ph = (ph << 1) & full
+        mh = (mh << 1) & full
+        pv = mh | (~(xv | ph) & full)
+        mv = ph & xv
+        if on_step is not None:
+            on_step(j, score)
+        if score == 0:
+            # An exact occurrence starts m - 1 characters back, no traceback needed
+            report(j - m + 1, j, 0)
+            run_exact = True
+        elif score <= max_errors:
+            if run_score is None or score < run_score:
+                run_end, run_score = j, score
+        elif run_score is not None or run_exact:
+            if not run_exact:
+                report(approximate_start(text, pattern, run_end, max_errors), run_end, run_score)
+            run_score, run_exact = None, False
+    if run_score is not None and not run_exact:
+        report(approximate_start(text, pattern, run_end, max_errors), run_end, run_score)
+    return found
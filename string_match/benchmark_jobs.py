@@ -0,0 +1,225 @@
+# benchmark_jobs.py
+
+# Background runs for /api/benchmark. A run is keyed by its parameters and by a
+# hash of the algorithms module, so a repeated request is answered from the cache
+# and a code change invalidates every earlier result. Runs execute one at a time
+# on a single worker thread, which keeps them off the request threads and stops
+# concurrent runs from skewing each other's timings. The PNG chart is rendered
+# only when asked for, with matplotlib's object-oriented API under a lock, and
+# kept with the run.
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import io
+import json
+import threading
+import time
+
+from matplotlib.figure import Figure
+
+import approximate_matching
+import string_matching_algorithms
+from string_matching_algorithms import StringMatchingAlgorithms, BenchmarkStopped, BENCHMARK_CORPORA
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_FINISHED_STATES = (JOB_COMPLETED, JOB_FAILED)
+
+DEFAULT_TEXT_SIZES = [100, 500, 1000, 2000, 5000, 10000]
+MAX_TEXT_SIZES = 20
+MAX_TEXT_SIZE = 200000
+MAX_PATTERN_SIZE = 1000
+MAX_TRIALS = 50
+# Naive search does up to text x pattern comparisons per run, and there is one
+# warmup run per trial set; this caps a run at roughly twenty seconds of it
+MAX_WORK = 20000000
+MAX_RUN_SECONDS = 60.0
+MAX_CACHED_RUNS = 32
+MAX_PENDING_RUNS = 4
+
+def _code_version() -> str:
+    digest = hashlib.sha256()
+    for module in (string_matching_algorithms, approximate_matching):
+        with open(module.__file__, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+CODE_VERSION = _code_version()
+
+# matplotlib's rendering is not thread-safe even without pyplot's global state
+_RENDER_LOCK = threading.Lock()
+
+class BenchmarkQueueFull(RuntimeError):
+    pass
+
+def benchmark_params(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Validated benchmark parameters from a request body; raises ValueError."""
+    try:
+        text_sizes = sorted({int(size) for size in data.get('text_sizes', DEFAULT_TEXT_SIZES)})
+        pattern_size = int(data.get('pattern_size', 5))
+        num_trials = int(data.get('num_trials', 3))
+    except (TypeError, ValueError):
+        raise ValueError('text_sizes, pattern_size and num_trials must be integers')
+    corpus = data.get('corpus', 'random')
+    if corpus not in BENCHMARK_CORPORA:
+        raise ValueError(f"corpus must be one of: {', '.join(BENCHMARK_CORPORA)}")
+    if not text_sizes or len(text_sizes) > MAX_TEXT_SIZES or not 1 <= text_sizes[0] <= text_sizes[-1] <= MAX_TEXT_SIZE:
+        raise ValueError(f'text_sizes must list 1 to {MAX_TEXT_SIZES} sizes between 1 and {MAX_TEXT_SIZE}')
+    if not 1 <= pattern_size <= MAX_PATTERN_SIZE:
+        raise ValueError(f'pattern_size must be between 1 and {MAX_PATTERN_SIZE}')
+    if not 1 <= num_trials <= MAX_TRIALS:
+        raise ValueError(f'num_trials must be between 1 and {MAX_TRIALS}')
+    if sum(text_sizes) * pattern_size * (num_trials + 1) > MAX_WORK:
+        raise ValueError(f'sum(text_sizes) x pattern_size x (num_trials + 1) must not exceed {MAX_WORK}')
+    return {'text_sizes': text_sizes, 'pattern_size': pattern_size, 'num_trials': num_trials, 'corpus': corpus}
+
+def benchmark_key(params: Dict[str, Any]) -> str:
+    """Cache key and job id: the same parameters on the same code give the same id."""
+    document = json.dumps([params, CODE_VERSION], sort_keys=True)
+    return hashlib.sha256(document.encode('utf-8')).hexdigest()[:16]
+
+def render_plot(results: Dict[str, List[float]], text_sizes: List[int]) -> bytes:
+    """The benchmark chart as PNG bytes."""
+    with _RENDER_LOCK:
+        figure = Figure(figsize=(12, 8))
+        axes = figure.subplots()
+        for algorithm, times in results.items():
+            points = [(size, time_taken) for size, time_taken in zip(text_sizes, times) if time_taken is not None]
+            if points:
+                axes.plot(*zip(*points), marker='o', label=algorithm.upper().replace('_', ' '), linewidth=2)
+        axes.set_xlabel('Text Size (characters)', fontsize=12)
+        axes.set_ylabel('Median Execution Time (seconds)', fontsize=12)
+        axes.set_title('String Matching Algorithms Performance in Cybersecurity', fontsize=14)
+        axes.set_yscale('log')  # Log scale is often better for performance plots
+        axes.grid(True, alpha=0.3)
+        axes.legend(fontsize=10)
+        figure.tight_layout()
+        buffer = io.BytesIO()
+        figure.savefig(buffer, format='png')
+    return buffer.getvalue()
+
+class BenchmarkJob:
+    """One benchmark run and its results, kept for as long as the cache holds it.
+
+    A run that takes longer than ``time_limit`` seconds stops between trials and fails.
+    """
+
+    def __init__(self, params: Dict[str, Any], key: str, time_limit: float = MAX_RUN_SECONDS):
+        self.id = key
+        self.params = params
+        self.code_version = CODE_VERSION
+        self.state = JOB_QUEUED
+        self.error: Optional[str] = None
+        self.results: Optional[Dict[str, List[float]]] = None
+        self.preprocessing_times: Optional[List[float]] = None
+        self.text_sizes: Optional[List[int]] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.time_limit = time_limit
+        self._plot: Optional[bytes] = None
+        self._deadline = 0.0
+
+    def _should_stop(self) -> bool:
+        return time.monotonic() > self._deadline
+
+    def run(self, sma: StringMatchingAlgorithms) -> None:
+        self.state = JOB_RUNNING
+        self.started_at = time.time()
+        self._deadline = time.monotonic() + self.time_limit
+        try:
+            inputs = (self.params['text_sizes'], self.params['pattern_size'], self.params['num_trials'],
+                      self.params['corpus'])
+            self.results, self.text_sizes = sma.benchmark_algorithms(*inputs, should_stop=self._should_stop)
+            self.preprocessing_times = sma.benchmark_preprocessing(*inputs)
+        except BenchmarkStopped:
+            self.error = f'Benchmark exceeded the {self.time_limit:g} second time limit'
+            self.state = JOB_FAILED
+        except Exception as e:
+            self.error = str(e)
+            self.state = JOB_FAILED
+        else:
+            self.state = JOB_COMPLETED
+        self.finished_at = time.time()
+
+    def plot_png(self) -> bytes:
+        """Renders the chart on first use; later calls return the cached PNG."""
+        if self.state != JOB_COMPLETED:
+            raise ValueError(f'Benchmark {self.id} is {self.state}')
+        if self._plot is None:
+            self._plot = render_plot(self.results, self.text_sizes)
+        return self._plot
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Status, plus the raw series once the run has completed."""
+        status = {
+            'id': self.id,
+            'state': self.state,
+            'params': self.params,
+            'code_version': self.code_version,
+            'elapsed_seconds': round((self.finished_at or time.time()) - self.started_at, 6)
+            if self.started_at is not None else None,
+            'error': self.error,
+        }
+        if self.state == JOB_COMPLETED:
+            status.update({
+                'benchmark_results': self.results,
+                'preprocessing_times': self.preprocessing_times,
+                'text_sizes': self.text_sizes,
+                'plot_url': f'/api/benchmark/{self.id}/plot.png',
+            })
+        return status
+
+class BenchmarkJobManager:
+    """Runs BenchmarkJobs one at a time and caches the most recent MAX_CACHED_RUNS of them.
+
+    A submission matching a queued, running or completed job returns that job;
+    a failed one is run again. At most ``max_pending`` runs may wait, further
+    new submissions raise BenchmarkQueueFull.
+    """
+
+    def __init__(self, sma: StringMatchingAlgorithms, max_cached: int = MAX_CACHED_RUNS,
+                 max_pending: int = MAX_PENDING_RUNS):
+        self.sma = sma
+        self.max_cached = max_cached
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix="benchmark")
+        self._jobs: "OrderedDict[str, BenchmarkJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, params: Dict[str, Any]) -> Tuple[BenchmarkJob, bool]:
+        """Returns (job, cached), where cached is True only if the job has already completed.
+
+        A matching queued or running job is returned with False, like a newly queued one.
+        """
+        key = benchmark_key(params)
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job.state != JOB_FAILED:
+                self._jobs.move_to_end(key)
+                return job, job.state == JOB_COMPLETED
+            pending = sum(1 for queued in self._jobs.values() if queued.state not in JOB_FINISHED_STATES)
+            if pending >= self.max_pending:
+                raise BenchmarkQueueFull(f"Too many pending benchmarks (limit {self.max_pending})")
+            job = BenchmarkJob(params, key)
+            self._jobs[key] = job
+            self._jobs.move_to_end(key)
+            self._evict()
+        self._executor.submit(job.run, self.sma)
+        return job, False
+
+    def get(self, job_id: str) -> Optional[BenchmarkJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _evict(self) -> None:
+        # Oldest finished runs go first; queued and running ones are never dropped
+        finished = [key for key, job in self._jobs.items() if job.state in JOB_FINISHED_STATES]
+        for key in finished[:max(len(self._jobs) - self.max_cached, 0)]:
+            del self._jobs[key]
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
@@ -6,6 +6,7 @@ document.addEventListener('DOMContentLoaded', () => {
     const textLabel = document.getElementById('textLabel'); // New
     const patternLabel = document.getElementById('patternLabel'); // New
     const algorithmSelect = document.getElementById('algorithmSelect');
+    const maxErrorsInput = document.getElementById('maxErrorsInput');
     const visualizeCheckbox = document.getElementById('visualizeCheckbox');
     const analyzeButton = document.getElementById('analyzeButton');
     const compareAllButton = document.getElementById('compareAllButton');
@@ -28,6 +29,7 @@ document.addEventListener('DOMContentLoaded', () => {
     const runBenchmarkButton = document.getElementById('runBenchmarkButton');
     const benchmarkPatternSize = document.getElementById('benchmarkPatternSize');
     const benchmarkNumTrials = document.getElementById('benchmarkNumTrials');
+    const benchmarkCorpus = document.getElementById('benchmarkCorpus');
     const benchmarkOutput = document.getElementById('benchmarkOutput');
     const benchmarkPlot = document.getElementById('benchmarkPlot');
 
@@ -35,6 +37,9 @@ document.addEventListener('DOMContentLoaded', () => {
     const scenarioDescription = document.getElementById('scenarioDescription'); // New
 
     let visualizationFrames = [];
+    let frameHeader = null; // Text, pattern and tables shared by every delta frame
+    let frameMatches = []; // Match positions in the order the frames report them
+    let frameMatchCounts = []; // Number of matches found up to and including each frame
     let currentFrameIndex = 0;
     let animationInterval = null;
     let isPlaying = false;
@@ -58,7 +63,10 @@ document.addEventListener('DOMContentLoaded', () => {
         }
 
         const endpoint = compareAll ? '/api/compare' : '/api/search';
-        const payload = compareAll ? { text, pattern } : { text, pattern, algorithm, visualize };
+        const payload = compareAll ? { text, pattern } : { text, pattern, algorithm, visualize, frame_format: 'delta' };
+        if (!compareAll && algorithm === 'myers' && maxErrorsInput && maxErrorsInput.value !== '') {
+            payload.max_errors = parseInt(maxErrorsInput.value, 10);
+        }
 
         try {
             const response = await fetch(endpoint, {
@@ -93,7 +101,7 @@ document.addEventListener('DOMContentLoaded', () => {
             } else {
                 displaySingleAlgorithmResult(data);
                 if (data.visualization_frames && data.visualization_frames.length > 0) {
-                    visualizationFrames = data.visualization_frames;
+                    loadFrames(data.visualization_frames, data.frame_header);
                     visualizationSection.style.display = 'block';
                     setupVisualizationControls();
                     displayFrame(0);
@@ -116,6 +124,9 @@ document.addEventListener('DOMContentLoaded', () => {
         if (result.matches && result.matches.length > 0) {
             output += `Positions: ${result.matches.join(', ')}\n`;
         }
+        if (result.distances && result.distances.length > 0) {
+            output += `Edit distances (max ${result.max_errors}): ${result.distances.join(', ')}\n`;
+        }
         output += `Execution Time: ${result.execution_time ? result.execution_time.toFixed(6) : 'N/A'} seconds\n`;
         
         // Add a note about visualization
@@ -144,6 +155,9 @@ document.addEventListener('DOMContentLoaded', () => {
 
     function resetVisualization() {
         visualizationFrames = [];
+        frameHeader = null;
+        frameMatches = [];
+        frameMatchCounts = [];
         currentFrameIndex = 0;
         clearInterval(animationInterval);
         isPlaying = false;
@@ -159,6 +173,36 @@ document.addEventListener('DOMContentLoaded', () => {
         playPauseButton.disabled = true;
     }
 
+    function loadFrames(frames, header) {
+        visualizationFrames = frames;
+        frameHeader = header || null;
+        frameMatches = [];
+        frameMatchCounts = frames.map(frame => {
+            if (frame.match !== undefined) {
+                frameMatches.push(frame.match);
+            }
+            return frameMatches.length;
+        });
+    }
+
+    // Rebuilds the full state of a delta frame from the header and the match deltas
+    // before it. Full frames from older servers are returned unchanged.
+    function frameState(index) {
+        const frame = visualizationFrames[index];
+        if (!frameHeader || !frame) {
+            return frame;
+        }
+        const state = { ...frame, pattern: frameHeader.pattern, ...frameHeader.tables };
+        if (!frame.type.endsWith('_table')) {
+            state.text = frameHeader.text;
+            state.matches = frameMatches.slice(0, frameMatchCounts[index]);
+            if (frame.window !== undefined) {
+                state.current_window = frameHeader.text.substr(frame.window, frameHeader.pattern.length);
+            }
+        }
+        return state;
+    }
+
     function setupVisualizationControls() {
         if (!visualizationFrames || !Array.isArray(visualizationFrames)) {
             console.error('Invalid visualization frames data');
@@ -230,7 +274,7 @@ document.addEventListener('DOMContentLoaded', () => {
         }
 
         currentFrameIndex = index;
-        const frame = visualizationFrames[currentFrameIndex];
+        const frame = frameState(currentFrameIndex);
         if (!frame) {
             console.error(`Invalid frame data at index ${index}`);
             return;
@@ -266,7 +310,8 @@ document.addEventListener('DOMContentLoaded', () => {
                 frame.type,
                 frame.current_window,
                 frame.matches || [],
-                frame.text
+                frame.text,
+                frame
             );
             patternDisplay.innerHTML = highlightString(
                 frame.pattern,
@@ -275,7 +320,8 @@ document.addEventListener('DOMContentLoaded', () => {
                 frame.type,
                 frame.current_window,
                 [],
-                frame.pattern
+                frame.pattern,
+                frame
             );
         } else {
             textDisplay.innerHTML = '';
@@ -283,7 +329,7 @@ document.addEventListener('DOMContentLoaded', () => {
         }
 
         // Update extra info if available
-        if (frame.bad_char_table || frame.shift_table) {
+        if (frame.bad_char_table || frame.shift_table || frame.lps || frame.z_array || frame.good_suffix || frame.masks) {
             let extraInfoHtml = '<div class="extra-info-content">';
             if (frame.bad_char_table) {
                 extraInfoHtml += '<div class="table-info">';
@@ -305,6 +351,31 @@ document.addEventListener('DOMContentLoaded', () => {
                 }
                 extraInfoHtml += '</table></div>';
             }
+            if (frame.lps) {
+                extraInfoHtml += indexedTableHtml('Failure Table (LPS):', frame.pattern, frame.lps);
+            }
+            if (frame.z_array) {
+                extraInfoHtml += indexedTableHtml('Pattern Z-Array:', frame.pattern, frame.z_array);
+            }
+            if (frame.good_suffix) {
+                extraInfoHtml += indexedTableHtml('Good Suffix Shifts:', frame.pattern + ' ', frame.good_suffix);
+            }
+            if (frame.masks) {
+                extraInfoHtml += '<div class="table-info">';
+                const masksTitle = algorithmSelect.value === 'myers' ? 'Myers Match Masks' : 'Shift-Or Masks';
+                extraInfoHtml += `<h4>${masksTitle} (bit 0 on the right):</h4>`;
+                extraInfoHtml += '<table><tr><th>Character</th><th>Mask</th></tr>';
+                for (const [char, mask] of Object.entries(frame.masks)) {
+                    extraInfoHtml += `<tr><td>${char}</td><td>${mask}</td></tr>`;
+                }
+                if (frame.state !== undefined) {
+                    extraInfoHtml += `<tr><th>State</th><th>${frame.state}</th></tr>`;
+                }
+                if (frame.distance !== undefined) {
+                    extraInfoHtml += `<tr><th>Edit Distance</th><th>${frame.distance}</th></tr>`;
+                }
+                extraInfoHtml += '</table></div>';
+            }
             extraInfoHtml += '</div>';
             extraInfo.innerHTML = extraInfoHtml;
         } else {
@@ -312,7 +383,18 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
-    function highlightString(str, primaryIdx, secondaryIdx, frameType, currentWindow, matches, originalFullString) {
+    // Renders a per-position table (LPS, Z-array, good suffix) under the pattern characters
+    function indexedTableHtml(title, chars, values) {
+        let html = `<div class="table-info"><h4>${title}</h4><table><tr><th>Index</th>`;
+        values.forEach((_, i) => { html += `<td>${i}</td>`; });
+        html += '</tr><tr><th>Char</th>';
+        values.forEach((_, i) => { html += `<td>${chars[i] === ' ' ? '&nbsp;' : chars[i]}</td>`; });
+        html += '</tr><tr><th>Value</th>';
+        values.forEach(value => { html += `<td>${value}</td>`; });
+        return html + '</tr></table></div>';
+    }
+
+    function highlightString(str, primaryIdx, secondaryIdx, frameType, currentWindow, matches, originalFullString, frame) {
         let highlightedHtml = '';
         let patternLength = patternInput.value.length;
 
@@ -411,6 +493,8 @@ document.addEventListener('DOMContentLoaded', () => {
 
     // --- Benchmark Logic ---
 
+    const BENCHMARK_POLL_MS = 500;
+
     async function runBenchmark() {
         benchmarkOutput.textContent = 'Running benchmark... This might take a moment (especially for larger data sizes).';
         benchmarkPlot.innerHTML = ''; // Clear previous plot
@@ -428,9 +512,15 @@ document.addEventListener('DOMContentLoaded', () => {
             const response = await fetch('/api/benchmark', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ text_sizes: textSizes, pattern_size: patternSize, num_trials: numTrials })
+                body: JSON.stringify({ text_sizes: textSizes, pattern_size: patternSize, num_trials: numTrials, corpus: benchmarkCorpus ? benchmarkCorpus.value : 'random' })
             });
-            const data = await response.json();
+            let data = await response.json();
+
+            // The benchmark runs in the background; poll until it has finished
+            while (!data.error && (data.state === 'queued' || data.state === 'running')) {
+                await new Promise(resolve => setTimeout(resolve, BENCHMARK_POLL_MS));
+                data = await (await fetch(`/api/benchmark/${data.id}`)).json();
+            }
 
             if (data.error) {
                 benchmarkOutput.textContent = `Error: ${data.error}`;
@@ -438,9 +528,8 @@ document.addEventListener('DOMContentLoaded', () => {
             }
 
             displayBenchmarkResults(data);
-            if (data.plot_image) {
-                benchmarkPlot.innerHTML = `<img src="data:image/png;base64,${data.plot_image}" alt="Benchmark Plot">`;
-            }
+            benchmarkPlot.innerHTML = benchmarkChartSvg(data) +
+                `<a href="${data.plot_url}" target="_blank" rel="noopener">Download chart as PNG</a>`;
 
         } catch (error) {
             benchmarkOutput.textContent = `Network error: ${error.message}`;
@@ -448,6 +537,54 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
+    // Line chart of the raw series: linear text sizes against log-scaled times
+    function benchmarkChartSvg(data) {
+        const width = 760, height = 420;
+        const margin = { top: 20, right: 170, bottom: 50, left: 80 };
+        const plotWidth = width - margin.left - margin.right;
+        const plotHeight = height - margin.top - margin.bottom;
+        const colors = ['#3b82f6', '#ef4444', '#10b981', '#f59e0b', '#8b5cf6', '#ec4899', '#14b8a6', '#64748b', '#84cc16'];
+        const sizes = data.text_sizes;
+        const times = Object.values(data.benchmark_results).flat().filter(time => time > 0);
+        if (!sizes.length || !times.length) {
+            return '';
+        }
+        const maxSize = Math.max(...sizes);
+        const lowDecade = Math.floor(Math.log10(Math.min(...times)));
+        const highDecade = Math.max(Math.ceil(Math.log10(Math.max(...times))), lowDecade + 1);
+        const x = size => margin.left + (maxSize ? size / maxSize : 0) * plotWidth;
+        const y = time => margin.top + (highDecade - Math.log10(time)) / (highDecade - lowDecade) * plotHeight;
+
+        let svg = `<svg class="benchmark-chart" viewBox="0 0 ${width} ${height}" role="img" aria-label="Benchmark chart">`;
+        for (let decade = lowDecade; decade <= highDecade; decade++) {
+            const lineY = y(10 ** decade);
+            svg += `<line x1="${margin.left}" y1="${lineY}" x2="${margin.left + plotWidth}" y2="${lineY}" stroke="#e5e7eb"/>`;
+            svg += `<text x="${margin.left - 8}" y="${lineY + 4}" text-anchor="end" font-size="11">1e${decade} s</text>`;
+        }
+        for (let tick = 0; tick <= 4; tick++) {
+            const size = Math.round(maxSize * tick / 4);
+            svg += `<text x="${x(size)}" y="${margin.top + plotHeight + 18}" text-anchor="middle" font-size="11">${size}</text>`;
+        }
+        svg += `<line x1="${margin.left}" y1="${margin.top + plotHeight}" x2="${margin.left + plotWidth}" y2="${margin.top + plotHeight}" stroke="#6b7280"/>`;
+        svg += `<line x1="${margin.left}" y1="${margin.top}" x2="${margin.left}" y2="${margin.top + plotHeight}" stroke="#6b7280"/>`;
+        svg += `<text x="${margin.left + plotWidth / 2}" y="${height - 10}" text-anchor="middle" font-size="12">Text Size (characters)</text>`;
+        svg += `<text transform="translate(16 ${margin.top + plotHeight / 2}) rotate(-90)" text-anchor="middle" font-size="12">Median Execution Time</text>`;
+
+        Object.entries(data.benchmark_results).forEach(([algKey, series], index) => {
+            const color = colors[index % colors.length];
+            const points = sizes.map((size, i) => [size, series[i]]).filter(([, time]) => time > 0);
+            const path = points.map(([size, time]) => `${x(size).toFixed(1)},${y(time).toFixed(1)}`).join(' ');
+            svg += `<polyline points="${path}" fill="none" stroke="${color}" stroke-width="2"/>`;
+            points.forEach(([size, time]) => {
+                svg += `<circle cx="${x(size).toFixed(1)}" cy="${y(time).toFixed(1)}" r="3" fill="${color}"><title>${algKey}: ${time.toExponential(3)} s at ${size}</title></circle>`;
+            });
+            const legendY = margin.top + 10 + index * 18;
+            svg += `<line x1="${width - margin.right + 15}" y1="${legendY}" x2="${width - margin.right + 35}" y2="${legendY}" stroke="${color}" stroke-width="2"/>`;
+            svg += `<text x="${width - margin.right + 40}" y="${legendY + 4}" font-size="11">${algKey.replace(/_/g, ' ').toUpperCase()}</text>`;
+        });
+        return svg + '</svg>';
+    }
+
     function displayBenchmarkResults(data) {
         let output = `--- Benchmark Results (Average execution time in seconds, Signature/Pattern Size: ${benchmarkPatternSize.value}) ---\n`;
         output += `Algorithm       `;
@@ -465,6 +602,13 @@ document.addEventListener('DOMContentLoaded', () => {
             });
             output += `\n`;
         }
+        if (data.preprocessing_times) {
+            output += `${'compile'.padEnd(15)}`;
+            data.preprocessing_times.forEach(time => {
+                output += `${time.toFixed(6).padEnd(10)}`;
+            });
+            output += `\n\nSearch times exclude preprocessing; the compile row is the one-off cost of building the pattern tables.\n`;
+        }
         benchmarkOutput.textContent = output;
     }
 
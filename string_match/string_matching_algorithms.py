@@ -2,7 +2,181 @@
 
 import time
 import random
-from typing import List, Dict, Any, Tuple
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Callable, Iterator, List, Dict, Any, Mapping, NamedTuple, Optional, Tuple, Union
+
+from approximate_matching import build_myers_masks, myers_scan
+
+# Visualization frame formats. 'full' frames each carry the text, pattern, tables
+# and matches so far; 'delta' frames carry only indices, status and the match they
+# add, with text, pattern and tables sent once in 'frame_header'.
+FRAME_FORMATS = ('full', 'delta')
+TABLE_FRAME_TYPES = ('bad_char_table', 'shift_table', 'lps_table', 'z_table', 'good_suffix_table', 'mask_table')
+
+def expand_frames(header: Dict[str, Any], frames: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Rebuilds full frames from a delta frame header and its frames."""
+    text = header['text']
+    pattern = header['pattern']
+    tables = header['tables']
+    matches = []
+    expanded = []
+    for frame in frames:
+        full = {k: v for k, v in frame.items() if k not in ('window', 'match')}
+        full['pattern'] = pattern
+        full.update(tables)
+        if frame['type'] not in TABLE_FRAME_TYPES:
+            if 'match' in frame:
+                matches.append(frame['match'])
+            full['text'] = text
+            if 'window' in frame:
+                full['current_window'] = text[frame['window']:frame['window'] + len(pattern)]
+            full['matches'] = list(matches)
+        expanded.append(full)
+    return expanded
+
+# Pattern preprocessing. Tables are tuples indexed by code point for the first
+# ALPHABET_SIZE characters; wider characters fall back to the read-only maps,
+# which also hold the entries shown in visualizations.
+ALPHABET_SIZE = 256
+PATTERN_CACHE_SIZE = 256
+
+class CompiledPattern(NamedTuple):
+    """A pattern with its search tables built once; pass it anywhere a pattern string is accepted."""
+    pattern: str
+    bad_char: Tuple[int, ...]  # Last occurrence in pattern[:-1], or -1
+    shift: Tuple[int, ...]  # Horspool shift, or len(pattern)
+    bad_char_map: Mapping[str, int]
+    shift_map: Mapping[str, int]
+    lps: Tuple[int, ...]  # KMP failure function
+    z: Tuple[int, ...]  # Z-array of the pattern, z[0] = len(pattern)
+    good_suffix: Tuple[int, ...]  # Boyer-Moore shift after matching pattern[j:], for j in 0..m
+    shift_or_masks: Tuple[int, ...]  # Shift-Or mask per character: bit i is 0 where pattern[i] is that character
+    shift_or_map: Mapping[str, int]
+    myers_map: Mapping[str, int]  # Myers match mask per character: bit i is 1 where pattern[i] is that character
+
+def _failure_table(pattern: str) -> Tuple[int, ...]:
+    """lps[i] is the length of the longest proper prefix of pattern[:i+1] that is also its suffix."""
+    lps = [0] * len(pattern)
+    k = 0
+    for i in range(1, len(pattern)):
+        while k > 0 and pattern[i] != pattern[k]:
+            k = lps[k - 1]
+        if pattern[i] == pattern[k]:
+            k += 1
+        lps[i] = k
+    return tuple(lps)
+
+def _z_array(pattern: str) -> Tuple[int, ...]:
+    """z[i] is the length of the longest common prefix of pattern and pattern[i:]."""
+    m = len(pattern)
+    z = [0] * m
+    if m:
+        z[0] = m
+    l = r = 0
+    for i in range(1, m):
+        if i < r:
+            z[i] = min(r - i, z[i - l])
+        while i + z[i] < m and pattern[z[i]] == pattern[i + z[i]]:
+            z[i] += 1
+        if i + z[i] > r:
+            l, r = i, i + z[i]
+    return tuple(z)
+
+def _good_suffix_table(pattern: str) -> Tuple[int, ...]:
+    """Strong good-suffix shifts: shift[j + 1] after a mismatch at j, shift[0] after a full match."""
+    m = len(pattern)
+    shift = [0] * (m + 1)
+    border = [0] * (m + 1)
+    i, j = m, m + 1
+    border[i] = j
+    while i > 0:
+        while j <= m and pattern[i - 1] != pattern[j - 1]:
+            if shift[j] == 0:
+                shift[j] = j - i
+            j = border[j]
+        i -= 1
+        j -= 1
+        border[i] = j
+    j = border[0]
+    for i in range(m + 1):
+        if shift[i] == 0:
+            shift[i] = j
+        if i == j:
+            j = border[j]
+    return tuple(shift)
+
+@lru_cache(maxsize=PATTERN_CACHE_SIZE)
+def compile_pattern(pattern: str) -> CompiledPattern:
+    """Builds (or returns the cached) tables for ``pattern``."""
+    if not isinstance(pattern, str):
+        raise TypeError(f"Pattern must be a string, not {type(pattern).__name__}")
+    m = len(pattern)
+    bad_char = [-1] * ALPHABET_SIZE
+    shift = [m] * ALPHABET_SIZE
+    bad_char_map = {}
+    shift_map = {}
+    # Masks are negative so every bit above the pattern stays set and the state never grows
+    shift_or_masks = [-1] * ALPHABET_SIZE
+    shift_or_map = {}
+    for i, char in enumerate(pattern):
+        shift_or_map[char] = shift_or_map.get(char, -1) & ~(1 << i)
+        if ord(char) < ALPHABET_SIZE:
+            shift_or_masks[ord(char)] = shift_or_map[char]
+    for i in range(m - 1): # Last character doesn't participate in shift calculation for itself
+        bad_char_map[pattern[i]] = i
+        shift_map[pattern[i]] = m - 1 - i
+        code = ord(pattern[i])
+        if code < ALPHABET_SIZE:
+            bad_char[code] = i
+            shift[code] = m - 1 - i
+    return CompiledPattern(pattern, tuple(bad_char), tuple(shift),
+                           MappingProxyType(bad_char_map), MappingProxyType(shift_map),
+                           _failure_table(pattern), _z_array(pattern), _good_suffix_table(pattern),
+                           tuple(shift_or_masks), MappingProxyType(shift_or_map),
+                           MappingProxyType(build_myers_masks(pattern)))
+
+PatternLike = Union[str, CompiledPattern]
+
+# Approximate matching finds the pattern with up to max_errors inserted, deleted or
+# substituted characters; run_algorithm only accepts max_errors for these.
+APPROXIMATE_ALGORITHMS = ('myers',)
+DEFAULT_MAX_ERRORS = 1
+
+# Benchmark inputs. 'random' and 'dna' draw text and pattern uniformly from a
+# 26-letter and a 4-letter alphabet. The adversarial corpora are worst cases:
+# 'adversarial' (a...a against a...ab) makes left-to-right scanners re-read almost
+# the whole pattern at every alignment, 'adversarial_suffix' (a...a against ba...a)
+# does the same to right-to-left bad-character scanners, and 'periodic' matches
+# at every position.
+BENCHMARK_CORPORA = ('random', 'dna', 'adversarial', 'adversarial_suffix', 'periodic')
+BENCHMARK_SEED = 20240501  # Fixed so every benchmark run times the same inputs
+RANDOM_ALPHABET = 'abcdefghijklmnopqrstuvwxyz'
+DNA_ALPHABET = 'ACGT'
+
+class BenchmarkStopped(RuntimeError):
+    pass
+
+def benchmark_corpus(corpus: str, size: int, pattern_size: int, rng: Optional[random.Random] = None,
+                     alphabet: Optional[str] = None) -> Tuple[str, str]:
+    """Returns a (text, pattern) pair of the given sizes from one of BENCHMARK_CORPORA.
+
+    Random corpora are drawn from ``rng`` (the ``random`` module if None), and
+    from ``alphabet`` instead of the corpus's own when given.
+    """
+    if corpus in ('random', 'dna'):
+        rng = rng or random
+        alphabet = alphabet or (DNA_ALPHABET if corpus == 'dna' else RANDOM_ALPHABET)
+        text = ''.join(rng.choices(alphabet, k=size))
+        pattern = ''.join(rng.choices(alphabet, k=pattern_size))
+        return text, pattern
+    if corpus == 'adversarial':
+        return 'a' * size, 'a' * (pattern_size - 1) + 'b'
+    if corpus == 'adversarial_suffix':
+        return 'a' * size, 'b' + 'a' * (pattern_size - 1)
+    if corpus == 'periodic':
+        return 'a' * size, 'a' * pattern_size
+    raise ValueError(f"Unknown benchmark corpus: {corpus}")
 
 class StringMatchingAlgorithms:
     """
@@ -13,7 +187,12 @@ class StringMatchingAlgorithms:
         self.algorithms = {
             'naive': self.naive_search,
             'boyer_moore': self.boyer_moore_search,
-            'horspool': self.horspool_search
+            'horspool': self.horspool_search,
+            'kmp': self.kmp_search,
+            'z_algorithm': self.z_search,
+            'boyer_moore_full': self.boyer_moore_full_search,
+            'shift_or': self.shift_or_search,
+            'myers': self.myers_search
         }
         self.results = {}
 
@@ -42,7 +221,19 @@ class StringMatchingAlgorithms:
         # Add frame to visualization frames
         visualization_frames.append(frame_data)
 
-    def naive_search(self, text: str, pattern: str, visualize: bool = False) -> Dict[str, Any]:
+    def compile(self, pattern: PatternLike) -> CompiledPattern:
+        """Returns the compiled form of ``pattern``, building it on first use."""
+        if isinstance(pattern, CompiledPattern):
+            return pattern
+        return compile_pattern(pattern)
+
+    def _frame_header(self, text: str, pattern: str, **tables: Dict[str, int]) -> Dict[str, Any]:
+        """Run-wide state shared by every frame: the text, the pattern and any precomputed tables."""
+        return {'text': text, 'pattern': pattern, 'tables': tables}
+
+    def naive_search(self, text: str, pattern: PatternLike, visualize: bool = False) -> Dict[str, Any]:
+        compiled = self.compile(pattern)
+        pattern = compiled.pattern
         n = len(text)
         m = len(pattern)
         matches = []
@@ -55,13 +246,10 @@ class StringMatchingAlgorithms:
         for i in range(n - m + 1):
             self._capture_frame(visualize, {
                 'type': 'alignment',
-                'text': text,
-                'pattern': pattern,
                 'text_idx': i,
                 'pattern_idx': 0,
-                'current_window': text[i:i+m],
-                'message': f"Aligning pattern at text index {i}",
-                'matches': list(matches)
+                'window': i,
+                'message': f"Aligning pattern at text index {i}"
             }, visualization_frames)
 
             j = 0
@@ -69,25 +257,19 @@ class StringMatchingAlgorithms:
                 # comparisons += 1 # Removed for no complexity display
                 self._capture_frame(visualize, {
                     'type': 'comparison',
-                    'text': text,
-                    'pattern': pattern,
                     'text_idx': i,
                     'pattern_idx': j,
                     'match_status': (text[i+j] == pattern[j]),
-                    'current_window': text[i:i+m],
-                    'message': f"Comparing text[{i+j}] ('{text[i+j]}') with pattern[{j}] ('{pattern[j]}')",
-                    'matches': list(matches)
+                    'window': i,
+                    'message': f"Comparing text[{i+j}] ('{text[i+j]}') with pattern[{j}] ('{pattern[j]}')"
                 }, visualization_frames)
                 if text[i + j] != pattern[j]:
                     self._capture_frame(visualize, {
                         'type': 'mismatch',
-                        'text': text,
-                        'pattern': pattern,
                         'text_idx': i,
                         'pattern_idx': j,
-                        'current_window': text[i:i+m],
-                        'message': f"Mismatch! Shifting pattern by 1.",
-                        'matches': list(matches)
+                        'window': i,
+                        'message': f"Mismatch! Shifting pattern by 1."
                     }, visualization_frames)
                     break
                 j += 1
@@ -96,17 +278,18 @@ class StringMatchingAlgorithms:
                 matches.append(i)
                 self._capture_frame(visualize, {
                     'type': 'match',
-                    'text': text,
-                    'pattern': pattern,
                     'text_idx': i,
                     'pattern_idx': 0,
-                    'current_window': text[i:i+m],
+                    'window': i,
                     'message': f"Match found at index {i}!",
-                    'matches': list(matches)
+                    'match': i
                 }, visualization_frames)
-        return {'matches': matches, 'visualization_frames': visualization_frames} #, 'comparisons': comparisons}
+        return {'matches': matches, 'visualization_frames': visualization_frames,
+                'frame_header': self._frame_header(text, pattern) if visualize else None} #, 'comparisons': comparisons}
 
-    def boyer_moore_search(self, text: str, pattern: str, visualize: bool = False) -> Dict[str, Any]:
+    def boyer_moore_search(self, text: str, pattern: PatternLike, visualize: bool = False) -> Dict[str, Any]:
+        compiled = self.compile(pattern)
+        pattern = compiled.pattern
         n = len(text)
         m = len(pattern)
         matches = []
@@ -116,21 +299,22 @@ class StringMatchingAlgorithms:
         if m == 0: return {'matches': [], 'visualization_frames': []} #, 'comparisons': 0}
         if n == 0 or n < m: return {'matches': [], 'visualization_frames': []} #, 'comparisons': 0}
 
-        # Build bad character table
-        bad_char_table = self._build_bad_char_table(pattern, visualize, visualization_frames)
-        
+        bad_char = compiled.bad_char
+        bad_char_table = compiled.bad_char_map
+        self._capture_frame(visualize, {
+            'type': 'bad_char_table',
+            'message': "Built Bad Character Table: stores last occurrence of each char in pattern (excluding last char).",
+            'current_i': None
+        }, visualization_frames)
+
         s = 0  # s is shift of the pattern with respect to text
         while s <= n - m:
             self._capture_frame(visualize, {
                 'type': 'alignment',
-                'text': text,
-                'pattern': pattern,
                 'text_idx': s,
                 'pattern_idx': 0,
-                'current_window': text[s:s+m],
-                'bad_char_table': bad_char_table,
-                'message': f"Aligning pattern at text index {s}",
-                'matches': list(matches)
+                'window': s,
+                'message': f"Aligning pattern at text index {s}"
             }, visualization_frames)
 
             j = m - 1  # Start from rightmost character of pattern
@@ -138,31 +322,24 @@ class StringMatchingAlgorithms:
                 # comparisons += 1 # Removed
                 self._capture_frame(visualize, {
                     'type': 'comparison',
-                    'text': text,
-                    'pattern': pattern,
                     'text_idx': s + j,
                     'pattern_idx': j,
                     'match_status': (pattern[j] == text[s + j]),
-                    'bad_char_table': bad_char_table,
-                    'message': f"Comparing text[{s+j}] ('{text[s+j]}') with pattern[{j}] ('{pattern[j]}')",
-                    'matches': list(matches)
+                    'message': f"Comparing text[{s+j}] ('{text[s+j]}') with pattern[{j}] ('{pattern[j]}')"
                 }, visualization_frames)
 
                 if pattern[j] != text[s + j]:
                     # Get the shift from bad character table
-                    shift = bad_char_table.get(text[s + j], -1)
+                    code = ord(text[s + j])
+                    shift = bad_char[code] if code < ALPHABET_SIZE else bad_char_table.get(text[s + j], -1)
                     shift_amount = max(1, j - shift)
                     
                     self._capture_frame(visualize, {
                         'type': 'mismatch_shift',
-                        'text': text,
-                        'pattern': pattern,
                         'text_idx': s + j,
                         'pattern_idx': j,
-                        'bad_char_table': bad_char_table,
                         'shift_amount': shift_amount,
-                        'message': f"Mismatch! Shifting pattern by {shift_amount} using bad character rule",
-                        'matches': list(matches)
+                        'message': f"Mismatch! Shifting pattern by {shift_amount} using bad character rule"
                     }, visualization_frames)
                     
                     s += shift_amount
@@ -173,33 +350,18 @@ class StringMatchingAlgorithms:
                 matches.append(s)
                 self._capture_frame(visualize, {
                     'type': 'match',
-                    'text': text,
-                    'pattern': pattern,
                     'text_idx': s,
                     'pattern_idx': 0,
-                    'bad_char_table': bad_char_table,
                     'message': f"Match found at index {s}!",
-                    'matches': list(matches)
+                    'match': s
                 }, visualization_frames)
                 s += 1  # Shift by 1 to find next match
-        return {'matches': matches, 'visualization_frames': visualization_frames} #, 'comparisons': comparisons}
-
-    def _build_bad_char_table(self, pattern: str, visualize: bool, visualization_frames: List[Dict[str, Any]]) -> Dict[str, int]:
-        m = len(pattern)
-        bad_char_table = {}
-        for i in range(m - 1): # Last character doesn't participate in shift calculation for itself
-            bad_char_table[pattern[i]] = i
-        
-        self._capture_frame(visualize, {
-            'type': 'bad_char_table',
-            'pattern': pattern,
-            'bad_char_table': bad_char_table,
-            'message': "Built Bad Character Table: stores last occurrence of each char in pattern (excluding last char).",
-            'current_i': None
-        }, visualization_frames)
-        return bad_char_table
+        return {'matches': matches, 'visualization_frames': visualization_frames,
+                'frame_header': self._frame_header(text, pattern, bad_char_table=dict(bad_char_table)) if visualize else None} #, 'comparisons': comparisons}
 
-    def horspool_search(self, text: str, pattern: str, visualize: bool = False) -> Dict[str, Any]:
+    def horspool_search(self, text: str, pattern: PatternLike, visualize: bool = False) -> Dict[str, Any]:
+        compiled = self.compile(pattern)
+        pattern = compiled.pattern
         n = len(text)
         m = len(pattern)
         matches = []
@@ -210,17 +372,10 @@ class StringMatchingAlgorithms:
         if m == 0: return {'matches': [], 'visualization_frames': []} #, 'comparisons': 0, 'shifts': 0}
         if n == 0 or n < m: return {'matches': [], 'visualization_frames': []} #, 'comparisons': 0, 'shifts': 0}
 
-        # Build the shift table
-        shift_table = {}
-        for i in range(256): # Initialize with pattern length for all possible ASCII chars
-            shift_table[chr(i)] = m
-        for i in range(m - 1):
-            shift_table[pattern[i]] = m - 1 - i
-
+        shift_table = compiled.shift
+        shift_map = compiled.shift_map
         self._capture_frame(visualize, {
             'type': 'shift_table',
-            'pattern': pattern,
-            'shift_table': {k:v for k,v in shift_table.items() if v != m}, # Show relevant entries
             'message': "Built Shift Table (similar to Bad Character Rule but simpler)."
         }, visualization_frames)
 
@@ -230,29 +385,21 @@ class StringMatchingAlgorithms:
             
             self._capture_frame(visualize, {
                 'type': 'alignment',
-                'text': text,
-                'pattern': pattern,
                 'text_idx': s,
                 'pattern_idx': 0,
-                'current_window': text[s:s+m],
-                'shift_table': {k:v for k,v in shift_table.items() if v != m},
-                'message': f"Aligning pattern at text index {s}. Starting comparison from right.",
-                'matches': list(matches)
+                'window': s,
+                'message': f"Aligning pattern at text index {s}. Starting comparison from right."
             }, visualization_frames)
 
             while j >= 0:
                 # comparisons += 1 # Removed
                 self._capture_frame(visualize, {
                     'type': 'comparison',
-                    'text': text,
-                    'pattern': pattern,
                     'text_idx': s + j,
                     'pattern_idx': j,
                     'match_status': (text[s + j] == pattern[j]),
-                    'current_window': text[s:s+m],
-                    'shift_table': {k:v for k,v in shift_table.items() if v != m},
-                    'message': f"Comparing text[{s+j}] ('{text[s+j]}') with pattern[{j}] ('{pattern[j]}')",
-                    'matches': list(matches)
+                    'window': s,
+                    'message': f"Comparing text[{s+j}] ('{text[s+j]}') with pattern[{j}] ('{pattern[j]}')"
                 }, visualization_frames)
                 if pattern[j] != text[s + j]:
                     break
@@ -262,57 +409,390 @@ class StringMatchingAlgorithms:
                 matches.append(s)
                 self._capture_frame(visualize, {
                     'type': 'match',
-                    'text': text,
-                    'pattern': pattern,
                     'text_idx': s,
                     'pattern_idx': 0,
-                    'current_window': text[s:s+m],
-                    'shift_table': {k:v for k,v in shift_table.items() if v != m},
+                    'window': s,
                     'message': f"Match found at index {s}!",
-                    'matches': list(matches)
+                    'match': s
                 }, visualization_frames)
                 
                 # Shift by the shift table value for the character immediately after the match
-                shift_val = shift_table.get(text[s + m] if s + m < n else '', m)
+                shift_val = m
+                if s + m < n:
+                    code = ord(text[s + m])
+                    shift_val = shift_table[code] if code < ALPHABET_SIZE else shift_map.get(text[s + m], m)
                 # shifts += 1 # Removed
                 self._capture_frame(visualize, {
                     'type': 'shift',
-                    'text': text,
-                    'pattern': pattern,
                     'text_idx': s, # Old alignment
                     'next_char_idx': s + m, # Index of the character after the window
                     'shift_amount': shift_val,
-                    'message': f"Match. Shifting pattern by {shift_val} based on char '{text[s+m] if s+m < n else 'End of Text'}'",
-                    'matches': list(matches)
+                    'message': f"Match. Shifting pattern by {shift_val} based on char '{text[s+m] if s+m < n else 'End of Text'}'"
                 }, visualization_frames)
                 s += shift_val
             else: # Mismatch
                 # Character that caused mismatch in text
                 mismatched_char = text[s + m - 1] 
-                shift_val = shift_table.get(mismatched_char, m)
+                code = ord(mismatched_char)
+                shift_val = shift_table[code] if code < ALPHABET_SIZE else shift_map.get(mismatched_char, m)
                 # shifts += 1 # Removed
                 self._capture_frame(visualize, {
                     'type': 'shift',
-                    'text': text,
-                    'pattern': pattern,
                     'text_idx': s, # Old alignment
                     'mismatched_char_idx': s + m - 1, # Index of character causing mismatch
                     'mismatched_char': mismatched_char,
                     'shift_amount': shift_val,
-                    'message': f"Mismatch at text[{s+j}] ('{text[s+j]}'). Shifting pattern by {shift_val} based on '{mismatched_char}'.",
-                    'matches': list(matches)
+                    'message': f"Mismatch at text[{s+j}] ('{text[s+j]}'). Shifting pattern by {shift_val} based on '{mismatched_char}'."
                 }, visualization_frames)
                 s += shift_val
-        return {'matches': matches, 'visualization_frames': visualization_frames} #, 'comparisons': comparisons, 'shifts': shifts}
+        return {'matches': matches, 'visualization_frames': visualization_frames,
+                'frame_header': self._frame_header(text, pattern, shift_table=dict(shift_map)) if visualize else None} #, 'comparisons': comparisons, 'shifts': shifts}
 
-    def run_algorithm(self, algorithm: str, text: str, pattern: str, visualize: bool = False) -> Dict[str, Any]:
-        """Runs the specified algorithm and returns the results."""
+    def kmp_search(self, text: str, pattern: PatternLike, visualize: bool = False) -> Dict[str, Any]:
+        compiled = self.compile(pattern)
+        pattern = compiled.pattern
+        n = len(text)
+        m = len(pattern)
+        matches = []
+        visualization_frames = []
+
+        if m == 0: return {'matches': [], 'visualization_frames': []}
+        if n == 0 or n < m: return {'matches': [], 'visualization_frames': []}
+
+        lps = compiled.lps
+        self._capture_frame(visualize, {
+            'type': 'lps_table',
+            'message': "Built Failure Table (LPS): longest proper prefix of pattern[:i+1] that is also its suffix."
+        }, visualization_frames)
+
+        j = 0  # Number of pattern characters matched so far; text is never re-read
+        for i in range(n):
+            while True:
+                equal = text[i] == pattern[j]
+                self._capture_frame(visualize, {
+                    'type': 'comparison',
+                    'text_idx': i,
+                    'pattern_idx': j,
+                    'match_status': equal,
+                    'window': i - j,
+                    'message': f"Comparing text[{i}] ('{text[i]}') with pattern[{j}] ('{pattern[j]}')"
+                }, visualization_frames)
+                if equal or j == 0:
+                    break
+                fallback = lps[j - 1]
+                self._capture_frame(visualize, {
+                    'type': 'mismatch_shift',
+                    'text_idx': i,
+                    'pattern_idx': j,
+                    'shift_amount': j - fallback,
+                    'message': f"Mismatch! LPS[{j-1}] = {fallback}, so the first {fallback} characters still match. Shifting pattern by {j - fallback}."
+                }, visualization_frames)
+                j = fallback
+
+            if equal:
+                j += 1
+                if j == m:
+                    s = i - m + 1
+                    matches.append(s)
+                    self._capture_frame(visualize, {
+                        'type': 'match',
+                        'text_idx': s,
+                        'pattern_idx': 0,
+                        'window': s,
+                        'message': f"Match found at index {s}! Continuing from LPS[{m-1}] = {lps[m-1]}.",
+                        'match': s
+                    }, visualization_frames)
+                    j = lps[m - 1]
+        return {'matches': matches, 'visualization_frames': visualization_frames,
+                'frame_header': self._frame_header(text, pattern, lps=list(lps)) if visualize else None}
+
+    def z_search(self, text: str, pattern: PatternLike, visualize: bool = False) -> Dict[str, Any]:
+        compiled = self.compile(pattern)
+        pattern = compiled.pattern
+        n = len(text)
+        m = len(pattern)
+        matches = []
+        visualization_frames = []
+
+        if m == 0: return {'matches': [], 'visualization_frames': []}
+        if n == 0 or n < m: return {'matches': [], 'visualization_frames': []}
+
+        z = compiled.z
+        self._capture_frame(visualize, {
+            'type': 'z_table',
+            'message': "Built Z-array of the pattern: Z[i] is how many characters of pattern[i:] match the pattern's prefix."
+        }, visualization_frames)
+
+        # text[l:r] is the rightmost Z-box found so far: it equals pattern[:r-l]
+        l = r = 0
+        for i in range(n - m + 1):
+            length = 0
+            if i < r:
+                length = min(z[i - l], r - i)
+                self._capture_frame(visualize, {
+                    'type': 'z_box',
+                    'text_idx': i,
+                    'pattern_idx': length,
+                    'window': i,
+                    'message': f"Inside Z-box [{l}, {r}): Z[{i-l}] = {z[i-l]}, so {length} characters match without comparing."
+                }, visualization_frames)
+                if length < r - i:
+                    continue  # The box already proves text[i:] falls short of a full match
+            else:
+                self._capture_frame(visualize, {
+                    'type': 'alignment',
+                    'text_idx': i,
+                    'pattern_idx': 0,
+                    'window': i,
+                    'message': f"Aligning pattern at text index {i}"
+                }, visualization_frames)
+
+            while length < m:
+                equal = text[i + length] == pattern[length]
+                self._capture_frame(visualize, {
+                    'type': 'comparison',
+                    'text_idx': i + length,
+                    'pattern_idx': length,
+                    'match_status': equal,
+                    'window': i,
+                    'message': f"Comparing text[{i+length}] ('{text[i+length]}') with pattern[{length}] ('{pattern[length]}')"
+                }, visualization_frames)
+                if not equal:
+                    break
+                length += 1
+            if i + length > r:
+                l, r = i, i + length
+
+            if length == m:
+                matches.append(i)
+                self._capture_frame(visualize, {
+                    'type': 'match',
+                    'text_idx': i,
+                    'pattern_idx': 0,
+                    'window': i,
+                    'message': f"Match found at index {i}!",
+                    'match': i
+                }, visualization_frames)
+        return {'matches': matches, 'visualization_frames': visualization_frames,
+                'frame_header': self._frame_header(text, pattern, z_array=list(z)) if visualize else None}
+
+    def boyer_moore_full_search(self, text: str, pattern: PatternLike, visualize: bool = False) -> Dict[str, Any]:
+        """Boyer-Moore with the bad character and strong good suffix rules, plus Galil's rule."""
+        compiled = self.compile(pattern)
+        pattern = compiled.pattern
+        n = len(text)
+        m = len(pattern)
+        matches = []
+        visualization_frames = []
+
+        if m == 0: return {'matches': [], 'visualization_frames': []}
+        if n == 0 or n < m: return {'matches': [], 'visualization_frames': []}
+
+        bad_char = compiled.bad_char
+        bad_char_table = compiled.bad_char_map
+        good_suffix = compiled.good_suffix
+        self._capture_frame(visualize, {
+            'type': 'bad_char_table',
+            'message': "Built Bad Character Table: stores last occurrence of each char in pattern (excluding last char).",
+            'current_i': None
+        }, visualization_frames)
+        self._capture_frame(visualize, {
+            'type': 'good_suffix_table',
+            'message': "Built Good Suffix Table: how far the pattern can shift once pattern[j+1:] has matched."
+        }, visualization_frames)
+
+        s = 0
+        known = 0  # Galil's rule: pattern[:known] is already known to match at this alignment
+        while s <= n - m:
+            self._capture_frame(visualize, {
+                'type': 'alignment',
+                'text_idx': s,
+                'pattern_idx': 0,
+                'window': s,
+                'message': f"Aligning pattern at text index {s}" + (f"; pattern[:{known}] is known to match" if known else "")
+            }, visualization_frames)
+
+            j = m - 1
+            while j >= known:
+                equal = pattern[j] == text[s + j]
+                self._capture_frame(visualize, {
+                    'type': 'comparison',
+                    'text_idx': s + j,
+                    'pattern_idx': j,
+                    'match_status': equal,
+                    'message': f"Comparing text[{s+j}] ('{text[s+j]}') with pattern[{j}] ('{pattern[j]}')"
+                }, visualization_frames)
+                if not equal:
+                    break
+                j -= 1
+
+            if j < known:  # Pattern found
+                matches.append(s)
+                shift_amount = good_suffix[0]
+                self._capture_frame(visualize, {
+                    'type': 'match',
+                    'text_idx': s,
+                    'pattern_idx': 0,
+                    'message': f"Match found at index {s}!",
+                    'match': s
+                }, visualization_frames)
+                self._capture_frame(visualize, {
+                    'type': 'shift',
+                    'text_idx': s,
+                    'shift_amount': shift_amount,
+                    'message': f"Shifting pattern by its period {shift_amount}; Galil's rule skips re-comparing the first {m - shift_amount} characters."
+                }, visualization_frames)
+                known = m - shift_amount
+                s += shift_amount
+            else:
+                code = ord(text[s + j])
+                last = bad_char[code] if code < ALPHABET_SIZE else bad_char_table.get(text[s + j], -1)
+                shift_amount = max(good_suffix[j + 1], j - last)
+                rule = "good suffix" if good_suffix[j + 1] >= j - last else "bad character"
+                self._capture_frame(visualize, {
+                    'type': 'mismatch_shift',
+                    'text_idx': s + j,
+                    'pattern_idx': j,
+                    'shift_amount': shift_amount,
+                    'message': f"Mismatch! Shifting pattern by {shift_amount} using the {rule} rule"
+                }, visualization_frames)
+                known = 0
+                s += shift_amount
+        return {'matches': matches, 'visualization_frames': visualization_frames,
+                'frame_header': self._frame_header(text, pattern, bad_char_table=dict(bad_char_table),
+                                                   good_suffix=list(good_suffix)) if visualize else None}
+
+    def shift_or_search(self, text: str, pattern: PatternLike, visualize: bool = False) -> Dict[str, Any]:
+        """Bit-parallel Shift-Or: bit i of the state is 0 while pattern[:i+1] matches the text read so far."""
+        compiled = self.compile(pattern)
+        pattern = compiled.pattern
+        n = len(text)
+        m = len(pattern)
+        matches = []
+        visualization_frames = []
+
+        if m == 0: return {'matches': [], 'visualization_frames': []}
+        if n == 0 or n < m: return {'matches': [], 'visualization_frames': []}
+
+        masks = compiled.shift_or_masks
+        mask_map = compiled.shift_or_map
+        self._capture_frame(visualize, {
+            'type': 'mask_table',
+            'message': "Built character masks: bit i is 0 where pattern[i] is that character. Each text character costs one shift and one OR."
+        }, visualization_frames)
+
+        found_bit = 1 << (m - 1)
+        state_bits = 2 * found_bit - 1
+        state = -1
+        for i in range(n):
+            code = ord(text[i])
+            state = (state << 1) | (masks[code] if code < ALPHABET_SIZE else mask_map.get(text[i], -1))
+            self._capture_frame(visualize, {
+                'type': 'character_check',
+                'text_idx': i,
+                'pattern_idx': -1,
+                'state': format(state & state_bits, f'0{m}b'),
+                'message': f"Read text[{i}] ('{text[i]}'): state = (state << 1) | mask['{text[i]}'] = {format(state & state_bits, f'0{m}b')}"
+            }, visualization_frames)
+            if not state & found_bit:
+                s = i - m + 1
+                matches.append(s)
+                self._capture_frame(visualize, {
+                    'type': 'match',
+                    'text_idx': s,
+                    'pattern_idx': 0,
+                    'window': s,
+                    'message': f"Bit {m-1} of the state is 0: match found at index {s}!",
+                    'match': s
+                }, visualization_frames)
+        masks_shown = {char: format(mask & state_bits, f'0{m}b') for char, mask in mask_map.items()}
+        return {'matches': matches, 'visualization_frames': visualization_frames,
+                'frame_header': self._frame_header(text, pattern, masks=masks_shown) if visualize else None}
+
+    def myers_search(self, text: str, pattern: PatternLike, visualize: bool = False,
+                     max_errors: int = None) -> Dict[str, Any]:
+        """Myers' bit-parallel approximate search: every occurrence within ``max_errors`` edits.
+
+        The last column of the edit-distance table is kept as bit-vectors of +1 (Pv)
+        and -1 (Mv) vertical deltas, so each text character costs a fixed number of
+        operations on m-bit integers. Every exact occurrence is reported; a run of
+        consecutive end positions within the limit that contains none is one
+        approximate occurrence, traced back from its closest end. ``distances``
+        holds each occurrence's edit count.
+        """
+        compiled = self.compile(pattern)
+        pattern = compiled.pattern
+        n = len(text)
+        m = len(pattern)
+        visualization_frames = []
+
+        if m == 0: return {'matches': [], 'visualization_frames': []}
+        if max_errors is None:
+            max_errors = min(DEFAULT_MAX_ERRORS, m - 1)
+        if not 0 <= max_errors < m:
+            raise ValueError(f"max_errors must be between 0 and {m - 1} for this pattern")
+        if n == 0: return {'matches': [], 'distances': [], 'max_errors': max_errors, 'visualization_frames': []}
+
+        mask_map = compiled.myers_map
+        self._capture_frame(visualize, {
+            'type': 'mask_table',
+            'message': f"Built character masks: bit i is 1 where pattern[i] is that character. A match may contain up to {max_errors} edit(s)."
+        }, visualization_frames)
+
+        on_step = on_match = None
+        if visualize:
+            def on_step(i: int, score: int) -> None:
+                self._capture_frame(visualize, {
+                    'type': 'character_check',
+                    'text_idx': i,
+                    'pattern_idx': -1,
+                    'match_status': score <= max_errors,
+                    'distance': score,
+                    'message': f"Read text[{i}] ('{text[i]}'): best edit distance of the pattern ending here is {score}"
+                }, visualization_frames)
+
+            def on_match(s: int, end: int, distance: int) -> None:
+                self._capture_frame(visualize, {
+                    'type': 'match',
+                    'text_idx': s,
+                    'pattern_idx': 0,
+                    'window': s,
+                    'message': f"Match with {distance} edit(s) found at index {s} (text[{s}:{end + 1}] = '{text[s:end + 1]}')!",
+                    'match': s
+                }, visualization_frames)
+
+        best = myers_scan(text, pattern, max_errors, mask_map.get, on_step=on_step, on_match=on_match)
+        matches = sorted(best)
+        masks_shown = {char: format(mask, f'0{m}b') for char, mask in mask_map.items()}
+        return {'matches': matches, 'distances': [best[s] for s in matches], 'max_errors': max_errors,
+                'visualization_frames': visualization_frames,
+                'frame_header': self._frame_header(text, pattern, masks=masks_shown) if visualize else None}
+
+    def run_algorithm(self, algorithm: str, text: str, pattern: PatternLike, visualize: bool = False,
+                      frame_format: str = 'full', max_errors: int = None) -> Dict[str, Any]:
+        """Runs the specified algorithm and returns the results.
+
+        With ``frame_format='delta'`` the frames are returned as recorded, with the
+        text, pattern and tables once in ``frame_header``; see ``expand_frames``.
+        ``max_errors`` applies to APPROXIMATE_ALGORITHMS only.
+        """
         if algorithm not in self.algorithms:
             raise ValueError(f"Unknown algorithm: {algorithm}")
+        if frame_format not in FRAME_FORMATS:
+            raise ValueError(f"Unknown frame format: {frame_format}")
+        compiled = self.compile(pattern)
+        options = {}
+        if max_errors is not None:
+            if algorithm not in APPROXIMATE_ALGORITHMS:
+                raise ValueError(f"max_errors is only supported by: {', '.join(APPROXIMATE_ALGORITHMS)}")
+            limit = max(len(compiled.pattern) - 1, 0)
+            if not isinstance(max_errors, int) or isinstance(max_errors, bool) or not 0 <= max_errors <= limit:
+                raise ValueError(f"max_errors must be an integer between 0 and {limit}")
+            options['max_errors'] = max_errors
         
         start_time = time.time()
         try:
-            result = self.algorithms[algorithm](text, pattern, visualize)
+            result = self.algorithms[algorithm](text, compiled, visualize, **options)
             
             # Validate result structure
             if not isinstance(result, dict):
@@ -333,6 +813,12 @@ class StringMatchingAlgorithms:
                 result['visualization_frames'] = []
             
             end_time = time.time()
+            header = result.pop('frame_header', None) or self._frame_header(text, compiled.pattern)
+            if visualize and frame_format == 'delta':
+                result['frame_format'] = frame_format
+                result['frame_header'] = header
+            elif result['visualization_frames']:
+                result['visualization_frames'] = expand_frames(header, result['visualization_frames'])
             result['algorithm'] = algorithm
             result['execution_time'] = end_time - start_time
             return result
@@ -348,36 +834,48 @@ class StringMatchingAlgorithms:
                 'error': str(e)
             }
 
-    def compare_algorithms(self, text: str, pattern: str, algorithms: List[str] = None) -> Dict[str, Dict[str, Any]]:
+    def compare_algorithms(self, text: str, pattern: PatternLike, algorithms: List[str] = None) -> Dict[str, Dict[str, Any]]:
         if algorithms is None:
             algorithms = list(self.algorithms.keys())
         
+        compiled = self.compile(pattern)
         results = {}
         for algo in algorithms:
             if algo in self.algorithms:
-                results[algo] = self.run_algorithm(algo, text, pattern)
+                results[algo] = self.run_algorithm(algo, text, compiled)
         return results
 
     def benchmark_algorithms(self, text_sizes: List[int] = None, pattern_size: int = 5,
-                           num_trials: int = 10) -> Tuple[Dict[str, List[float]], List[int]]:
-        if text_sizes is None:
-            text_sizes = [100, 500, 1000, 2000, 5000, 10000]
-        
+                           num_trials: int = 10, corpus: str = 'random',
+                           seed: int = BENCHMARK_SEED,
+                           should_stop: Optional[Callable[[], bool]] = None) -> Tuple[Dict[str, List[float]], List[int]]:
+        """Median search times per algorithm, per text size, and the sizes benchmarked.
+
+        Each trial searches with a pattern compiled beforehand, so search times leave
+        out preprocessing; benchmark_preprocessing times the compile step on the
+        same inputs. Inputs are drawn from ``seed``, so runs with the same
+        arguments time the same text, and each algorithm gets one untimed warmup
+        run per size. ``should_stop`` is checked before every run; once it
+        returns True the benchmark raises BenchmarkStopped.
+        """
         results = {algo: [] for algo in self.algorithms}
         valid_sizes = []
         
-        for size in text_sizes:
-            # Generate random text and pattern
-            text = ''.join(random.choices('abcdefghijklmnopqrstuvwxyz', k=size))
-            pattern = ''.join(random.choices('abcdefghijklmnopqrstuvwxyz', k=pattern_size))
+        for size, text, pattern in self._benchmark_inputs(text_sizes, pattern_size, corpus, seed):
+            compiled = self.compile(pattern)
             
             # Run each algorithm multiple times
             for algo in self.algorithms:
+                if should_stop is not None and should_stop():
+                    raise BenchmarkStopped("Benchmark stopped")
+                self.algorithms[algo](text, compiled)
                 times = []
                 for _ in range(num_trials):
-                    start_time = time.time()
-                    self.algorithms[algo](text, pattern)
-                    end_time = time.time()
+                    if should_stop is not None and should_stop():
+                        raise BenchmarkStopped("Benchmark stopped")
+                    start_time = time.perf_counter()
+                    self.algorithms[algo](text, compiled)
+                    end_time = time.perf_counter()
                     times.append(end_time - start_time)
                 
                 # Use median time to avoid outliers
@@ -386,4 +884,33 @@ class StringMatchingAlgorithms:
             
             valid_sizes.append(size)
         
-        return results, valid_sizes
\ No newline at end of file
+        return results, valid_sizes
+
+    def benchmark_preprocessing(self, text_sizes: List[int] = None, pattern_size: int = 5,
+                                num_trials: int = 10, corpus: str = 'random',
+                                seed: int = BENCHMARK_SEED) -> List[float]:
+        """Median pattern compile time per text size, for the patterns benchmark_algorithms searches with.
+
+        Each trial builds the tables without the compile cache.
+        """
+        preprocessing = []
+        for _, _, pattern in self._benchmark_inputs(text_sizes, pattern_size, corpus, seed):
+            compile_times = []
+            for _ in range(num_trials):
+                start_time = time.perf_counter()
+                compile_pattern.__wrapped__(pattern)
+                compile_times.append(time.perf_counter() - start_time)
+            preprocessing.append(sorted(compile_times)[num_trials // 2])
+        return preprocessing
+
+    @staticmethod
+    def _benchmark_inputs(text_sizes: Optional[List[int]], pattern_size: int, corpus: str,
+                          seed: int) -> Iterator[Tuple[int, str, str]]:
+        if text_sizes is None:
+            text_sizes = [100, 500, 1000, 2000, 5000, 10000]
+        if corpus not in BENCHMARK_CORPORA:
+            raise ValueError(f"Unknown benchmark corpus: {corpus}")
+        rng = random.Random(seed)
+        for size in text_sizes:
+            text, pattern = benchmark_corpus(corpus, size, pattern_size, rng)
+            yield size, text, pattern
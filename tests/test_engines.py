@@ -0,0 +1,130 @@
+# test_engines.py
+
+# Every exact engine against a brute-force scan, and Myers' approximate matching
+# against the edit-distance table it stands in for.
+import random
+
+import pytest
+
+import backend
+from approximate_matching import build_myers_masks, myers_scan
+from string_matching_algorithms import APPROXIMATE_ALGORITHMS, StringMatchingAlgorithms
+
+def occurrences(text, pattern):
+    return [i for i in range(len(text) - len(pattern) + 1) if text.startswith(pattern, i)]
+
+def edit_distance(a, b):
+    row = list(range(len(b) + 1))
+    for i, char in enumerate(a, 1):
+        previous, row = row, [i]
+        for j, other in enumerate(b, 1):
+            row.append(min(previous[j] + 1, row[j - 1] + 1, previous[j - 1] + (char != other)))
+    return row[-1]
+
+def ending_scores(text, pattern):
+    """Fewest edits of pattern against any substring of text ending at each position."""
+    column = list(range(len(pattern) + 1))
+    scores = []
+    for char in text:
+        previous, column = column, [0]
+        for i, pattern_char in enumerate(pattern, 1):
+            column.append(min(previous[i] + 1, column[i - 1] + 1, previous[i - 1] + (pattern_char != char)))
+        scores.append(column[-1])
+    return scores
+
+def random_cases(seed, count, alphabet="abc", max_text=40, max_pattern=6):
+    rng = random.Random(seed)
+    for _ in range(count):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, max_text)))
+        pattern = "".join(rng.choice(alphabet) for _ in range(rng.randint(1, max_pattern)))
+        yield text, pattern
+
+@pytest.mark.parametrize("method", backend.DETECTION_METHODS)
+@pytest.mark.parametrize("all_matches", [False, True])
+def test_detection_methods_match_brute_force(method, all_matches):
+    rng = random.Random(7)
+    patterns = sorted({"".join(rng.choice("abAB/") for _ in range(rng.randint(1, 4))).lower() for _ in range(12)})
+    logs = ["".join(rng.choice("abAB/ x") for _ in range(rng.randint(0, 30))) for _ in range(200)]
+    rule_set = backend.compile_rule_set(patterns)
+    expected = []
+    for log in logs:
+        for pattern in patterns:
+            found = occurrences(backend.fold_case(log), pattern)
+            if found:
+                expected.append((log, pattern, found, len(found)))
+                if not all_matches:
+                    break
+    detections = backend.detect_intrusions(logs, rule_set, method, backend.Tracer(backend.TRACE_OFF),
+                                           all_matches=all_matches)
+    assert [(log, pattern, indices, count) for log, pattern, _, _, indices, count in detections] == expected
+
+@pytest.mark.parametrize("name", ["naive_search", "kmp_search", "horspool_search", "boyer_moore_search",
+                                  "shift_or_search"])
+def test_single_pattern_searches_match_brute_force(name):
+    search = getattr(backend, name)
+    for text, pattern in random_cases(1, 500):
+        found, indices = search(text, pattern)
+        assert indices == occurrences(text, pattern), (text, pattern)
+        assert found == bool(indices)
+
+def test_myers_scores_match_edit_distance_table():
+    for text, pattern in random_cases(2, 500):
+        scores = []
+        myers_scan(text, pattern, 0, build_myers_masks(pattern).get, on_step=lambda j, score: scores.append(score))
+        assert scores == ending_scores(text, pattern), (text, pattern)
+
+@pytest.mark.parametrize("seed", [3, 4])
+def test_myers_occurrences_are_real_alignments(seed):
+    for text, pattern in random_cases(seed, 600):
+        for max_errors in range(len(pattern)):
+            found = myers_scan(text, pattern, max_errors, build_myers_masks(pattern).get)
+            for start in occurrences(text, pattern):
+                assert found.get(start) == 0, (text, pattern, max_errors)
+            for start, distance in found.items():
+                assert distance <= max_errors
+                assert any(edit_distance(text[start:end], pattern) == distance for end in range(start, len(text) + 1))
+            assert bool(found) == any(score <= max_errors for score in ending_scores(text, pattern))
+
+def test_backend_myers_search_folds_case_and_sorts():
+    for text, pattern in random_cases(5, 300, alphabet="aAbB"):
+        max_errors = len(pattern) // 2
+        found, indices = backend.myers_search(text, pattern, max_errors, ignore_case=True)
+        expected = myers_scan(text.lower(), pattern.lower(), max_errors, build_myers_masks(pattern.lower()).get)
+        assert indices == sorted(expected)
+        assert found == bool(expected)
+
+def test_approximate_rules_use_myers_with_every_method():
+    logs = ["GET /?q=<scr ipt>alert(1)", "GET /index.html", "id=1 UNI0N SELECT password"]
+    rule_set = backend.compile_rule_set(["<script>", "union select"], max_errors={"<script>": 1, "union select": 1})
+    for method in backend.DETECTION_METHODS:
+        detections = backend.detect_intrusions(logs, rule_set, method, backend.Tracer(backend.TRACE_OFF))
+        assert [(log, pattern, indices) for log, pattern, _, _, indices, _ in detections] == [
+            (logs[0], "<script>", [8]), (logs[2], "union select", [5])]
+
+@pytest.mark.parametrize("algorithm", sorted(set(StringMatchingAlgorithms().algorithms) - set(APPROXIMATE_ALGORITHMS)))
+def test_string_matching_algorithms_match_brute_force(algorithm):
+    algorithms = StringMatchingAlgorithms()
+    for text, pattern in random_cases(6, 300):
+        result = algorithms.run_algorithm(algorithm, text, pattern)
+        assert "error" not in result
+        assert sorted(result["matches"]) == occurrences(text, pattern), (text, pattern)
+
+def test_string_matching_myers_reports_occurrences_and_distances():
+    algorithms = StringMatchingAlgorithms()
+    for text, pattern in random_cases(8, 300):
+        for max_errors in range(len(pattern)):
+            result = algorithms.run_algorithm("myers", text, pattern, max_errors=max_errors)
+            expected = myers_scan(text, pattern, max_errors, build_myers_masks(pattern).get)
+            assert result["matches"] == sorted(expected)
+            if max_errors == 0:
+                assert result["matches"] == occurrences(text, pattern)
+            if text:
+                assert result["distances"] == [expected[start] for start in sorted(expected)]
+
+def test_string_matching_myers_frames_follow_the_scan():
+    result = StringMatchingAlgorithms().run_algorithm("myers", "xx<scr1pt>yy", "<script>", visualize=True,
+                                                      max_errors=1)
+    frames = result["visualization_frames"]
+    assert result["matches"] == [2]
+    assert [frame["type"] for frame in frames].count("character_check") == len("xx<scr1pt>yy")
+    assert [frame["text_idx"] for frame in frames if frame["type"] == "match"] == [2]
@@ -0,0 +1,101 @@
+# test_jobs.py
+
+# Background detection jobs: completion, cancellation and failure.
+import threading
+
+import pytest
+
+import backend
+
+TIMEOUT = 10.0
+
+@pytest.fixture
+def manager():
+    finished = {}
+    events = {}
+
+    def on_finish(job):
+        finished[job.id] = job.state
+        events.setdefault(job.id, threading.Event()).set()
+
+    jobs = backend.DetectionJobManager(max_workers=1, on_finish=on_finish)
+
+    def wait(job):
+        assert events.setdefault(job.id, threading.Event()).wait(TIMEOUT)
+        return finished[job.id]
+
+    jobs.wait = wait
+    yield jobs
+    jobs.shutdown()
+
+def make_logs(count):
+    return [f"GET /page/{i}" + (" <script>" if i % 7 == 0 else "") for i in range(count)]
+
+def make_job(logs, method="kmp"):
+    return backend.DetectionJob(logs, backend.compile_rule_set(backend.attack_patterns), method,
+                                tracer=backend.Tracer(backend.TRACE_OFF))
+
+def test_completed_job_reports_every_detection_in_line_order(manager):
+    logs = make_logs(3 * backend.JOB_CHUNK_LINES + 5)
+    job = manager.submit(make_job(logs))
+    assert manager.wait(job) == backend.JOB_COMPLETED
+    expected = list(backend.iter_detections(logs, job.rule_set, "kmp", backend.Tracer(backend.TRACE_OFF)))
+    assert [(position, detection[:3]) for position, detection in job.detections] == \
+        [(position, detection[:3]) for position, detection in expected]
+    status = job.to_dict()
+    assert (status["lines_processed"], status["progress"], status["total_detections"]) == (len(logs), 1.0,
+                                                                                           len(expected))
+    assert job.bytes_processed == sum(len(log.encode("utf-8")) for log in logs)
+    assert job.results(1, 2) == job.detections[1:3]
+    assert job.logs == []
+
+def test_job_cancelled_before_it_starts_scans_nothing(manager):
+    job = make_job(make_logs(100))
+    job.cancel()
+    manager.submit(job)
+    assert manager.wait(job) == backend.JOB_CANCELLED
+    assert (job.lines_processed, job.detections, job.logs) == (0, [], [])
+    assert manager.state_counts()[backend.JOB_CANCELLED] == 1
+
+class CancellingLogs(list):
+    """Cancels ``job`` once the first chunk has been taken."""
+
+    job = None
+
+    def __getitem__(self, index):
+        chunk = super().__getitem__(index)
+        if isinstance(index, slice):
+            self.job.cancel()
+        return chunk
+
+def test_job_cancelled_while_running_stops_between_chunks(manager):
+    logs = CancellingLogs(make_logs(3 * backend.JOB_CHUNK_LINES))
+    job = make_job(logs)
+    logs.job = job
+    manager.submit(job)
+    assert manager.wait(job) == backend.JOB_CANCELLED
+    assert job.lines_processed == backend.JOB_CHUNK_LINES
+    assert job.detections
+    assert all(position < backend.JOB_CHUNK_LINES for position, _ in job.detections)
+    assert job.logs == []
+
+def test_failed_job_records_the_error_and_drops_its_input(manager):
+    job = manager.submit(make_job(make_logs(10), method="no_such_method"))
+    assert manager.wait(job) == backend.JOB_FAILED
+    assert "no_such_method" in job.to_dict()["error"]
+    assert job.logs == []
+    assert job.finished_at is not None
+    assert manager.get(job.id) is job
+
+def test_queue_rejects_jobs_beyond_the_pending_limit():
+    jobs = backend.DetectionJobManager(max_workers=1, max_pending=1)
+    release = threading.Event()
+    blocker = make_job(make_logs(10))
+    blocker.run = lambda: release.wait(TIMEOUT)
+    try:
+        jobs.submit(blocker)
+        with pytest.raises(backend.JobQueueFull):
+            jobs.submit(make_job(make_logs(10)))
+    finally:
+        release.set()
+        jobs.shutdown()
@@ -0,0 +1,64 @@
+# test_metrics.py
+
+# The Prometheus text exposition written by metrics.py and served at /metrics.
+import pytest
+
+import metrics
+
+def test_registry_renders_prometheus_text():
+    registry = metrics.Registry()
+    requests = registry.counter("requests_total", "Requests.", ("route", "status"))
+    requests.labels("/api/detect", 200).inc()
+    requests.labels("/api/detect", 200).inc(2)
+    requests.labels('/a"b\\c\nd', 404).inc()
+    registry.gauge("queue_depth", "Queued jobs.").set(1.5)
+    latency = registry.histogram("latency_seconds", "Latency.", buckets=(1.0, 0.25))
+    for value in (0.125, 0.25, 0.5, 4.0):
+        latency.observe(value)
+    assert registry.render() == "\n".join([
+        "# HELP requests_total Requests.",
+        "# TYPE requests_total counter",
+        'requests_total{route="/a\\"b\\\\c\\nd",status="404"} 1',
+        'requests_total{route="/api/detect",status="200"} 3',
+        "# HELP queue_depth Queued jobs.",
+        "# TYPE queue_depth gauge",
+        "queue_depth 1.5",
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{le="0.25"} 2',
+        'latency_seconds_bucket{le="1"} 3',
+        'latency_seconds_bucket{le="+Inf"} 4',
+        "latency_seconds_sum 4.875",
+        "latency_seconds_count 4",
+    ]) + "\n"
+
+def test_collectors_run_before_each_render():
+    registry = metrics.Registry()
+    total = registry.counter("kept_elsewhere_total", "A total refreshed at scrape time.")
+    values = iter([7, 9])
+    registry.on_collect(lambda: total.labels().set(next(values)))
+    assert "kept_elsewhere_total 7\n" in registry.render()
+    assert "kept_elsewhere_total 9\n" in registry.render()
+
+def test_label_count_is_checked():
+    counter = metrics.Registry().counter("hits_total", "Hits.", ("attack_type",))
+    with pytest.raises(ValueError):
+        counter.labels("XSS", "extra")
+
+def test_metrics_endpoint_counts_detection_requests():
+    unified_app = pytest.importorskip("unified_app")
+    client = unified_app.app.test_client()
+    logs = ["GET /<script>", "GET /café"]
+    before = unified_app.BYTES_SCANNED.labels("kmp", "batch").value
+    response = client.post("/api/detect", json={"logs": logs, "algorithm": "kmp"})
+    assert response.status_code == 200
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.content_type == metrics.CONTENT_TYPE
+    body = response.get_data(as_text=True)
+    assert "# TYPE ids_lines_scanned_total counter" in body
+    assert 'ids_lines_scanned_total{algorithm="kmp",mode="batch"}' in body
+    assert 'ids_detection_duration_seconds_bucket{algorithm="kmp",mode="batch",le="+Inf"}' in body
+    assert 'ids_pattern_hits_total{attack_type="XSS"}' in body
+    # Bytes are counted in UTF-8, so the accented line adds one byte more than its length
+    assert unified_app.BYTES_SCANNED.labels("kmp", "batch").value - before == sum(len(log) for log in logs) + 1
@@ -1,24 +1,170 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, g, request, jsonify, render_template, send_from_directory, stream_with_context
 import time
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-import io
-import base64
-import seaborn as sns
+import json
+import gzip
+from collections import Counter
 import sys
 import os
+import io
+import atexit
+
+from werkzeug.sansio.multipart import Data, Epilogue, File, MultipartDecoder, NeedData
+
+import metrics
+import profiling
 
 # Add the string_match directory to the path to import the algorithms
 sys.path.append('string_match')
 from string_matching_algorithms import StringMatchingAlgorithms
+from benchmark_jobs import (BenchmarkJobManager, BenchmarkQueueFull, benchmark_params,
+                            JOB_COMPLETED as BENCHMARK_COMPLETED)
 
 # Import intrusion detection backend
 sys.path.append('intrusion-detection-web')
-from backend import detect_intrusions, attack_patterns
+from backend import (iter_detections, iter_detections_parallel, detect_intrusions_stream, iter_log_lines,
+                     attack_patterns, compile_rule_set, format_steps, Tracer, TRACE_OFF, TRACE_SUMMARY,
+                     DEFAULT_TRACE_BUDGET, DETECTION_METHODS, PREFILTERS, PREFILTER_NONE, PrefilterStats, line_result_cache,
+                     DetectionJob, DetectionJobManager, JobQueueFull, JOB_FINISHED_STATES, RuleSetWatcher,
+                     normalize_cache, utf8_size)
 
 app = Flask(__name__)
 sma = StringMatchingAlgorithms()
+# Attack patterns are preprocessed once per process and shared by every request
+detection_rules = compile_rule_set(attack_patterns)
+# Canonical patterns matched against URL/HTML-decoded lines ("normalize": true)
+normalized_detection_rules = compile_rule_set(attack_patterns, normalize=True)
+# With IDS_RULES_FILE set, rules come from that file and are swapped in as it changes
+RULES_FILE = os.environ.get('IDS_RULES_FILE')
+rule_watcher = RuleSetWatcher(RULES_FILE).start() if RULES_FILE else None
+
+def current_rule_set(normalize=False):
+    """The rule set new requests should use; a request keeps the one it took even if the rules are reloaded."""
+    if rule_watcher is not None:
+        return rule_watcher.get(normalize)
+    return normalized_detection_rules if normalize else detection_rules
+
+# Metrics
+# Exposed at /metrics. Rates such as lines scanned per second come from rate() over the counters.
+metrics_registry = metrics.Registry()
+REQUEST_LATENCY = metrics_registry.histogram('ids_http_request_duration_seconds',
+                                             'Time to produce a response, by route.', ('route', 'method'))
+REQUESTS = metrics_registry.counter('ids_http_requests_total', 'Responses sent, by route and status.',
+                                    ('route', 'method', 'status'))
+DETECTION_LATENCY = metrics_registry.histogram('ids_detection_duration_seconds',
+                                               'Time spent scanning one batch, stream or job.', ('algorithm', 'mode'))
+LINES_SCANNED = metrics_registry.counter('ids_lines_scanned_total', 'Log lines scanned.', ('algorithm', 'mode'))
+BYTES_SCANNED = metrics_registry.counter('ids_bytes_scanned_total', 'UTF-8 bytes of log text scanned.',
+                                         ('algorithm', 'mode'))
+PATTERN_HITS = metrics_registry.counter('ids_pattern_hits_total', 'Detections reported, by attack type.',
+                                        ('attack_type',))
+STRING_MATCH_LATENCY = metrics_registry.histogram('ids_string_match_duration_seconds',
+                                                  'Time to run one string matching algorithm.', ('algorithm',))
+LINE_CACHE_LOOKUPS = metrics_registry.counter('ids_line_cache_lookups_total', 'Line result cache lookups.',
+                                              ('result',))
+LINE_CACHE_EVICTIONS = metrics_registry.counter('ids_line_cache_evictions_total', 'Line result cache evictions.')
+LINE_CACHE_HIT_RATIO = metrics_registry.gauge('ids_line_cache_hit_ratio', 'Line result cache hits per lookup.')
+LINE_CACHE_BYTES = metrics_registry.gauge('ids_line_cache_bytes', 'Estimated bytes held by the line result cache.')
+NORMALIZE_CACHE_HIT_RATIO = metrics_registry.gauge('ids_normalize_cache_hit_ratio',
+                                                   'Normalized line cache hits per lookup.')
+JOBS = metrics_registry.gauge('ids_detection_jobs', 'Detection jobs retained, by state.', ('state',))
+RULE_RELOADS = metrics_registry.counter('ids_rule_reloads_total', 'Rule file reloads swapped in.')
+
+def record_scan(algorithm, mode, logs, seconds, detections):
+    """Updates the scan counters for one finished batch, stream or job."""
+    DETECTION_LATENCY.labels(algorithm, mode).observe(seconds)
+    LINES_SCANNED.labels(algorithm, mode).inc(len(logs))
+    BYTES_SCANNED.labels(algorithm, mode).inc(sum(map(utf8_size, logs)))
+    for attack_type, count in count_attack_types(detections).items():
+        PATTERN_HITS.labels(attack_type).inc(count)
+
+def record_job(job):
+    if job.started_at is not None and job.finished_at is not None:
+        DETECTION_LATENCY.labels(job.method, 'job').observe(job.finished_at - job.started_at)
+        LINES_SCANNED.labels(job.method, 'job').inc(job.lines_processed)
+        BYTES_SCANNED.labels(job.method, 'job').inc(job.bytes_processed)
+        for attack_type, count in job.attack_type_counts.items():
+            PATTERN_HITS.labels(attack_type).inc(count)
+
+@metrics_registry.on_collect
+def collect_state_metrics():
+    stats = line_result_cache.to_dict()
+    LINE_CACHE_LOOKUPS.labels('hit').set(stats['hits'])
+    LINE_CACHE_LOOKUPS.labels('miss').set(stats['misses'])
+    LINE_CACHE_EVICTIONS.labels().set(stats['evictions'])
+    LINE_CACHE_HIT_RATIO.set(stats['hit_ratio'])
+    LINE_CACHE_BYTES.set(stats['bytes'])
+    NORMALIZE_CACHE_HIT_RATIO.set(normalize_cache.to_dict()['hit_ratio'])
+    for state, count in detection_jobs.state_counts().items():
+        JOBS.labels(state).set(count)
+    if rule_watcher is not None:
+        RULE_RELOADS.labels().set(rule_watcher.reloads)
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    # Streamed responses are timed up to their first byte
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    REQUEST_LATENCY.labels(route, request.method).observe(time.perf_counter() - g.get('request_start', time.perf_counter()))
+    REQUESTS.labels(route, request.method, response.status_code).inc()
+    return response
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics_registry.render(), content_type=metrics.CONTENT_TYPE)
+
+# Profiling
+# With IDS_PROFILE_ENABLED=1, send "X-Profile: 1" to profile one request. The header is
+# ignored otherwise, so clients cannot turn profiling on by themselves. Set
+# IDS_PROFILE_SAMPLE_RATE to profile a fraction of all requests.
+PROFILE_HEADER = 'X-Profile'
+PROFILE_HEADER_ENABLED = os.environ.get('IDS_PROFILE_ENABLED', '').lower() in ('1', 'true', 'yes')
+request_profiler = profiling.RequestProfiler(os.environ.get('IDS_PROFILE_DIR', profiling.DEFAULT_PROFILE_DIR),
+                                             float(os.environ.get('IDS_PROFILE_SAMPLE_RATE', 0)))
+
+@app.before_request
+def start_profile():
+    requested = PROFILE_HEADER_ENABLED and request.headers.get(PROFILE_HEADER, '').lower() in ('1', 'true', 'yes')
+    if request_profiler.should_profile(requested):
+        g.profile = request_profiler.start(f"{request.method} {request.path}")
+
+@app.after_request
+def finish_profile(response):
+    # Streamed responses are profiled up to their first byte
+    session = g.pop('profile', None)
+    if session is not None:
+        entry = request_profiler.finish(session)
+        response.headers['X-Profile-Name'] = entry['name']
+    return response
+
+@app.teardown_request
+def discard_profile(error=None):
+    # Requests that raised never reach after_request
+    session = g.pop('profile', None)
+    if session is not None:
+        request_profiler.finish(session)
+
+@app.route('/api/profiles', methods=['GET'])
+def list_profiles():
+    """Most recent profiles, newest first, with the files written for each."""
+    return jsonify({'directory': request_profiler.directory, 'profiles': request_profiler.index()})
+
+@app.route('/api/profiles/<file_name>', methods=['GET'])
+def download_profile(file_name):
+    if not any(file_name in entry['files'] for entry in request_profiler.recent):
+        return jsonify({'error': 'Profile not found'}), 404
+    return send_from_directory(os.path.abspath(request_profiler.directory), file_name, as_attachment=True)
+
+# Large scans run here, off the request threads, and are read back page by page
+detection_jobs = DetectionJobManager(on_finish=record_job)
+atexit.register(detection_jobs.shutdown)
+JOB_PAGE_SIZE = 100
+MAX_JOB_PAGE_SIZE = 1000
+# Benchmarks run one at a time in the background and are cached by parameters and code version
+benchmark_jobs = BenchmarkJobManager(sma)
+atexit.register(benchmark_jobs.shutdown)
 
 # Define simplified scenarios
 CYBER_SCENARIOS = {
@@ -29,6 +175,14 @@ CYBER_SCENARIOS = {
         'pattern_label': 'Pattern to Search',
         'example_text': 'The quick brown fox jumps over the lazy dog. A quick fox is hard to catch.',
         'example_pattern': 'quick fox'
+    },
+    'worst_case': {
+        'name': 'Worst-Case Input',
+        'description': 'A long run of one character searched for a pattern that differs only in its last character. Naive search re-reads almost the whole pattern at every position, while KMP, the Z-algorithm and full Boyer-Moore stay linear. Use "Compare All" to see the difference.',
+        'text_label': 'Text',
+        'pattern_label': 'Pattern to Search',
+        'example_text': 'a' * 300,
+        'example_pattern': 'a' * 14 + 'b'
     }
 }
 
@@ -48,16 +202,140 @@ def string_matching():
     return render_template('string_matching.html', cyber_scenarios=CYBER_SCENARIOS)
 
 # Intrusion Detection Routes
-@app.route('/api/upload', methods=['POST'])
-def upload_file():
-    if 'file' not in request.files:
-        return jsonify({'error': 'No file part'}), 400
-    file = request.files['file']
-    if file.filename == '':
-        return jsonify({'error': 'No selected file'}), 400
-    if file:
-        content = file.read().decode('utf-8')
-        return jsonify({'content': content})
+MULTIPART_READ_SIZE = 64 * 1024
+
+class MultipartFileReader(io.RawIOBase):
+    """Reads the file part of a multipart/form-data body as it arrives.
+
+    Werkzeug's request.files spools the whole upload before the view sees it;
+    this decodes the raw request stream incrementally instead, so the first
+    lines of a large upload are scanned while the rest is still in transit.
+    Raises ValueError if the body has no non-empty file part named ``field``.
+    """
+
+    def __init__(self, stream, boundary, field='file'):
+        self._data = self._iter_file_data(stream, boundary.encode('latin-1'), field)
+        self._pending = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pending:
+            self._pending = next(self._data, None)
+            if self._pending is None:
+                self._pending = b''
+                return 0
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+    @staticmethod
+    def _iter_file_data(stream, boundary, field):
+        decoder = MultipartDecoder(boundary)
+        in_file = False
+        while True:
+            event = decoder.next_event()
+            if isinstance(event, NeedData):
+                if decoder.complete:
+                    raise ValueError('Multipart body ended unexpectedly')
+                decoder.receive_data(stream.read(MULTIPART_READ_SIZE) or None)
+            elif isinstance(event, File):
+                in_file = event.name == field and bool(event.filename)
+            elif isinstance(event, Data):
+                if in_file:
+                    if event.data:
+                        yield event.data
+                    if not event.more_data:
+                        return
+            elif isinstance(event, Epilogue):
+                raise ValueError('No selected file')
+
+def format_detection(detection, algorithm):
+    """Converts a backend detection tuple into the JSON shape used by the frontend."""
+    log, pattern, attack_type, steps, indices, count = detection
+    return {
+        'log': log,
+        'pattern': pattern,
+        'attack_type': attack_type,
+        'steps': format_steps(steps),
+        'algorithm': algorithm.upper(),
+        'indices': indices,
+        'count': count
+    }
+
+def parse_count(value, name):
+    """A non-negative integer option, raising ValueError that names the field otherwise."""
+    try:
+        count = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{name} must be an integer')
+    if count < 0:
+        raise ValueError(f'{name} must be 0 or a positive integer')
+    return count
+
+def parse_detection_options(data):
+    """Validates the options shared by the batch detection endpoints.
+
+    Returns (rule_set, algorithm, workers, prefilter, cache, tracer, all_matches)
+    and raises ValueError with a message for the client on bad input.
+    """
+    algorithm = data.get('algorithm', 'aho_corasick')
+    if algorithm not in DETECTION_METHODS:
+        raise ValueError(f'Unknown algorithm: {algorithm}')
+    # 1 scans in-process; 0 uses every core; N > 1 shards over N worker processes
+    workers = parse_count(data.get('workers', 1), 'workers')
+    prefilter = data.get('prefilter', PREFILTER_NONE)
+    if prefilter not in PREFILTERS:
+        raise ValueError(f'Unknown prefilter: {prefilter}')
+    # Results of repeated lines are reused across requests unless disabled
+    cache = line_result_cache if data.get('cache', True) else None
+    tracer = Tracer(data.get('trace', TRACE_SUMMARY), parse_count(data.get('trace_budget', DEFAULT_TRACE_BUDGET), 'trace_budget'))
+    # Report every matching pattern of a line rather than only the first
+    all_matches = bool(data.get('all_matches', False))
+    rule_set = current_rule_set(bool(data.get('normalize', False)))
+    return rule_set, algorithm, workers, prefilter, cache, tracer, all_matches
+
+DETECT_FORMATS = ('verbose', 'compact')
+GZIP_MIN_BYTES = 1024
+
+def count_attack_types(detections):
+    """Number of detections per attack type, for the batch summary."""
+    return dict(Counter(detection[2] for detection in detections))
+
+def compact_detections(results, include_steps):
+    """Packs (position, detection) pairs into parallel columns.
+
+    Log text is replaced by its 1-based line number, pattern and attack-type
+    strings by indices into lookup tables, and the per-detection index lists by
+    one flat 'indices' array: detection i owns indices[offsets[i]:offsets[i + 1]].
+    """
+    patterns = {}
+    attack_types = {}
+    columns = {'line': [], 'pattern': [], 'attack_type': [], 'count': [], 'offsets': [0], 'indices': []}
+    if include_steps:
+        columns['steps'] = []
+    for position, (log, pattern, attack_type, steps, indices, count) in results:
+        columns['line'].append(position + 1)
+        columns['pattern'].append(patterns.setdefault(pattern, len(patterns)))
+        columns['attack_type'].append(attack_types.setdefault(attack_type, len(attack_types)))
+        columns['count'].append(count)
+        columns['indices'].extend(indices)
+        columns['offsets'].append(len(columns['indices']))
+        if include_steps:
+            columns['steps'].append(format_steps(steps))
+    return list(patterns), list(attack_types), columns
+
+def compact_json_response(payload):
+    """Serializes without whitespace and gzips large bodies for clients that accept it."""
+    body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    response = Response(body, mimetype='application/json')
+    response.vary.add('Accept-Encoding')
+    if len(body) >= GZIP_MIN_BYTES and 'gzip' in request.accept_encodings:
+        response.set_data(gzip.compress(body, compresslevel=5))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
 
 @app.route('/api/detect', methods=['POST'])
 def detect():
@@ -67,45 +345,230 @@ def detect():
             return jsonify({'error': 'No logs provided'}), 400
         
         logs = data.get('logs', [])
-        algorithm = data.get('algorithm', 'kmp')
         
         if not logs:
             return jsonify({'error': 'Empty logs provided'}), 400
+        # 'compact' returns columns keyed by line number instead of one object per detection
+        response_format = data.get('format', 'verbose')
+        if response_format not in DETECT_FORMATS:
+            return jsonify({'error': f'Unknown format: {response_format}'}), 400
+        if response_format == 'compact':
+            # Steps are rarely wanted in bulk, so compact responses skip them unless a trace is asked for
+            data.setdefault('trace', TRACE_OFF)
+        try:
+            rule_set, algorithm, workers, prefilter, cache, tracer, all_matches = parse_detection_options(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        prefilter_stats = PrefilterStats()
         
         start_time = time.time()
-        results = detect_intrusions(logs, attack_patterns, algorithm)
+        if workers == 1:
+            results = list(iter_detections(logs, rule_set, algorithm, tracer, prefilter, prefilter_stats, cache,
+                                           all_matches))
+        else:
+            results = list(iter_detections_parallel(logs, rule_set, algorithm, workers=workers or None,
+                                                    tracer=tracer, prefilter=prefilter,
+                                                    prefilter_stats=prefilter_stats, cache=cache,
+                                                    all_matches=all_matches))
         end_time = time.time()
+        record_scan(algorithm, 'batch', logs, end_time - start_time, (detection for _, detection in results))
         
-        formatted_results = []
-        total_occurrences = 0
-        for log, pattern, attack_type, steps, indices, count in results:
-            formatted_results.append({
-                'log': log,
-                'pattern': pattern,
-                'attack_type': attack_type,
-                'steps': steps,
-                'algorithm': algorithm.upper(),
-                'indices': indices,
-                'count': count
-            })
-            total_occurrences += count
+        total_occurrences = sum(detection[5] for _, detection in results)
+        summary = {
+            'total_detections': len(results),
+            'total_occurrences': total_occurrences,
+            'attack_type_counts': count_attack_types(detection for _, detection in results),
+            'execution_time': round(end_time - start_time, 6),
+            'algorithm_used': algorithm.upper(),
+            'rule_version': rule_set.version,
+            'trace': tracer.to_dict(),
+            'prefilter': prefilter_stats.to_dict() if prefilter != PREFILTER_NONE else None,
+            'cache': cache.to_dict() if cache is not None else None
+        }
+        if response_format == 'compact':
+            patterns, attack_types, columns = compact_detections(results, tracer.level != TRACE_OFF)
+            summary.update({'format': 'compact', 'patterns': patterns, 'attack_types': attack_types,
+                            'detections': columns})
+            return compact_json_response(summary)
         
         note = None
         if total_occurrences > 1:
             note = 'Multiple intrusion attacks detected. Scroll down to find all detections.'
         
-        return jsonify({
-            'detections': formatted_results,
-            'total_detections': len(results),
-            'total_occurrences': total_occurrences,
-            'execution_time': round(end_time - start_time, 6),
-            'algorithm_used': algorithm.upper(),
+        summary.update({
+            'detections': [format_detection(detection, algorithm) for _, detection in results],
             'note': note
         })
+        return jsonify(summary)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/rules', methods=['GET'])
+def rules_status():
+    """Version and size of the active rule set, plus reload state when rules come from a file."""
+    if rule_watcher is not None:
+        return jsonify(rule_watcher.to_dict())
+    return jsonify({'path': None, 'version': detection_rules.version, 'rules': len(detection_rules)})
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """Queues a detection job over the posted logs and returns its id straight away.
+
+    Takes the same body as /api/detect. Poll /api/jobs/<id> for progress and read
+    detections page by page from /api/jobs/<id>/results.
+    """
+    data = request.get_json(silent=True)
+    if not data or not data.get('logs'):
+        return jsonify({'error': 'No logs provided'}), 400
+    try:
+        rule_set, algorithm, workers, prefilter, cache, tracer, all_matches = parse_detection_options(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    job = DetectionJob(data['logs'], rule_set, algorithm, workers, tracer, prefilter, cache, all_matches)
+    try:
+        detection_jobs.submit(job)
+    except JobQueueFull as e:
+        return jsonify({'error': str(e)}), 429
+    return jsonify(job.to_dict()), 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = detection_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    status = job.to_dict()
+    status['trace'] = job.tracer.to_dict()
+    status['prefilter'] = job.prefilter_stats.to_dict() if job.prefilter != PREFILTER_NONE else None
+    return jsonify(status)
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    job = detection_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    job.cancel()
+    return jsonify(job.to_dict())
+
+@app.route('/api/jobs/<job_id>/results', methods=['GET'])
+def job_results(job_id):
+    """Returns one page of a job's detections; available while the job is still running."""
+    job = detection_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    try:
+        offset = int(request.args.get('offset', 0))
+        limit = int(request.args.get('limit', JOB_PAGE_SIZE))
+    except ValueError:
+        return jsonify({'error': 'offset and limit must be integers'}), 400
+    if offset < 0 or not 0 < limit <= MAX_JOB_PAGE_SIZE:
+        return jsonify({'error': f'offset must be >= 0 and limit between 1 and {MAX_JOB_PAGE_SIZE}'}), 400
+    detections = []
+    for position, detection in job.results(offset, limit):
+        record = format_detection(detection, job.method)
+        record['line'] = position + 1
+        detections.append(record)
+    next_offset = offset + len(detections)
+    return jsonify({
+        'id': job.id,
+        'state': job.state,
+        'rule_version': job.rule_set.version,
+        'offset': offset,
+        'detections': detections,
+        'total_detections': len(job.detections),
+        'next_offset': next_offset if next_offset < len(job.detections) or job.state not in JOB_FINISHED_STATES else None
+    })
+
+@app.route('/api/detect/stream', methods=['POST'])
+def detect_stream():
+    """Scans an uploaded log file line by line and streams detections back as NDJSON.
+
+    The file may be sent as the raw request body or as the 'file' field of a
+    multipart form. Each output line is a JSON record with a 'type' of
+    'detection', 'progress', 'summary' or 'error'.
+    """
+    algorithm = request.args.get('algorithm', 'aho_corasick')
+    if algorithm not in DETECTION_METHODS:
+        return jsonify({'error': f'Unknown algorithm: {algorithm}'}), 400
+    prefilter = request.args.get('prefilter', PREFILTER_NONE)
+    if prefilter not in PREFILTERS:
+        return jsonify({'error': f'Unknown prefilter: {prefilter}'}), 400
+    prefilter_stats = PrefilterStats()
+    cache = line_result_cache if request.args.get('cache', 'true').lower() not in ('0', 'false', 'no') else None
+    all_matches = request.args.get('all_matches', 'false').lower() in ('1', 'true', 'yes')
+    normalize = request.args.get('normalize', 'false').lower() in ('1', 'true', 'yes')
+    rule_set = current_rule_set(normalize)
+    try:
+        tracer = Tracer(request.args.get('trace', TRACE_SUMMARY),
+                        parse_count(request.args.get('trace_budget', DEFAULT_TRACE_BUDGET), 'trace_budget'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    is_multipart = request.mimetype == 'multipart/form-data'
+    boundary = request.mimetype_params.get('boundary')
+    if is_multipart and not boundary:
+        return jsonify({'error': 'Multipart body has no boundary'}), 400
+
+    def generate():
+        lines_scanned = 0
+        total_detections = 0
+        total_occurrences = 0
+        attack_type_counts = Counter()
+        scanned_bytes = 0
+        start_time = time.time()
+
+        def count_bytes(lines):
+            nonlocal scanned_bytes
+            for line in lines:
+                scanned_bytes += utf8_size(line)
+                yield line
+
+        try:
+            # The form is decoded here, inside the streamed response's request
+            # context, so detections flow while the upload is still arriving
+            if is_multipart:
+                stream = io.BufferedReader(MultipartFileReader(request.stream, boundary), MULTIPART_READ_SIZE)
+            else:
+                stream = request.stream
+            for lines_scanned, detections in detect_intrusions_stream(count_bytes(iter_log_lines(stream)), rule_set, algorithm,
+                                                                       tracer=tracer, prefilter=prefilter,
+                                                                       prefilter_stats=prefilter_stats, cache=cache,
+                                                                       all_matches=all_matches):
+                for line_number, detection in detections:
+                    record = format_detection(detection, algorithm)
+                    record['type'] = 'detection'
+                    record['line'] = line_number
+                    record['rule_version'] = rule_set.version
+                    total_detections += 1
+                    total_occurrences += detection[5]
+                    attack_type_counts[detection[2]] += 1
+                    yield json.dumps(record) + '\n'
+                yield json.dumps({'type': 'progress', 'lines_scanned': lines_scanned}) + '\n'
+        except Exception as e:
+            app.logger.error(f"Error in /api/detect/stream: {e}", exc_info=True)
+            yield json.dumps({'type': 'error', 'error': str(e)}) + '\n'
+            return
+        elapsed = time.time() - start_time
+        DETECTION_LATENCY.labels(algorithm, 'stream').observe(elapsed)
+        LINES_SCANNED.labels(algorithm, 'stream').inc(lines_scanned)
+        BYTES_SCANNED.labels(algorithm, 'stream').inc(scanned_bytes)
+        for attack_type, count in attack_type_counts.items():
+            PATTERN_HITS.labels(attack_type).inc(count)
+        yield json.dumps({
+            'type': 'summary',
+            'lines_scanned': lines_scanned,
+            'total_detections': total_detections,
+            'total_occurrences': total_occurrences,
+            'attack_type_counts': dict(attack_type_counts),
+            'execution_time': round(elapsed, 6),
+            'algorithm_used': algorithm.upper(),
+            'rule_version': rule_set.version,
+            'trace': tracer.to_dict(),
+            'prefilter': prefilter_stats.to_dict() if prefilter != PREFILTER_NONE else None,
+            'cache': cache.to_dict() if cache is not None else None
+        }) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 # String Matching Routes
 @app.route('/api/scenario_data', methods=['GET'])
 def get_scenario_data():
@@ -134,6 +597,8 @@ def search():
         pattern = data.get('pattern', '')
         algorithm_name = data.get('algorithm', 'naive')
         visualize = data.get('visualize', False)
+        frame_format = data.get('frame_format', 'full')
+        max_errors = data.get('max_errors')
 
         if not isinstance(text, str) or not isinstance(pattern, str):
             return jsonify({'error': 'Text and pattern must be strings'}), 400
@@ -141,7 +606,10 @@ def search():
         app.logger.info(f"Search request - Algorithm: {algorithm_name}, Text length: {len(text)}, Pattern length: {len(pattern)}")
 
         try:
-            result = sma.run_algorithm(algorithm_name, text, pattern, visualize=visualize)
+            started = time.perf_counter()
+            result = sma.run_algorithm(algorithm_name, text, pattern, visualize=visualize,
+                                       frame_format=frame_format, max_errors=max_errors)
+            STRING_MATCH_LATENCY.labels(algorithm_name).observe(time.perf_counter() - started)
             if not isinstance(result, dict):
                 return jsonify({'error': f'Invalid result type from algorithm: {type(result)}'}), 500
             return jsonify(result)
@@ -173,49 +641,41 @@ def compare():
 
 @app.route('/api/benchmark', methods=['POST'])
 def benchmark():
-    """Handles benchmark requests and returns plot data."""
-    data = request.get_json()
-    pattern_size = int(data.get('pattern_size', 5))
-    num_trials = int(data.get('num_trials', 3))
-    text_sizes_raw = data.get('text_sizes', [100, 500, 1000, 2000, 5000, 10000])
-    text_sizes = [int(s) for s in text_sizes_raw]
+    """Starts a benchmark in the background, or returns the cached run with the same parameters.
 
+    Responds 200 with the raw series when the run has already completed, and 202
+    with its id otherwise; poll /api/benchmark/<id> until it has. The chart is
+    served as a PNG from /api/benchmark/<id>/plot.png.
+    """
+    data = request.get_json(silent=True) or {}
     try:
-        benchmark_results, sizes = sma.benchmark_algorithms(text_sizes, pattern_size, num_trials)
+        params = benchmark_params(data)
+        job, cached = benchmark_jobs.submit(params)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except BenchmarkQueueFull as e:
+        return jsonify({'error': str(e)}), 429
+    status = job.to_dict()
+    status['cached'] = cached
+    return jsonify(status), 200 if job.state == BENCHMARK_COMPLETED else 202
 
-        plt.figure(figsize=(12, 8))
-        sns.set_theme(style="whitegrid")
-        
-        for alg, times in benchmark_results.items():
-            valid_times = [t for t in times if t is not None]
-            valid_sizes = [s for i, s in enumerate(sizes) if times[i] is not None]
-            if valid_times:
-                plt.plot(valid_sizes, valid_times, marker='o', label=alg.upper().replace('_', ' '), linewidth=2)
-
-        plt.xlabel('Text Size (characters)', fontsize=12)
-        plt.ylabel('Average Execution Time (seconds)', fontsize=12)
-        plt.title('String Matching Algorithms Performance in Cybersecurity', fontsize=14)
-        plt.legend(fontsize=10)
-        plt.grid(True, alpha=0.3)
-        plt.yscale('log')
-        plt.xticks(fontsize=10)
-        plt.yticks(fontsize=10)
-        plt.tight_layout()
-
-        buffer = io.BytesIO()
-        plt.savefig(buffer, format='png')
-        plt.close()
-        plot_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
+@app.route('/api/benchmark/<job_id>', methods=['GET'])
+def benchmark_status(job_id):
+    job = benchmark_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Benchmark not found'}), 404
+    return jsonify(job.to_dict())
 
-        return jsonify({
-            'benchmark_results': benchmark_results,
-            'text_sizes': sizes,
-            'plot_image': plot_base64
-        })
-
-    except Exception as e:
-        app.logger.error(f"Error in /api/benchmark: {e}", exc_info=True)
-        return jsonify({'error': f'An unexpected error occurred during benchmarking: {str(e)}'}), 500
+@app.route('/api/benchmark/<job_id>/plot.png', methods=['GET'])
+def benchmark_plot(job_id):
+    """The benchmark chart, rendered on the first request and cached with the run."""
+    job = benchmark_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Benchmark not found'}), 404
+    if job.state != BENCHMARK_COMPLETED:
+        return jsonify({'error': f'Benchmark is {job.state}'}), 409
+    # The id covers the parameters and the code version, so the image never changes
+    return Response(job.plot_png(), mimetype='image/png', headers={'Cache-Control': 'public, max-age=86400'})
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5050, debug=True) 
\ No newline at end of file